@@ -1,46 +1,83 @@
 import pandas as pd
 import numpy as np
 from collections import Counter
+import argparse
 import json
 import re
 import os
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
-from pptx.chart.data import CategoryChartData, ChartData, XyChartData
-from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
-from pptx.enum.shapes import MSO_SHAPE
-
-# Read multiple CSV files: auto-discover in the script directory
-base_dir = os.path.dirname(__file__)
-csv_files = []
-try:
-    for fname in os.listdir(base_dir):
-        if fname.lower().endswith('.csv') and 'parent feedback form' in fname.lower():
-            csv_files.append(os.path.join(base_dir, fname))
-except Exception:
-    pass
-
-# Discover Excel files as well
-xlsx_files = []
-try:
-    for fname in os.listdir(base_dir):
-        if fname.lower().endswith('.xlsx') and 'parent feedback form' in fname.lower():
-            xlsx_files.append(os.path.join(base_dir, fname))
-except Exception:
-    pass
-
-# Prefer XLSX if present; otherwise fall back to CSV
-input_files_used = xlsx_files if xlsx_files else csv_files
-
-def _normalize_text(s):
+import glob
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ingest_cache import IngestCache, DEFAULT_CACHE_DIR_NAME, code_fingerprint
+from export_shards import DEFAULT_SHARD_DIR_NAME, write_shards, remove_manifest, shard_files
+from compact_stats import DEFAULT_COMPACT_NAME, write_compact
+from compress_artifacts import DEFAULT_SIZE_REPORT_NAME, precompress_artifacts, print_size_report, remove_compressed_siblings
+from json_export import write_json
+from stage_timing import DEFAULT_TIMINGS_NAME, StageTimer
+from grouping import GroupKey, CountTable, GroupTotals, ResponseTotals
+from column_roles import ROLES, DEFAULT_ROLE_CACHE_NAME, RULES_FINGERPRINT as ROLE_RULES_FINGERPRINT, normalize_header
+from rating_labels import LABELS, RATING_BUCKETS, DEFAULT_LABEL_TABLE_NAME, RULES_FINGERPRINT as RATING_RULES_FINGERPRINT, weighted_score, rated
+from incremental_stats import DEFAULT_STATE_NAME, IncrementalState, columns_fingerprint, row_keys, key_hashes, content_hashes
+
+# Pipeline: discover_input_files -> load_responses -> normalize_responses -> aggregate_stats -> export_json
+# (+ create_ppt_report). Nothing runs at import time; main() is the command-line entry point.
+
+# Output folder of the original setup; --output-dir (or "output_dir" in a --config file) overrides it
+DEFAULT_OUTPUT_DIR = '/Users/venkubabugollapudi/Desktop/Feedback/Feed Back'
+JSON_OUTPUT_NAME = 'feedback_stats.json'
+PPT_OUTPUT_NAME = 'Pre_Primary_Feedback_Analysis.pptx'
+INPUT_EXTENSIONS = ('.xlsx', '.csv')
+# Config keys holding paths; relative values are taken relative to the config file
+CONFIG_PATH_KEYS = ('input', 'output_dir', 'cache_dir')
+
+def resolve_output_dir(output_dir=None):
+    """output_dir if given, else DEFAULT_OUTPUT_DIR when it exists, else the script folder"""
+    if output_dir:
+        return os.path.abspath(os.path.expanduser(output_dir))
+    if os.path.isdir(DEFAULT_OUTPUT_DIR):
+        return DEFAULT_OUTPUT_DIR
+    return os.path.dirname(os.path.abspath(__file__))
+
+def _is_input_file(path):
+    name = os.path.basename(path)
+    # Excel keeps a "~$<name>.xlsx" lock file next to a workbook while it is open
+    return name.lower().endswith(INPUT_EXTENSIONS) and not name.startswith('~$') and os.path.isfile(path)
+
+def discover_input_files(base_dir, patterns=None):
+    """Find Parent Feedback Form CSV/XLSX files in base_dir, or the CSV/XLSX files matching the
+    glob patterns when given; returns (input_files_used, xlsx_files, csv_files)"""
+    if patterns:
+        matched = []
+        for pattern in patterns:
+            for path in sorted(glob.glob(os.path.expanduser(pattern), recursive=True)):
+                if _is_input_file(path) and path not in matched:
+                    matched.append(path)
+        xlsx_files = [p for p in matched if p.lower().endswith('.xlsx')]
+        csv_files = [p for p in matched if p.lower().endswith('.csv')]
+        return (xlsx_files if xlsx_files else csv_files), xlsx_files, csv_files
+
+    csv_files = []
     try:
-        t = str(s).strip().lower()
+        for fname in os.listdir(base_dir):
+            if fname.lower().endswith('.csv') and 'parent feedback form' in fname.lower():
+                csv_files.append(os.path.join(base_dir, fname))
     except Exception:
-        t = str(s).lower()
-    t = re.sub(r"\s+", " ", t)
-    return t
+        pass
+
+    # Discover Excel files as well
+    xlsx_files = []
+    try:
+        for fname in os.listdir(base_dir):
+            if fname.lower().endswith('.xlsx') and 'parent feedback form' in fname.lower():
+                xlsx_files.append(os.path.join(base_dir, fname))
+    except Exception:
+        pass
+
+    # Prefer XLSX if present; otherwise fall back to CSV
+    input_files_used = xlsx_files if xlsx_files else csv_files
+    return input_files_used, xlsx_files, csv_files
 
 CANON_BRANCH_COL = 'Name of the Branch( கிளையின் பெயர்)'
 CANON_CLASS_COL = 'Class( வகுப்பு )'
@@ -51,7 +88,7 @@ def _coalesce_key_columns(df_in):
     cols = list(df_in.columns)
 
     def _match_start(col, starts):
-        low = _normalize_text(col)
+        low = normalize_header(col)
         return any(low.startswith(s) for s in starts)
 
     def _find_sources(starts):
@@ -79,11 +116,8 @@ def _coalesce_key_columns(df_in):
     _coalesce(CANON_LANGUAGE_COL, _find_sources(['ii language']))
     return df_in
 
-def try_read_excel_with_header_detection(path):
-    try:
-        df0 = pd.read_excel(path, header=None, nrows=25)
-    except Exception as e:
-        raise e
+def detect_excel_header_row(path):
+    df0 = pd.read_excel(path, header=None, nrows=25)
     header_row = None
     candidates = ['name of the branch', 'branch', 'கிளை', 'கிளையின்']
     max_nonempty = -1
@@ -95,6 +129,11 @@ def try_read_excel_with_header_detection(path):
             if nonempty > max_nonempty:
                 max_nonempty = nonempty
                 header_row = r
+    return header_row
+
+def try_read_excel_with_header_detection(path, header_row=None):
+    if header_row is None:
+        header_row = detect_excel_header_row(path)
     if header_row is None:
         df = pd.read_excel(path)
     else:
@@ -102,178 +141,224 @@ def try_read_excel_with_header_detection(path):
     df.columns = [str(c).strip() for c in df.columns]
     return df
 
-frames = []
-for path in input_files_used:
+def parse_excel_input(path):
+    """Header-detect, read and key-coalesce one workbook; returns (frame, header_row)"""
+    header_row = detect_excel_header_row(path)
+    _df = try_read_excel_with_header_detection(path, header_row)
+    try:
+        _df = _coalesce_key_columns(_df)
+    except Exception:
+        pass
+    return _df, header_row
+
+# Cached parses go stale when any of this code (or the canonical key headers) changes
+PARSER_FINGERPRINT = code_fingerprint(parse_excel_input, detect_excel_header_row, try_read_excel_with_header_detection,
+                                      _coalesce_key_columns, normalize_header,
+                                      [CANON_BRANCH_COL, CANON_CLASS_COL, CANON_ORIENTATION_COL, CANON_LANGUAGE_COL])
+
+def segment_from_path(path):
+    return 'Pre Primary' if 'Pre Primary' in path else ('Primary' if 'Primary' in path and 'High School' not in path else ('High School' if 'High School' in path else 'Unknown'))
+
+def read_input_file(path, ingest_cache=None, timer=None):
+    """Parse one CSV/XLSX into a key-coalesced frame with its Segment; returns (frame or None, warnings)"""
+    timer = timer if timer is not None else StageTimer()
+    warnings = []
     try:
         if os.path.exists(path):
-            seg = 'Pre Primary' if 'Pre Primary' in path else ('Primary' if 'Primary' in path and 'High School' not in path else ('High School' if 'High School' in path else 'Unknown'))
+            seg = segment_from_path(path)
             if path.lower().endswith('.xlsx'):
                 try:
-                    _df = try_read_excel_with_header_detection(path)
+                    with timer.stage('excel_read') as size:
+                        if ingest_cache is not None:
+                            _df = ingest_cache.load(path, parse_excel_input)
+                        else:
+                            _df, _header_row = parse_excel_input(path)
+                        size['rows'], size['cols'] = _df.shape
                 except Exception as e:
-                    print(f"Warning: could not read Excel {path}: {e}. If missing, install the 'openpyxl' package.")
-                    continue
+                    warnings.append(f"Warning: could not read Excel {path}: {e}. If missing, install the 'openpyxl' package.")
+                    return None, warnings
             elif path.lower().endswith('.csv'):
-                _df = pd.read_csv(path)
+                with timer.stage('csv_read') as size:
+                    _df = pd.read_csv(path)
+                    size['rows'], size['cols'] = _df.shape
+                # parse_excel_input has already done this for workbooks (and the cache keeps it)
+                try:
+                    _df.columns = [str(c).strip() for c in _df.columns]
+                except Exception:
+                    pass
+                try:
+                    with timer.stage('coalesce', _df):
+                        _df = _coalesce_key_columns(_df)
+                except Exception:
+                    pass
             else:
-                continue
-            try:
-                _df.columns = [str(c).strip() for c in _df.columns]
-            except Exception:
-                pass
-            try:
-                _df = _coalesce_key_columns(_df)
-            except Exception:
-                pass
+                return None, warnings
             _df['Segment'] = seg
-            frames.append(_df)
+            return _df, warnings
     except Exception as e:
-        print(f"Warning: could not read {path}: {e}")
-
-# If XLSX files were preferred but none could be read, fall back to CSVs if available
-if not frames and xlsx_files and csv_files:
-    print("Note: Could not parse Excel files; falling back to CSV. To use Excel inputs, install 'openpyxl'.")
-    for path in csv_files:
+        warnings.append(f"Warning: could not read {path}: {e}")
+    return None, warnings
+
+def _read_input_file_job(job):
+    # Worker-process entry point: each worker opens its own handle on the shared cache directory
+    path, cache_dir, refresh = job
+    ingest_cache = IngestCache(cache_dir, refresh=refresh, parser_fingerprint=PARSER_FINGERPRINT) if cache_dir else None
+    timer = StageTimer()
+    frame, warnings = read_input_file(path, ingest_cache, timer)
+    timings = list(timer.records.values())
+    if ingest_cache is None:
+        return frame, warnings, 0, 0, timings
+    return frame, warnings, ingest_cache.hits, ingest_cache.misses, timings
+
+def read_input_files(paths, ingest_cache=None, jobs=1, timer=None):
+    """read_input_file for every path, in the order given; jobs > 1 parses them in a process pool"""
+    paths = list(paths)
+    if jobs > 1 and len(paths) > 1:
+        cache_dir = ingest_cache.cache_dir if ingest_cache is not None else None
+        refresh = ingest_cache.refresh if ingest_cache is not None else False
         try:
-            if os.path.exists(path):
-                seg = 'Pre Primary' if 'Pre Primary' in path else ('Primary' if 'Primary' in path and 'High School' not in path else ('High School' if 'High School' in path else 'Unknown'))
-                _df = pd.read_csv(path)
-                _df['Segment'] = seg
-                frames.append(_df)
+            with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+                # map() yields results in submission order, so the concat order matches a serial run
+                results = list(pool.map(_read_input_file_job, [(p, cache_dir, refresh) for p in paths]))
         except Exception as e:
-            print(f"Warning: could not read {path}: {e}")
-
-if not frames:
-    raise FileNotFoundError("No input CSV/XLSX files found. Expected Pre Primary, Primary, or High School files in the folder. If using Excel, ensure 'openpyxl' is installed.")
-
-df = pd.concat(frames, ignore_index=True)
-
-# Remove empty rows
-df = df.dropna(how='all')
-
-# Print basic info
-print(f"Total records: {len(df)}")
-print(f"\nColumns ({len(df.columns)}):")
-for i, col in enumerate(df.columns, 1):
-    print(f"{i}. {col}")
-
-# Define rating mapping for conversion
-rating_map = {
-    'Excellent(மிகநன்று)': 5,
-    'Excellent(மிக நன்று)': 5,
-    'Good(நன்று)': 4,
-    'Average(சராசரி)': 3,
-    'Satisfactory(சராசரி)': 3,
-    'Satisfactory(திருப்தி)': 3,
-    'Need Improvement(முன்னேற்றம் தேவை)': 2,
-    'Needs Improvement(முன்னேற்றம் தேவை)': 2,
-    'Needs to Improve(முன்னேற்றம் தேவை)': 2,
-    'Poor(மோசம்)': 1,
-    'Not Applicable(பொருந்தாது)': 0,
-    'Not Applicable(பொருந்தாது': 0,
-    'Yes(ஆம்)': 5,
-    'Maybe(இருக்கலாம்)': 3,
-    'No(இல்லை)': 1
-}
-
-def canonicalize_rating(value):
+            print(f"Warning: parallel ingestion failed ({e}); reading files one by one.")
+        else:
+            out = []
+            for frame, warnings, hits, misses, timings in results:
+                if ingest_cache is not None:
+                    ingest_cache.hits += hits
+                    ingest_cache.misses += misses
+                if timer is not None:
+                    timer.merge(timings)
+                out.append((frame, warnings))
+            return out
+    return [read_input_file(p, ingest_cache, timer) for p in paths]
+
+def load_responses(input_files_used, xlsx_files=(), csv_files=(), ingest_cache=None, jobs=1, timer=None):
+    """Read every input file into one response frame with a Segment column; empty rows dropped"""
+    frames = []
+    for frame, warnings in read_input_files(input_files_used, ingest_cache, jobs, timer):
+        for w in warnings:
+            print(w)
+        if frame is not None:
+            frames.append(frame)
+
+    # If XLSX files were preferred but none could be read, fall back to CSVs if available
+    if not frames and xlsx_files and csv_files:
+        print("Note: Could not parse Excel files; falling back to CSV. To use Excel inputs, install 'openpyxl'.")
+        for path in csv_files:
+            try:
+                if os.path.exists(path):
+                    seg = segment_from_path(path)
+                    _df = pd.read_csv(path)
+                    _df['Segment'] = seg
+                    frames.append(_df)
+            except Exception as e:
+                print(f"Warning: could not read {path}: {e}")
+
+    if ingest_cache is not None and (ingest_cache.hits or ingest_cache.misses):
+        print(f"Ingest cache: {ingest_cache.hits} hit(s), {ingest_cache.misses} parsed ({ingest_cache.cache_dir})")
+
+    if not frames:
+        raise FileNotFoundError("No input CSV/XLSX files found. Expected Pre Primary, Primary, or High School files in the folder. If using Excel, ensure 'openpyxl' is installed.")
+
+    df = pd.concat(frames, ignore_index=True)
+
+    # Remove empty rows
+    return df.dropna(how='all')
+
+def select_new_responses(df, hashes, contents, state_path, fingerprint):
+    """For --incremental: the responses the saved totals have not folded in yet.
+
+    Returns (df, rows, state, positions): the new responses, their row positions in the whole
+    frame, the saved state and the current row positions of the responses it holds. state is
+    None (and df comes back whole) when a full run is needed instead.
+    """
+    state = IncrementalState.load(state_path, fingerprint)
+    match = state.match_rows(hashes, contents) if state is not None else None
+    if match is None:
+        reason = 'no saved totals for these inputs' if state is None else 'previously analysed responses were edited, removed or reordered'
+        print(f"Note: incremental refresh not possible ({reason}); running a full analysis.")
+        return df, None, None, None
+    positions, is_new = match
+    return df[is_new], np.flatnonzero(is_new), state, positions
+
+# Buckets of the respondent-level rating counts (Not Applicable stays 0: averages skip N/A answers)
+AVG_BUCKETS = ['Excellent', 'Good', 'Average', 'Poor', 'Not Applicable', 'Unanswered']
+
+def avg_bucket_codes(values):
+    """Positions in AVG_BUCKETS of respondent averages: round half to even like round(),
+    clip to 2..5 (5 -> Excellent ... <=2 -> Poor), NaN -> Unanswered"""
+    arr = np.asarray(values, dtype=float)
+    codes = np.full(arr.shape, AVG_BUCKETS.index('Unanswered'), dtype=np.int8)
+    ok = ~np.isnan(arr)
+    codes[ok] = 5 - np.clip(np.rint(arr[ok]), 2, 5)
+    return codes
+
+def _counts_by_group(labels, tables, buckets):
+    """{group label: {table name: {bucket: count}}} from (groups x buckets) count tables"""
+    return {label: {name: {b: int(n) for b, n in zip(buckets, t[i])} for name, t in tables.items()}
+            for i, label in enumerate(labels)}
+
+def normalize_rating_series(series):
+    """Vectorized normalize_rating: one label-table lookup per distinct label, int8 scores per row"""
+    return pd.Series(LABELS.scores(series), index=series.index, name=series.name)
+
+def map_distinct(series, func):
+    """Apply func once per distinct value of series (and once for missing) and broadcast back"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    lookup = np.empty(len(uniques) + 1, dtype=object)
+    lookup[:] = [func(v) for v in uniques] + [func(None)]
+    return pd.Series(lookup[codes], index=series.index, name=series.name)
+
+def bucket_reason(text):
+    s = str(text).lower()
+    if 'no concerns' in s or 'மேற்கண்ட எதுவுமில்லை' in s:
+        return 'No Concerns'
+    if 'transport' in s:
+        return 'Transport'
+    if 'sports' in s:
+        return 'Sports'
+    if 'infrastructure' in s or 'facilities' in s or 'facility' in s:
+        return 'Infrastructure & Facilities'
+    if 'discipline' in s or 'values' in s:
+        return 'Discipline & Values'
+    if 'competition' in s or 'event' in s or 'celebration' in s:
+        return 'Events & Celebrations'
+    if 'student communication' in s or ('communication' in s and 'student' in s):
+        return 'Student Communication'
+    if 'communication' in s:
+        return 'Communication'
+    if 'app' in s:
+        return 'App'
+    if 'academics' in s or 'teaching' in s or 'stories' in s or 'rhymes' in s or 'activities' in s:
+        return 'Academics & Activities'
+    if 'environment' in s or 'hygiene' in s or 'clean' in s or 'safety' in s:
+        return 'Environment & Safety'
+    return 'Other'
+
+# Classify Yes/No/Maybe/Not Applicable for localized strings
+def classify_ynm(value):
     if pd.isna(value) or value == '':
         return None
     s = str(value).strip().lower()
-    # Tamil/localized variants included
-    if 'not applicable' in s or 'பொருந்தாது' in s:
+    if ('yes' in s) or ('ஆம்' in s):
+        return 'Yes'
+    if ('no' in s) or ('இல்லை' in s):
+        return 'No'
+    if ('maybe' in s) or ('இருக்கலாம்' in s):
+        return 'Maybe'
+    if ('not applicable' in s) or ('பொருந்தாது' in s):
         return 'Not Applicable'
-    if 'excellent' in s or 'மிகநன்று' in s or 'மிக நன்று' in s:
-        return 'Excellent'
-    if 'good' in s or 'நன்று' in s:
-        return 'Good'
-    if 'average' in s or 'satisfactory' in s or 'திருப்தி' in s or 'சராசரி' in s:
-        return 'Average'
-    if 'poor' in s or 'மோசம்' in s or 'needs' in s or 'need' in s or 'improve' in s or 'முன்னேற்றம்' in s:
-        return 'Poor'
-    try:
-        n = int(float(str(value).strip()))
-        if n == 5:
-            return 'Excellent'
-        if n == 4:
-            return 'Good'
-        if n == 3:
-            return 'Average'
-        if n in (1, 2):
-            return 'Poor'
-    except Exception:
-        pass
     return None
 
-def bucket_from_numeric_avg(v):
-    if v is None or (isinstance(v, float) and np.isnan(v)):
-        return 'Unanswered'
-    try:
-        num = float(v)
-    except Exception:
-        return 'Unanswered'
-    if np.isnan(num):
-        return 'Unanswered'
-    r = int(round(num))
-    if r >= 5:
-        return 'Excellent'
-    if r == 4:
-        return 'Good'
-    if r == 3:
-        return 'Average'
-    if r <= 2:
-        return 'Poor'
-    return 'Unanswered'
-
-def bucket_counts_from_avg_series(series):
-    counts = {'Excellent': 0, 'Good': 0, 'Average': 0, 'Poor': 0, 'Not Applicable': 0, 'Unanswered': 0}
-    for v in series:
-        b = bucket_from_numeric_avg(v)
-        counts[b] = counts.get(b, 0) + 1
-    return counts
-
-def bucket_counts_from_rating_columns(df_subset, cols):
-    counts = {'Excellent': 0, 'Good': 0, 'Average': 0, 'Poor': 0, 'Not Applicable': 0, 'Unanswered': 0}
-    for col in cols:
-        if col not in df_subset.columns:
-            continue
-        for v in df_subset[col].values:
-            if pd.isna(v) or v == '':
-                counts['Unanswered'] += 1
-                continue
-            cat = canonicalize_rating(v)
-            if cat is None:
-                counts['Unanswered'] += 1
-            else:
-                counts[cat] = counts.get(cat, 0) + 1
-    return counts
-
-def normalize_rating(value):
-    """Convert rating strings to numeric values"""
-    if pd.isna(value) or value == '':
-        return 0
-    value_str = str(value).strip()
-    if value_str in rating_map:
-        return rating_map[value_str]
-    # Fallback: canonicalize and map
-    cat = canonicalize_rating(value_str)
-    if cat == 'Excellent':
-        return 5
-    if cat == 'Good':
-        return 4
-    if cat == 'Average':
-        return 3
-    if cat == 'Poor':
-        return 1
-    if cat == 'Not Applicable':
-        return 0
-    return 0
-
-# Extract key columns
-branch_col = CANON_BRANCH_COL
-class_col = CANON_CLASS_COL
-orientation_col = CANON_ORIENTATION_COL
-language_col = CANON_LANGUAGE_COL
+# Canonical key columns and the keywords used to resolve them when headers differ
+KEY_COLUMN_KEYWORDS = [
+    ('branch_col', CANON_BRANCH_COL, ['name of the branch', 'branch', 'கிளை']),
+    ('class_col', CANON_CLASS_COL, ['class', 'வகுப்பு']),
+    ('orientation_col', CANON_ORIENTATION_COL, ['orientation', 'பயிற்சி']),
+    ('language_col', CANON_LANGUAGE_COL, ['ii language', 'language', 'இரண்டாம்', 'மொழி']),
+]
 
 def normalize_branch_name(s):
     if pd.isna(s):
@@ -303,7 +388,7 @@ def resolve_column_name(df_in, expected, keywords):
     best = None
     best_score = 0
     for c in cols:
-        low = _normalize_text(c)
+        low = normalize_header(c)
         score = sum(1 for kw in keywords if kw in low)
         if score > best_score:
             best_score = score
@@ -316,953 +401,802 @@ def resolve_or_create(df_in, expected, keywords):
         df_in[col] = None
     return col
 
-branch_col = resolve_or_create(df, branch_col, ['name of the branch', 'branch', 'கிளை'])
-class_col = resolve_or_create(df, class_col, ['class', 'வகுப்பு'])
-orientation_col = resolve_or_create(df, orientation_col, ['orientation', 'பயிற்சி'])
-language_col = resolve_or_create(df, language_col, ['ii language', 'language', 'இரண்டாம்', 'மொழி'])
-
-# Normalize branch names
-df[branch_col] = df[branch_col].apply(normalize_branch_name)
-# Club similar branch names: compute canonical key and remap to most frequent display variant
-try:
-    df['BranchKey'] = df[branch_col].apply(branch_canonical_key)
+def branch_display_names(branch_names):
+    """BranchKey -> display name from {BranchKey: {spelling: responses}}: the most frequent
+    spelling, ties to the shortest"""
     display_map = {}
-    for key, grp in df.groupby('BranchKey'):
-        name_counts = grp[branch_col].value_counts()
-        # choose most frequent; tie-breaker: shortest name
-        top_count = name_counts.max()
+    for key, name_counts in branch_names.items():
+        top_count = max(name_counts.values())
         candidates = [n for n, c in name_counts.items() if c == top_count]
-        display = sorted(candidates, key=lambda x: (len(str(x)), str(x)))[0]
-        display_map[key] = display
-    df[branch_col] = df['BranchKey'].map(display_map).fillna(df[branch_col])
-    df.drop(columns=['BranchKey'], inplace=True)
-except Exception:
-    pass
-
-df[class_col] = df[class_col].fillna('Unknown').str.strip()
-df[orientation_col] = df[orientation_col].fillna('Unknown').str.strip()
-df[language_col] = df[language_col].fillna('Unknown').str.strip()
-
-# Subject feedback columns (dynamic detection across segments)
-subject_cols = {}
-for col in df.columns:
-    lowc = str(col).lower()
-    if 'subject wise feedback' in lowc:
-        # Extract name inside square brackets if present
-        m = re.search(r'\[(.*?)\]', str(col))
-        if m:
-            name = m.group(1).strip()
-        else:
-            # Fallback: take text after the keyword
-            name = str(col).split(')', 1)[-1].strip()[:60]
-        # Shorten noisy names
-        name = re.sub(r'\s+', ' ', name)
-        name = name.replace('skills', '').replace(' - ', ' ').strip()
-        # Avoid duplicates
-        base = name if name else 'Subject'
-        key = base
-        i = 2
-        while key in subject_cols:
-            key = f"{base} {i}"
-            i += 1
-        subject_cols[key] = col
-
-# Environment quality columns (shortened names for analysis)
-env_cols = {}
-infra_cols = {}
-parent_cols = {}
-admin_cols = {}
-excellence_cols = {}
-
-for col in df.columns:
-    lowc = str(col).lower()
-    if 'overall quality of the school environment' in lowc:
-        match = re.search(r'\[(.*?)\]', col)
-        if match:
-            key = match.group(1).split('(')[0].strip()[:50]
-            env_cols[key] = col
-    elif 'overall school infrastructure' in lowc:
-        match = re.search(r'\[(.*?)\]', col)
-        if match:
-            key = match.group(1).split('(')[0].strip()[:50]
-            infra_cols[key] = col
-    elif ('parent-teacher' in lowc or 'parent–teacher' in lowc or 'ptm' in lowc):
-        match = re.search(r'\[(.*?)\]', col)
-        if match:
-            key = match.group(1).split('(')[0].strip()[:50]
-            parent_cols[key] = col
-    elif ('administration' in lowc or 'admin team' in lowc or 'front office' in lowc or 'leadership' in lowc or 'principal' in lowc or 'vice principal' in lowc or 'coordinator' in lowc or 'administrative support' in lowc):
-        match = re.search(r'\[(.*?)\]', col)
-        if match:
-            key = match.group(1).split('(')[0].strip()[:50]
-            admin_cols[key] = col
-    elif 'program for excellence' in lowc:
-        match = re.search(r'\[(.*?)\]', col)
-        if match:
-            key = match.group(1).split('(')[0].strip()[:80]
-            excellence_cols[key] = col
-
-# Convert ratings to numeric
-for col in df.columns:
-    if col not in [branch_col, class_col, orientation_col, language_col, 'Timestamp', 
-                   'Student Name( மாணவர் பெயர்)', 'SCS NUMBER( SCS எண்)',
-                   'Parent Name( பெற்றோர் பெயர்) ', 'Parent Phone Number( பெற்றோர் தொலைபேசி எண்)']:
-        df[col + '_numeric'] = df[col].apply(normalize_rating)
-
-# Calculate overall scores
-def existing_numeric(cols_dict):
-    return [col + '_numeric' for col in cols_dict.values() if (col + '_numeric') in df.columns]
-
-def rowwise_mean_from_cols(cols_dict):
-    series_list = []
-    for col in cols_dict.values():
-        if col in df.columns:
-            num_col = col + '_numeric'
-            if num_col in df.columns:
-                s = df[num_col]
-            else:
-                s = df[col].apply(normalize_rating)
-            series_list.append(s.replace(0, np.nan))
-    if not series_list:
-        return np.nan
-    return pd.concat(series_list, axis=1).mean(axis=1)
-
-subject_numeric_cols = existing_numeric(subject_cols)
-env_numeric_cols = existing_numeric(env_cols)
-infra_numeric_cols = existing_numeric(infra_cols)
-parent_numeric_cols = existing_numeric(parent_cols)
-admin_numeric_cols = existing_numeric(admin_cols)
-
-# Calculate average scores per student
-df['Subject_Avg'] = rowwise_mean_from_cols(subject_cols)
-df['Environment_Avg'] = rowwise_mean_from_cols(env_cols)
-df['Infrastructure_Avg'] = rowwise_mean_from_cols(infra_cols)
-df['Parent_Teacher_Avg'] = rowwise_mean_from_cols(parent_cols)
-df['Admin_Avg'] = rowwise_mean_from_cols(admin_cols)
-df['Overall_Avg'] = df[[col for col in df.columns if col.endswith('_numeric')]].replace(0, np.nan).mean(axis=1)
-
-# Additional column detections for advanced dashboards
-def find_columns(keyword_substrings):
-    cols = []
-    for col in df.columns:
-        low = str(col).lower()
-        if all(kw in low for kw in keyword_substrings):
-            cols.append(col)
-    return cols
-
-recommend_cols = [c for c in df.columns if 'recommend' in str(c).lower()]
-app_cols = [c for c in df.columns if ' app' in str(c).lower() or 'app ' in str(c).lower() or 'application' in str(c).lower()]
-transport_cols = [c for c in df.columns if 'transport' in str(c).lower()]
-ptm_cols = [c for c in df.columns if 'parent-teacher' in str(c).lower() or 'parent–teacher' in str(c).lower() or 'ptm' in str(c).lower()]
-
-def _communication_source_cols(df_subset):
-    cols = []
-    for col in df_subset.columns:
-        if str(col).endswith('_numeric'):
-            continue
-        low = str(col).lower()
-        if 'front office' in low or 'front-office' in low:
-            cols.append(col)
-        elif 'leadership' in low or 'principal access' in low or ('access' in low and 'principal' in low):
-            cols.append(col)
-        elif 'app' in low and ('usability' in low or 'use' in low):
-            cols.append(col)
-        elif 'timely updates' in low:
-            cols.append(col)
-    return cols
-
-def _rowwise_mean_from_list(df_subset, cols_list):
-    num_cols = [c + '_numeric' for c in cols_list if (c + '_numeric') in df_subset.columns]
-    if not num_cols:
-        return np.nan
-    return df_subset[num_cols].replace(0, np.nan).mean(axis=1)
-
-comm_cols_all = _communication_source_cols(df)
-df['Communication_Avg'] = _rowwise_mean_from_list(df, comm_cols_all)
-
-safety_cols = [col for key, col in env_cols.items() if ('secure' in str(key).lower() or 'safety' in str(key).lower() or 'security' in str(key).lower())]
-df['Safety_Avg'] = _rowwise_mean_from_list(df, safety_cols)
-
-hygiene_cols = [col for key, col in infra_cols.items() if ('hygiene' in str(key).lower() or 'clean' in str(key).lower())]
-df['Hygiene_Avg'] = _rowwise_mean_from_list(df, hygiene_cols)
-
-df['PTM_Avg'] = _rowwise_mean_from_list(df, ptm_cols)
-
-sat_cols = [c for c in df.columns if 'mention two areas' in str(c).lower() or 'most satisfied' in str(c).lower() or ('you are most satisfied' in str(c).lower())]
-improve_cols = [c for c in df.columns if 'further improve' in str(c).lower() or 'can further improve' in str(c).lower() or ('choose two areas' in str(c).lower() and 'improve' in str(c).lower())]
-
-# Teaching indicators
-clarity_cols = [c for c in df.columns if 'concept' in str(c).lower() or 'clarity' in str(c).lower()]
-approach_cols = [c for c in df.columns if 'approach' in str(c).lower() or 'approachability' in str(c).lower()]
-engagement_cols = [c for c in df.columns if 'engage' in str(c).lower() or 'stories' in str(c).lower() or 'rhymes' in str(c).lower() or 'activities' in str(c).lower()]
-comm_skill_cols = [c for c in df.columns if 'communication skills' in str(c).lower()]
-
-# Concern handling (role-wise)
-concern_roles_map = {}
-for col in df.columns:
-    low = str(col).lower()
-    if 'addresses my concerns' in low or 'handles my concerns' in low or 'addresses concerns' in low:
-        m = re.search(r'\[(.*?)\]', str(col))
-        if m:
-            role = m.group(1).strip()
-            concern_roles_map[role] = col
-
-# Concern resolution satisfaction (Yes/No/NA)
-concern_resolve_cols = [c for c in df.columns if ('handles concerns' in str(c).lower() or 'actions taken' in str(c).lower() or 'resolve' in str(c).lower()) and ('select' in str(c).lower() or 'not applicable' in str(c).lower())]
-
-def mean_cols(cols):
-    if not cols:
-        return None
-    num_cols = [c + '_numeric' for c in cols if c + '_numeric' in df.columns]
-    if not num_cols:
-        return None
-    return float(df[num_cols].replace(0, np.nan).mean(axis=1).mean())
-
-# Canonicalize rating label to one of: Excellent, Good, Average, Poor, Not Applicable
-def canonicalize_rating(value):
-    if pd.isna(value) or value == '':
-        return None
-    s = str(value).strip().lower()
-    # Tamil/localized variants included
-    if 'not applicable' in s or 'பொருந்தாது' in s:
-        return 'Not Applicable'
-    if 'excellent' in s or 'மிகநன்று' in s or 'மிக நன்று' in s:
-        return 'Excellent'
-    if 'good' in s or 'நன்று' in s:
-        return 'Good'
-    if 'average' in s or 'satisfactory' in s or 'திருப்தி' in s or 'சராசரி' in s:
-        return 'Average'
-    if 'poor' in s or 'மோசம்' in s or 'needs' in s or 'need' in s or 'improve' in s or 'முன்னேற்றம்' in s:
-        return 'Poor'
+        display_map[key] = sorted(candidates, key=lambda x: (len(str(x)), str(x)))[0]
+    return display_map
+
+def normalize_keys(df, branch_names=None):
+    """Resolve (or create) the key columns and clean their labels.
+
+    Similar branch spellings are clubbed under the most frequent variant, counted over df plus
+    branch_names ({BranchKey: {spelling: responses}} of responses an earlier run folded in).
+    Returns (df, key_cols, branch_names) with the combined spelling counts.
+    """
+    key_cols = {}
+    for role, expected, keywords in KEY_COLUMN_KEYWORDS:
+        key_cols[role] = resolve_or_create(df, expected, keywords)
+    branch_col = key_cols['branch_col']
+    class_col = key_cols['class_col']
+    orientation_col = key_cols['orientation_col']
+    language_col = key_cols['language_col']
+
+    # Normalize branch names
+    df[branch_col] = df[branch_col].apply(normalize_branch_name)
+    # Club similar branch names: compute canonical key and remap to most frequent display variant
+    branch_names = {key: dict(name_counts) for key, name_counts in (branch_names or {}).items()}
     try:
-        n = int(float(str(value).strip()))
-        if n == 5:
-            return 'Excellent'
-        if n == 4:
-            return 'Good'
-        if n == 3:
-            return 'Average'
-        if n in (1, 2):
-            return 'Poor'
+        df['BranchKey'] = df[branch_col].apply(branch_canonical_key)
+        for (key, name), n in df.groupby(['BranchKey', branch_col], sort=False).size().items():
+            name_counts = branch_names.setdefault(key, {})
+            name_counts[name] = name_counts.get(name, 0) + int(n)
+        df[branch_col] = df['BranchKey'].map(branch_display_names(branch_names)).fillna(df[branch_col])
+        df.drop(columns=['BranchKey'], inplace=True)
     except Exception:
         pass
-    return None
 
-def parse_reasons(value):
-    if pd.isna(value) or value == '':
-        return []
-    parts = re.split(r'[;|\n]+', str(value))
-    return [p.strip() for p in parts if p and p.strip()]
-
-def bucket_reason(text):
-    s = str(text).lower()
-    if 'no concerns' in s or 'மேற்கண்ட எதுவுமில்லை' in s:
-        return 'No Concerns'
-    if 'transport' in s:
-        return 'Transport'
-    if 'sports' in s:
-        return 'Sports'
-    if 'infrastructure' in s or 'facilities' in s or 'facility' in s:
-        return 'Infrastructure & Facilities'
-    if 'discipline' in s or 'values' in s:
-        return 'Discipline & Values'
-    if 'competition' in s or 'event' in s or 'celebration' in s:
-        return 'Events & Celebrations'
-    if 'student communication' in s or ('communication' in s and 'student' in s):
-        return 'Student Communication'
-    if 'communication' in s:
-        return 'Communication'
-    if 'app' in s:
-        return 'App'
-    if 'academics' in s or 'teaching' in s or 'stories' in s or 'rhymes' in s or 'activities' in s:
-        return 'Academics & Activities'
-    if 'environment' in s or 'hygiene' in s or 'clean' in s or 'safety' in s:
-        return 'Environment & Safety'
-    return 'Other'
-
-# Classify Yes/No/Maybe/Not Applicable for localized strings
-def classify_ynm(value):
-    if pd.isna(value) or value == '':
-        return None
-    s = str(value).strip().lower()
-    if ('yes' in s) or ('ஆம்' in s):
-        return 'Yes'
-    if ('no' in s) or ('இல்லை' in s):
-        return 'No'
-    if ('maybe' in s) or ('இருக்கலாம்' in s):
-        return 'Maybe'
-    if ('not applicable' in s) or ('பொருந்தாது' in s):
-        return 'Not Applicable'
-    return None
+    df[class_col] = df[class_col].fillna('Unknown').str.strip()
+    df[orientation_col] = df[orientation_col].fillna('Unknown').str.strip()
+    df[language_col] = df[language_col].fillna('Unknown').str.strip()
+    return df, key_cols, branch_names
+
+def add_numeric_scores(df, rating_cols):
+    """Add an int8 *_numeric score for every rating column: 1-5, or the NOT_APPLICABLE_SCORE /
+    UNANSWERED_SCORE codes of rating_labels, which rated() leaves out of every average"""
+    numeric_cols = {}
+    for col in rating_cols:
+        numeric_cols[col + '_numeric'] = normalize_rating_series(df[col])
+    if numeric_cols:
+        df = pd.concat([df, pd.DataFrame(numeric_cols, index=df.index)], axis=1)
+    return df
 
-# Create comprehensive statistics
-stats = {
-    'summary': {
-        'total_responses': len(df),
-        'branches': df[branch_col].value_counts().to_dict(),
-        'classes': df[class_col].value_counts().to_dict(),
-        'orientations': df[orientation_col].value_counts().to_dict(),
-        'languages': df[language_col].value_counts().to_dict()
-    },
-    'branch_performance': {},
-    'orientation_performance': {},
-    'class_performance': {},
-    'subject_performance': {},
-    'category_performance': {
-        'Environment Quality': {},
-        'Infrastructure': {},
-        'Parent-Teacher Interaction': {},
-        'Administrative Support': {}
-    },
-    'branch_category_performance': {},
-    'overall_rating_counts': {},
-    'overall_rating_counts_by_branch': {},
-    'communication_metrics_detail': {},
-    'communication_metrics_detail_by_branch': {},
-    'program_excellence': {},
-    'program_excellence_by_branch': {}
-}
-
-# Branch-wise analysis
-for branch in df[branch_col].unique():
-    if branch and branch != 'Unknown' and branch != '':
-        branch_data = df[df[branch_col] == branch]
-        stats['branch_performance'][branch] = {
-            'count': len(branch_data),
-            'subject_avg': float(branch_data['Subject_Avg'].mean()),
-            'environment_avg': float(branch_data['Environment_Avg'].mean()),
-            'infrastructure_avg': float(branch_data['Infrastructure_Avg'].mean()),
-            'parent_teacher_avg': float(branch_data['Parent_Teacher_Avg'].mean()),
-            'admin_avg': float(branch_data['Admin_Avg'].mean()),
-            'overall_avg': float(branch_data['Overall_Avg'].mean())
-        }
+def compact_response_frame(df, roles):
+    """Store the key dimensions, Segment and the rating / reason text columns as Categorical.
+
+    These hold a few dozen distinct labels each, so codes + categories take a fraction of the
+    memory of one Python string per cell; identifier columns stay as they are.
+    """
+    cols = [roles[k] for k in ('branch_col', 'class_col', 'orientation_col', 'language_col')] + ['Segment']
+    cols += [c[:-len('_numeric')] for c in df.columns if c.endswith('_numeric')]
+    cols += roles['sat_cols'] + roles['improve_cols']
+    for col in dict.fromkeys(cols):
+        if col in df.columns and (pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])):
+            df[col] = df[col].astype('category')
+    return df
 
-# Orientation-wise analysis
-for orientation in df[orientation_col].unique():
-    if orientation and orientation != 'Unknown' and orientation != '':
-        orient_data = df[df[orientation_col] == orientation]
-        stats['orientation_performance'][orientation] = {
-            'count': len(orient_data),
-            'subject_avg': float(orient_data['Subject_Avg'].mean()),
-            'environment_avg': float(orient_data['Environment_Avg'].mean()),
-            'infrastructure_avg': float(orient_data['Infrastructure_Avg'].mean()),
-            'parent_teacher_avg': float(orient_data['Parent_Teacher_Avg'].mean()),
-            'admin_avg': float(orient_data['Admin_Avg'].mean()),
-            'overall_avg': float(orient_data['Overall_Avg'].mean())
-        }
+def normalize_responses(df, branch_names=None, timer=None):
+    """Clean key columns, add *_numeric scores and look up column roles.
+
+    Returns (df, roles, branch_names); roles maps names such as 'branch_col', 'subject_cols' or
+    'recommend_cols' to the headers every aggregation reads (column_roles.resolve_roles, cached
+    per header set in ROLES), branch_names is normalize_keys' spelling count per branch.
+    """
+    timer = timer if timer is not None else StageTimer()
+    with timer.stage('keys', df):
+        df, key_cols, branch_names = normalize_keys(df, branch_names)
+    with timer.stage('roles'):
+        roles = ROLES.resolve(df.columns, key_cols)
+    with timer.stage('ratings') as size:
+        df = add_numeric_scores(df, roles['rating_cols'])
+        size['rows'], size['cols'] = df.shape
+    with timer.stage('compact'):
+        df = compact_response_frame(df, roles)
+    return df, roles, branch_names
+
+def init_stats(totals):
+    """Summary counts plus the empty sections later stages fill in"""
+    stats = {
+        'summary': {
+            'total_responses': int(totals['cell'].n.sum()),
+            'branches': group_counts(totals.rollup('cell', ['branch'])),
+            'classes': group_counts(totals['class']),
+            'orientations': group_counts(totals['orientation']),
+            'languages': group_counts(totals['language'])
+        },
+        'branch_performance': {},
+        'orientation_performance': {},
+        'class_performance': {},
+        'subject_performance': {},
+        'category_performance': {
+            'Environment Quality': {},
+            'Infrastructure': {},
+            'Parent-Teacher Interaction': {},
+            'Administrative Support': {}
+        },
+        'branch_category_performance': {},
+        'overall_rating_counts': {},
+        'overall_rating_counts_by_branch': {},
+        'communication_metrics_detail': {},
+        'communication_metrics_detail_by_branch': {},
+        'program_excellence': {},
+        'program_excellence_by_branch': {}
+    }
+    return stats
+
+# Response totals: every section below is built from the GroupTotals of grouping, folded once
+# from the normalized frame (or added to the saved totals by --incremental). Grains: 'cell' =
+# (branch, segment), 'class', 'orientation', 'language', 'cube' = (branch, class, orientation)
+# and 'reasons' = (branch, segment, status).
+
+# Performance aggregates: count plus the six per-respondent average means
+PERFORMANCE_FIELDS = [
+    ('subject_avg', 'Subject_Avg'),
+    ('environment_avg', 'Environment_Avg'),
+    ('infrastructure_avg', 'Infrastructure_Avg'),
+    ('parent_teacher_avg', 'Parent_Teacher_Avg'),
+    ('admin_avg', 'Admin_Avg'),
+    ('overall_avg', 'Overall_Avg'),
+]
+TEACHING_INDICATORS = [
+    ('Concept Clarity', 'clarity_cols'),
+    ('Teacher Approachability', 'approach_cols'),
+    ('Engagement', 'engagement_cols'),
+    ('Communication Skills', 'comm_skill_cols'),
+]
+# Low bits of a reason's first row that order the reasons of one response
+REASON_SUB_BITS = 16
+
+def respondent_average_columns(df, roles):
+    """{name: rating columns} of the per-respondent averages (mean of a respondent's answered
+    scores over the columns): the *_Avg names of PERFORMANCE_FIELDS / AVG_RATING_COUNT_COLUMNS,
+    App_Avg, Transport_Avg, 'teaching:<indicator>' and 'comm:<metric>'"""
+    def present(cols):
+        return [c for c in cols.values() if c in df.columns]
+
+    def scored(cols):
+        return [c for c in cols if c + '_numeric' in df.columns]
+
+    averages = {
+        'Subject_Avg': present(roles['subject_cols']),
+        'Environment_Avg': present(roles['env_cols']),
+        'Infrastructure_Avg': present(roles['infra_cols']),
+        'Parent_Teacher_Avg': present(roles['parent_cols']),
+        'Admin_Avg': present(roles['admin_cols']),
+        'Overall_Avg': [c[:-len('_numeric')] for c in df.columns if c.endswith('_numeric')],
+        'Communication_Avg': scored(roles['comm_cols_all']),
+        'Safety_Avg': scored(roles['safety_cols']),
+        'Hygiene_Avg': scored(roles['hygiene_cols']),
+        'PTM_Avg': scored(roles['ptm_cols']),
+        'App_Avg': scored(roles['app_cols']),
+        'Transport_Avg': scored(roles['transport_cols']),
+    }
+    for label, role in TEACHING_INDICATORS:
+        averages['teaching:' + label] = scored(roles[role])
+    for label, cols in roles['comm_metric_cols'].items():
+        averages['comm:' + label] = scored(cols)
+    return averages
+
+def distribution_columns(roles):
+    """Rating and Yes/No columns whose answer label counts are kept per (branch, segment)"""
+    cols = []
+    for role in ('subject_cols', 'env_cols', 'infra_cols', 'parent_cols', 'admin_cols',
+                 'excellence_cols', 'env_focus_cols', 'concern_roles_map'):
+        cols += roles[role].values()
+    cols += roles['recommend_cols'] + roles['concern_resolve_cols']
+    return list(dict.fromkeys(cols))
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+def _add_average_tables(totals, codes, name, score_sum, answered, n_cols, with_buckets):
+    """Respondents and score sums per number of answered columns (1..n_cols) of one
+    per-respondent average, plus the AVG_BUCKETS counts of the averages when asked"""
+    ks = list(range(1, n_cols + 1))
+    totals.tables['answered:' + name] = CountTable.from_codes(codes, len(totals), answered - 1, ks)
+    totals.tables['score_sum:' + name] = CountTable.from_codes(codes, len(totals), answered - 1, ks, weights=score_sum)
+    if with_buckets:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averages = np.where(answered > 0, score_sum / np.maximum(answered, 1), np.nan)
+        totals.tables['buckets:' + name] = CountTable.from_codes(codes, len(totals), avg_bucket_codes(averages), AVG_BUCKETS)
+
+def _summed_table(key, code_arrays, labels):
+    """CountTable of (groups x labels) counts summed over several per-row code arrays"""
+    counts = np.zeros((key.n, len(labels)), dtype=np.int64)
+    for codes in code_arrays:
+        counts += key.bincount(codes, len(labels))
+    return CountTable(labels, counts)
+
+def reason_totals(table, rows):
+    """GroupTotals of the exploded reasons per (branch, segment, status), with a 'reason' table.
+    A reason's first row is its response's row, its position within the response in the low
+    REASON_SUB_BITS, so merged counters keep the row-by-row first-appearance order."""
+    dims = ('branch', 'segment', 'status')
+    if table.empty:
+        empty = np.zeros((0, 0), dtype=np.int64)
+        return GroupTotals(dims, [], [], [], {'reason': CountTable([], empty, empty)}, REASON_SUB_BITS)
+    within = table.groupby('row', sort=False).cumcount().to_numpy()
+    order = (rows[table['row'].to_numpy(dtype=np.int64)] << REASON_SUB_BITS) | within
+    codes, keys = pd.factorize(pd.MultiIndex.from_arrays([table['branch'], table['segment'], table['status']]))
+    totals = GroupTotals.from_codes(dims, codes, list(keys), order, REASON_SUB_BITS)
+    reason_codes, reasons = pd.factorize(table['reason'])
+    totals.tables['reason'] = CountTable.from_codes(codes, len(totals), reason_codes, list(reasons), rows=order)
+    return totals
+
+def response_totals(df, roles, reason_table, rows=None):
+    """Fold a normalized response frame into the ResponseTotals aggregate_stats reads.
+
+    rows are the responses' positions in the whole response set (default 0..n-1); an
+    --incremental run folds only its new responses and adds them to the saved totals.
+    """
+    rows = np.arange(len(df), dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+    branch = GroupKey.from_series(df[roles['branch_col']])
+    class_ = GroupKey.from_series(df[roles['class_col']])
+    orientation = GroupKey.from_series(df[roles['orientation_col']])
+    language = GroupKey.from_series(df[roles['language_col']])
+    cell = branch.pair(GroupKey.from_series(df['Segment']))
+    cube = branch.pair(class_).pair(orientation)
+
+    def grain(dims, key, keys=None):
+        keys = keys if keys is not None else [k if isinstance(k, tuple) else (k,) for k in key.labels]
+        return GroupTotals.from_codes(dims, key.codes, keys, rows)
+
+    cells = grain(('branch', 'segment'), cell)
+    classes = grain(('class',), class_)
+    orientations = grain(('orientation',), orientation)
+    cubes = grain(('branch', 'class', 'orientation'), cube, [(b, c, o) for (b, c), o in cube.labels])
+
+    for col in distribution_columns(roles):
+        if col in df.columns:
+            codes, labels = pd.factorize(df[col], use_na_sentinel=True)
+            cells.tables['labels:' + col] = CountTable.from_codes(cell.codes, len(cells), codes, [_plain(v) for v in labels], rows=rows)
+
+    scores = {}
+    def respondent_scores(cols):
+        """(score sum, answered columns) per row over cols; N/A and blank answers skipped"""
+        score_sum = np.zeros(len(df), dtype=np.int64)
+        answered = np.zeros(len(df), dtype=np.int64)
+        for col in cols:
+            if col not in scores:
+                num_col = col + '_numeric'
+                values = df[num_col].to_numpy() if num_col in df.columns else LABELS.scores(df[col])
+                ok = rated(values)
+                scores[col] = (np.where(ok, values, 0), ok)
+            score_sum += scores[col][0]
+            answered += scores[col][1]
+        return score_sum, answered
+
+    averages = respondent_average_columns(df, roles)
+    for name, cols in averages.items():
+        score_sum, answered = respondent_scores(cols)
+        _add_average_tables(cells, cell.codes, name, score_sum, answered, len(cols), with_buckets=True)
+        if name in {avg for _field, avg in PERFORMANCE_FIELDS}:
+            for totals, key in ((classes, class_), (orientations, orientation)):
+                _add_average_tables(totals, key.codes, name, score_sum, answered, len(cols), with_buckets=False)
+
+    cubes.tables['recommendation'] = _summed_table(cube, [ynm_codes(df[c]) for c in roles['recommend_cols']], REC_BUCKETS)
+    for name, role in RATING_COUNT_GROUPS:
+        code_arrays = [LABELS.bucket_codes(df[c]) for c in roles[role].values() if c in df.columns]
+        cubes.tables['ratings:' + name] = _summed_table(cube, code_arrays, RATING_BUCKETS)
+
+    return ResponseTotals({
+        'cell': cells,
+        'class': classes,
+        'orientation': orientations,
+        'language': grain(('language',), language),
+        'cube': cubes,
+        'reasons': reason_totals(reason_table, rows),
+    })
+
+def group_counts(totals):
+    """{label: responses} like value_counts(): counts descending, ties by first appearance"""
+    order = sorted(range(len(totals)), key=lambda i: (-totals.n[i], totals.first[i]))
+    return {totals.labels[i]: int(totals.n[i]) for i in order}
+
+def has_column(totals, col):
+    return 'labels:' + col in totals.tables
+
+def column_means(totals, col):
+    """Mean score of a rating column per group (N/A and blank answers skipped, NaN when none)"""
+    table = totals.table('labels:' + col)
+    scores = np.array([LABELS.resolve(label)[1] for label in table.labels], dtype=np.int64)
+    ok = rated(scores)
+    counts = table.counts[:, ok]
+    answered = counts.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(answered > 0, (counts @ scores[ok]) / np.maximum(answered, 1), np.nan)
+
+def rating_bucket_table(totals, cols):
+    """(groups x RATING_BUCKETS) answer counts summed over the rating columns that exist"""
+    pos = {b: i for i, b in enumerate(RATING_BUCKETS)}
+    out = np.zeros((len(totals), len(RATING_BUCKETS)), dtype=np.int64)
+    for col in cols:
+        if not has_column(totals, col):
+            continue
+        table = totals.table('labels:' + col)
+        for j, label in enumerate(table.labels):
+            b = pos.get(LABELS.resolve(label)[0])
+            if b is not None:
+                out[:, b] += table.counts[:, j]
+    return out
 
-# Class-wise analysis
-for class_name in df[class_col].unique():
-    if class_name and class_name != 'Unknown' and class_name != '':
-        class_data = df[df[class_col] == class_name]
-        stats['class_performance'][class_name] = {
-            'count': len(class_data),
-            'subject_avg': float(class_data['Subject_Avg'].mean()),
-            'environment_avg': float(class_data['Environment_Avg'].mean()),
-            'infrastructure_avg': float(class_data['Infrastructure_Avg'].mean()),
-            'parent_teacher_avg': float(class_data['Parent_Teacher_Avg'].mean()),
-            'admin_avg': float(class_data['Admin_Avg'].mean()),
-            'overall_avg': float(class_data['Overall_Avg'].mean())
-        }
+def ynm_table(totals, cols):
+    """(groups x REC_BUCKETS) answer counts summed over cols"""
+    pos = {b: i for i, b in enumerate(REC_BUCKETS)}
+    out = np.zeros((len(totals), len(REC_BUCKETS)), dtype=np.int64)
+    for col in cols:
+        table = totals.table('labels:' + col)
+        for j, label in enumerate(table.labels):
+            b = pos.get(classify_ynm(label))
+            if b is not None:
+                out[:, b] += table.counts[:, j]
+    return out
 
-# Subject-wise analysis (overall)
-for subject_name, subject_col in subject_cols.items():
-    if subject_col not in df.columns:
-        continue
-    num_col = subject_col + '_numeric'
-    if num_col in df.columns:
-        ratings = df[num_col].replace(0, np.nan)
-    else:
-        ratings = df[subject_col].apply(normalize_rating).replace(0, np.nan)
-    stats['subject_performance'][subject_name] = {
-        'average': float(ratings.mean()),
-        'excellent_count': int((df[subject_col].astype(str).str.lower().str.contains('excellent')).sum()),
-        'good_count': int((df[subject_col].astype(str).str.lower().str.contains('good')).sum()),
-        'average_count': int((df[subject_col].astype(str).str.lower().str.contains('average|satisfactory|திருப்தி|சராசரி')).sum()),
-        'poor_count': int((df[subject_col].astype(str).str.lower().str.contains('poor|need|needs|improve|முன்னேற்றம்|மோசம்')).sum()),
-        'rating_distribution': df[subject_col].value_counts().to_dict()
-    }
+def score_bucket_table(totals, col):
+    """(groups x AVG_BUCKETS) counts of a column's scores bucketed like respondent averages
+    (N/A, blank and unrecognised answers -> Unanswered)"""
+    table = totals.table('labels:' + col)
+    scores = np.array([LABELS.resolve(label)[1] for label in table.labels], dtype=np.int64)
+    codes = avg_bucket_codes(np.where(rated(scores), scores, np.nan))
+    out = np.zeros((len(totals), len(AVG_BUCKETS)), dtype=np.int64)
+    for j, code in enumerate(codes):
+        if rated(scores[j]):
+            out[:, code] += table.counts[:, j]
+    out[:, AVG_BUCKETS.index('Unanswered')] += totals.n - out.sum(axis=1)
+    return out
 
-# Per-branch subject-wise analysis
-branch_subject_perf = {}
-for branch, group in df.groupby(branch_col):
-    subd = {}
+def average_means(totals, name):
+    """Mean per group of a per-respondent average over the respondents who answered any of its
+    columns (NaN when none did). Exact: the score sums per number of answered columns are
+    brought to a common denominator, so the result does not depend on how rows were folded."""
+    answered = totals.table('answered:' + name)
+    score_sum = totals.table('score_sum:' + name)
+    ks = [int(k) for k in answered.labels]
+    common = math.lcm(*ks)
+    sums = score_sum.counts[:, [score_sum.labels.index(k) for k in answered.labels]]
+    means = np.full(len(totals), np.nan)
+    for i in range(len(totals)):
+        respondents = int(answered.counts[i].sum())
+        if respondents:
+            means[i] = sum(int(s) * (common // k) for k, s in zip(ks, sums[i])) / (common * respondents)
+    return means
+
+def average_or_none(totals, name):
+    """Overall mean of a per-respondent average, None when it has no scored column"""
+    if not totals.table('answered:' + name).labels:
+        return None
+    return float(average_means(totals, name)[0])
+
+def average_bucket_table(totals, name):
+    table = totals.table('buckets:' + name)
+    return np.column_stack([table.column(b) for b in AVG_BUCKETS])
+
+def performance(totals):
+    """[{'count', <PERFORMANCE_FIELDS>...}] for every group"""
+    means = [(field, average_means(totals, name)) for field, name in PERFORMANCE_FIELDS]
+    return [dict({'count': int(totals.n[i])}, **{field: float(m[i]) for field, m in means}) for i in range(len(totals))]
+
+def _is_known_label(value):
+    return bool(value) and value != 'Unknown' and value != ''
+
+def _known_group_performance(totals):
+    """{label: performance} in first-appearance order, without blank / Unknown labels"""
+    perf = performance(totals)
+    labels = totals.labels
+    return {labels[i]: perf[i] for i in totals.appearance_order() if _is_known_label(labels[i])}
+
+def add_group_performance(stats, totals):
+    stats['branch_performance'] = _known_group_performance(totals.rollup('cell', ['branch']))
+    stats['orientation_performance'] = _known_group_performance(totals['orientation'])
+    stats['class_performance'] = _known_group_performance(totals['class'])
+
+def add_subject_performance(stats, totals, roles):
+    subject_cols = roles['subject_cols']
+    # Subject-wise analysis (overall)
+    overall = totals.rollup('cell', [])
     for subject_name, subject_col in subject_cols.items():
-        if subject_col not in group.columns:
+        if not has_column(overall, subject_col):
             continue
-        num_col = subject_col + '_numeric'
-        if num_col in group.columns:
-            ratings = group[num_col].replace(0, np.nan)
-        else:
-            ratings = group[subject_col].apply(normalize_rating).replace(0, np.nan)
-        dist = group[subject_col].value_counts().to_dict()
-        subd[subject_name] = {
-            'average': float(ratings.mean()),
-            'rating_distribution': dist
+        buckets = rating_bucket_table(overall, [subject_col])[0]
+        stats['subject_performance'][subject_name] = {
+            'average': float(column_means(overall, subject_col)[0]),
+            'excellent_count': int(buckets[0]),
+            'good_count': int(buckets[1]),
+            'average_count': int(buckets[2]),
+            'poor_count': int(buckets[3]),
+            'rating_distribution': overall.table('labels:' + subject_col).per_group(0)
         }
-    branch_subject_perf[branch] = subd
-stats['branch_subject_performance'] = branch_subject_perf
 
-# Global per-segment subject-wise analysis
-segment_subject_perf = {}
-for seg, gseg in df.groupby('Segment'):
-    subd = {}
-    for subject_name, subject_col in subject_cols.items():
-        if subject_col not in gseg.columns:
-            continue
-        dist = gseg[subject_col].dropna().value_counts().to_dict()
-        total = sum(dist.values())
-        if total == 0:
-            continue
-        num_col = subject_col + '_numeric'
-        if num_col in gseg.columns:
-            ratings = gseg[num_col].replace(0, np.nan)
-        else:
-            ratings = gseg[subject_col].apply(normalize_rating).replace(0, np.nan)
-        subd[subject_name] = {
-            'average': float(ratings.mean()),
-            'rating_distribution': dist
-        }
-    if subd:
-        segment_subject_perf[seg] = subd
-stats['segment_subject_performance'] = segment_subject_perf
-
-# Per-branch, per-segment, subject-wise analysis
-branch_segment_subject_perf = {}
-for branch, g_branch in df.groupby(branch_col):
-    branch_segment_subject_perf[branch] = {}
-    for seg, gseg in g_branch.groupby('Segment'):
-        subd = {}
+    def subject_perf_by(groups, skip_unrated):
+        """Per group: {subject: {average, rating_distribution}}"""
+        per_group = [{} for _ in range(len(groups))]
         for subject_name, subject_col in subject_cols.items():
-            if subject_col not in gseg.columns:
-                continue
-            dist = gseg[subject_col].dropna().value_counts().to_dict()
-            total = sum(dist.values())
-            if total == 0:
+            if not has_column(groups, subject_col):
                 continue
-            num_col = subject_col + '_numeric'
-            if num_col in gseg.columns:
-                ratings = gseg[num_col].replace(0, np.nan)
-            else:
-                ratings = gseg[subject_col].apply(normalize_rating).replace(0, np.nan)
-            subd[subject_name] = {
-                'average': float(ratings.mean()),
-                'rating_distribution': dist
-            }
+            means = column_means(groups, subject_col)
+            table = groups.table('labels:' + subject_col)
+            for i in range(len(groups)):
+                dist = table.per_group(i)
+                if skip_unrated and not dist:
+                    continue
+                per_group[i][subject_name] = {
+                    'average': float(means[i]),
+                    'rating_distribution': dist
+                }
+        return per_group
+
+    # Per-branch subject-wise analysis
+    branches = totals.rollup('cell', ['branch'])
+    stats['branch_subject_performance'] = dict(zip(branches.labels, subject_perf_by(branches, skip_unrated=False)))
+
+    # Global per-segment subject-wise analysis (segments / subjects without answers are left out)
+    segments = totals.rollup('cell', ['segment'])
+    per_segment = subject_perf_by(segments, skip_unrated=True)
+    stats['segment_subject_performance'] = {seg: subd for seg, subd in zip(segments.labels, per_segment) if subd}
+
+    # Per-branch, per-segment, subject-wise analysis
+    pairs = totals.rollup('cell', ['branch', 'segment'])
+    branch_segment_subject_perf = {branch: {} for branch in branches.labels}
+    for (branch, seg), subd in zip(pairs.labels, subject_perf_by(pairs, skip_unrated=True)):
         if subd:
             branch_segment_subject_perf[branch][seg] = subd
-stats['branch_segment_subject_performance'] = branch_segment_subject_perf
-
-# Environment quality detailed analysis (overall)
-for env_name, env_col in env_cols.items():
-    env_numeric = env_col + '_numeric'
-    ratings = df[env_numeric].replace(0, np.nan)
-    stats['category_performance']['Environment Quality'][env_name] = {
-        'average': float(ratings.mean()),
-        'rating_distribution': df[env_col].value_counts().to_dict()
-    }
-
-# Infrastructure detailed analysis (overall)
-for infra_name, infra_col in infra_cols.items():
-    infra_numeric = infra_col + '_numeric'
-    ratings = df[infra_numeric].replace(0, np.nan)
-    stats['category_performance']['Infrastructure'][infra_name] = {
-        'average': float(ratings.mean()),
-        'rating_distribution': df[infra_col].value_counts().to_dict()
-    }
-
-# Parent-Teacher interaction analysis (overall)
-for parent_name, parent_col in parent_cols.items():
-    parent_numeric = parent_col + '_numeric'
-    ratings = df[parent_numeric].replace(0, np.nan)
-    stats['category_performance']['Parent-Teacher Interaction'][parent_name] = {
-        'average': float(ratings.mean()),
-        'rating_distribution': df[parent_col].value_counts().to_dict()
-    }
-
-# Administrative support analysis (overall)
-for admin_name, admin_col in admin_cols.items():
-    admin_numeric = admin_col + '_numeric'
-    ratings = df[admin_numeric].replace(0, np.nan)
-    stats['category_performance']['Administrative Support'][admin_name] = {
-        'average': float(ratings.mean()),
-        'rating_distribution': df[admin_col].value_counts().to_dict()
-    }
+    stats['branch_segment_subject_performance'] = branch_segment_subject_perf
+
+CATEGORY_ROLES = [
+    ('Environment Quality', 'env_cols'),
+    ('Infrastructure', 'infra_cols'),
+    ('Parent-Teacher Interaction', 'parent_cols'),
+    ('Administrative Support', 'admin_cols'),
+]
+
+def add_category_performance(stats, totals, roles):
+    # Environment quality, infrastructure, parent-teacher interaction and administrative support (overall)
+    overall = totals.rollup('cell', [])
+    for category, role in CATEGORY_ROLES:
+        for name, col in roles[role].items():
+            stats['category_performance'][category][name] = {
+                'average': float(column_means(overall, col)[0]),
+                'rating_distribution': overall.table('labels:' + col).per_group(0)
+            }
 
-branch_cat_perf = {}
-for branch, group in df.groupby(branch_col):
-    out = {
-        'Environment Quality': {},
-        'Infrastructure': {},
-        'Parent-Teacher Interaction': {},
-        'Administrative Support': {}
-    }
-    for env_name, env_col in env_cols.items():
-        env_numeric = env_col + '_numeric'
-        if env_numeric not in group.columns:
-            continue
-        ratings = group[env_numeric].replace(0, np.nan)
-        out['Environment Quality'][env_name] = {
-            'average': float(ratings.mean()),
-            'rating_distribution': group[env_col].value_counts().to_dict()
-        }
-    for infra_name, infra_col in infra_cols.items():
-        infra_numeric = infra_col + '_numeric'
-        if infra_numeric not in group.columns:
-            continue
-        ratings = group[infra_numeric].replace(0, np.nan)
-        out['Infrastructure'][infra_name] = {
-            'average': float(ratings.mean()),
-            'rating_distribution': group[infra_col].value_counts().to_dict()
-        }
-    for parent_name, parent_col in parent_cols.items():
-        parent_numeric = parent_col + '_numeric'
-        if parent_numeric not in group.columns:
-            continue
-        ratings = group[parent_numeric].replace(0, np.nan)
-        out['Parent-Teacher Interaction'][parent_name] = {
-            'average': float(ratings.mean()),
-            'rating_distribution': group[parent_col].value_counts().to_dict()
-        }
-    for admin_name, admin_col in admin_cols.items():
-        admin_numeric = admin_col + '_numeric'
-        if admin_numeric not in group.columns:
-            continue
-        ratings = group[admin_numeric].replace(0, np.nan)
-        out['Administrative Support'][admin_name] = {
-            'average': float(ratings.mean()),
-            'rating_distribution': group[admin_col].value_counts().to_dict()
+    branches = totals.rollup('cell', ['branch'])
+    scored = set(roles['rating_cols'])
+    branch_cat_perf = {b: {category: {} for category, _role in CATEGORY_ROLES} for b in branches.labels}
+    for category, role in CATEGORY_ROLES:
+        for name, col in roles[role].items():
+            if col not in scored:
+                continue
+            means = column_means(branches, col)
+            table = branches.table('labels:' + col)
+            for i, b in enumerate(branches.labels):
+                branch_cat_perf[b][category][name] = {
+                    'average': float(means[i]),
+                    'rating_distribution': table.per_group(i)
+                }
+    stats['branch_category_performance'] = branch_cat_perf
+
+def add_program_excellence(stats, totals, roles):
+    scored = set(roles['rating_cols'])
+    excellence_cols = {name: col for name, col in roles['excellence_cols'].items() if col in scored}
+
+    def excellence(groups, i, col, means, buckets):
+        return {
+            'average': float(means[i]),
+            'rating_counts': {k: int(n) for k, n in zip(AVG_BUCKETS, buckets[i])},
+            'rating_distribution': groups.table('labels:' + col).per_group(i)
         }
-    branch_cat_perf[branch] = out
-stats['branch_category_performance'] = branch_cat_perf
-
-prog_exc = {}
-for name, col in excellence_cols.items():
-    num = col + '_numeric'
-    if num not in df.columns:
-        continue
-    ratings = df[num].replace(0, np.nan)
-    prog_exc[name] = {
-        'average': float(ratings.mean()),
-        'rating_counts': bucket_counts_from_avg_series(ratings),
-        'rating_distribution': df[col].value_counts().to_dict()
+
+    overall = totals.rollup('cell', [])
+    stats['program_excellence'] = {
+        name: excellence(overall, 0, col, column_means(overall, col), score_bucket_table(overall, col))
+        for name, col in excellence_cols.items()
     }
-stats['program_excellence'] = prog_exc
 
-prog_exc_by_branch = {}
-for branch, group in df.groupby(branch_col):
-    out = {}
+    branches = totals.rollup('cell', ['branch'])
+    prog_exc_by_branch = {b: {} for b in branches.labels}
     for name, col in excellence_cols.items():
-        num = col + '_numeric'
-        if num not in group.columns:
-            continue
-        ratings = group[num].replace(0, np.nan)
-        out[name] = {
-            'average': float(ratings.mean()),
-            'rating_counts': bucket_counts_from_avg_series(ratings),
-            'rating_distribution': group[col].value_counts().to_dict()
-        }
-    prog_exc_by_branch[branch] = out
-stats['program_excellence_by_branch'] = prog_exc_by_branch
+        means = column_means(branches, col)
+        buckets = score_bucket_table(branches, col)
+        for i, b in enumerate(branches.labels):
+            prog_exc_by_branch[b][name] = excellence(branches, i, col, means, buckets)
+    stats['program_excellence_by_branch'] = prog_exc_by_branch
 
 # Rankings - Top performers
 def create_ranking(data_dict, metric='overall_avg'):
     ranking = sorted(data_dict.items(), key=lambda x: x[1].get(metric, 0), reverse=True)
     return [(name, data[metric], data['count']) for name, data in ranking if not np.isnan(data.get(metric, 0))]
 
-stats['rankings'] = {
-    'branches': create_ranking(stats['branch_performance']),
-    'orientations': create_ranking(stats['orientation_performance']),
-    'classes': create_ranking(stats['class_performance']),
-    'subjects': [(name, data['average']) for name, data in 
-                 sorted(stats['subject_performance'].items(), key=lambda x: x[1]['average'], reverse=True)]
-}
-
-# Replace NaN values with None (null in JSON)
-def clean_nan(obj):
-    if isinstance(obj, dict):
-        return {k: clean_nan(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [clean_nan(item) for item in obj]
-    elif isinstance(obj, float) and np.isnan(obj):
-        return None
-    return obj
-
-
-# Executive summary KPIs and additional aggregations
-stats['summary']['overall_avg'] = float(df['Overall_Avg'].mean())
+def add_rankings(stats):
+    stats['rankings'] = {
+        'branches': create_ranking(stats['branch_performance']),
+        'orientations': create_ranking(stats['orientation_performance']),
+        'classes': create_ranking(stats['class_performance']),
+        'subjects': [(name, data['average']) for name, data in
+                     sorted(stats['subject_performance'].items(), key=lambda x: x[1]['average'], reverse=True)]
+    }
 
-# Overall + per-branch bucket counts for key categories (respondent-level)
-try:
+# (name, per-respondent average) behind overall_rating_counts
+AVG_RATING_COUNT_COLUMNS = [
+    ('Overall Satisfaction', 'Overall_Avg'),
+    ('Academics', 'Subject_Avg'),
+    ('Environment', 'Environment_Avg'),
+    ('Infrastructure', 'Infrastructure_Avg'),
+    ('Administration', 'Admin_Avg'),
+    ('Communication', 'Communication_Avg'),
+    ('Safety', 'Safety_Avg'),
+    ('Hygiene', 'Hygiene_Avg'),
+    ('PTM', 'PTM_Avg'),
+]
+
+def add_summary_scores(stats, totals):
+    overall = totals.rollup('cell', [])
+    branches = totals.rollup('cell', ['branch'])
+    # Executive summary KPIs and additional aggregations
+    stats['summary']['overall_avg'] = float(average_means(overall, 'Overall_Avg')[0])
+
+    # Overall + per-branch bucket counts for key categories (respondent-level)
     stats['overall_rating_counts'] = {
-        'Overall Satisfaction': bucket_counts_from_avg_series(df['Overall_Avg']),
-        'Academics': bucket_counts_from_avg_series(df['Subject_Avg']),
-        'Environment': bucket_counts_from_avg_series(df['Environment_Avg']),
-        'Infrastructure': bucket_counts_from_avg_series(df['Infrastructure_Avg']),
-        'Administration': bucket_counts_from_avg_series(df['Admin_Avg']),
-        'Communication': bucket_counts_from_avg_series(df['Communication_Avg']),
-        'Safety': bucket_counts_from_avg_series(df['Safety_Avg']),
-        'Hygiene': bucket_counts_from_avg_series(df['Hygiene_Avg']),
-        'PTM': bucket_counts_from_avg_series(df['PTM_Avg']),
+        name: {b: int(n) for b, n in zip(AVG_BUCKETS, average_bucket_table(overall, avg)[0])}
+        for name, avg in AVG_RATING_COUNT_COLUMNS
     }
-    by_branch = {}
-    for branch, g in df.groupby(branch_col):
-        by_branch[branch] = {
-            'Overall Satisfaction': bucket_counts_from_avg_series(g['Overall_Avg']),
-            'Academics': bucket_counts_from_avg_series(g['Subject_Avg']),
-            'Environment': bucket_counts_from_avg_series(g['Environment_Avg']),
-            'Infrastructure': bucket_counts_from_avg_series(g['Infrastructure_Avg']),
-            'Administration': bucket_counts_from_avg_series(g['Admin_Avg']),
-            'Communication': bucket_counts_from_avg_series(g['Communication_Avg']),
-            'Safety': bucket_counts_from_avg_series(g['Safety_Avg']),
-            'Hygiene': bucket_counts_from_avg_series(g['Hygiene_Avg']),
-            'PTM': bucket_counts_from_avg_series(g['PTM_Avg']),
-        }
-    stats['overall_rating_counts_by_branch'] = by_branch
-except Exception:
-    pass
-
-category_scores = {
-    'Academics': float(df['Subject_Avg'].mean()),
-    'Administration': float(df['Admin_Avg'].mean()),
-    'Environment': float(df['Environment_Avg'].mean()),
-    'Infrastructure': float(df['Infrastructure_Avg'].mean()),
-}
-app_avg = mean_cols(app_cols)
-transport_avg = mean_cols(transport_cols)
-if app_avg is not None:
-    category_scores['App'] = app_avg
-if transport_avg is not None:
-    category_scores['Transport'] = transport_avg
-stats['summary']['category_scores'] = category_scores
-
-# Recommendation distribution and percent Yes (robust to localized values)
-rec_counts = {'Yes': 0, 'No': 0, 'Maybe': 0, 'Not Applicable': 0}
-if recommend_cols:
-    for col in recommend_cols:
-        mapped = df[col].apply(classify_ynm)
-        vc = mapped.value_counts()
-        for k, v in vc.items():
-            if k in rec_counts:
-                rec_counts[k] += int(v)
-total_rec = rec_counts['Yes'] + rec_counts['No'] + rec_counts['Maybe']
-yes_pct = (rec_counts['Yes'] / total_rec * 100.0) if total_rec > 0 else None
-stats['recommendation'] = {
-    'distribution': rec_counts,
-    'yes_pct': yes_pct
-}
-
-# PTM effectiveness (overall and per branch)
-ptm_avg = mean_cols(ptm_cols)
-stats['ptm_effectiveness'] = ptm_avg
-ptm_by_branch = {}
-for branch, group in df.groupby(branch_col):
-    if not ptm_cols:
-        ptm_by_branch[branch] = None
+    tables = {name: average_bucket_table(branches, avg) for name, avg in AVG_RATING_COUNT_COLUMNS}
+    stats['overall_rating_counts_by_branch'] = _counts_by_group(branches.labels, tables, AVG_BUCKETS)
+
+    category_scores = {
+        'Academics': float(average_means(overall, 'Subject_Avg')[0]),
+        'Administration': float(average_means(overall, 'Admin_Avg')[0]),
+        'Environment': float(average_means(overall, 'Environment_Avg')[0]),
+        'Infrastructure': float(average_means(overall, 'Infrastructure_Avg')[0]),
+    }
+    app_avg = average_or_none(overall, 'App_Avg')
+    transport_avg = average_or_none(overall, 'Transport_Avg')
+    if app_avg is not None:
+        category_scores['App'] = app_avg
+    if transport_avg is not None:
+        category_scores['Transport'] = transport_avg
+    stats['summary']['category_scores'] = category_scores
+
+def add_recommendation_and_teaching(stats, totals, roles):
+    overall = totals.rollup('cell', [])
+    branches = totals.rollup('cell', ['branch'])
+    # Recommendation distribution and percent Yes (robust to localized values)
+    rec_counts = {b: int(n) for b, n in zip(REC_BUCKETS, ynm_table(overall, roles['recommend_cols'])[0])}
+    total_rec = rec_counts['Yes'] + rec_counts['No'] + rec_counts['Maybe']
+    yes_pct = (rec_counts['Yes'] / total_rec * 100.0) if total_rec > 0 else None
+    stats['recommendation'] = {
+        'distribution': rec_counts,
+        'yes_pct': yes_pct
+    }
+
+    # PTM effectiveness (overall and per branch)
+    ptm_avg = average_or_none(overall, 'PTM_Avg')
+    stats['ptm_effectiveness'] = ptm_avg
+    if ptm_avg is not None:
+        ptm_by_branch = dict(zip(branches.labels, map(float, average_means(branches, 'PTM_Avg'))))
     else:
-        num_cols = [c + '_numeric' for c in ptm_cols if c + '_numeric' in group.columns]
-        if num_cols:
-            ptm_by_branch[branch] = float(group[num_cols].replace(0, np.nan).mean(axis=1).mean())
-        else:
-            ptm_by_branch[branch] = None
-stats['ptm_effectiveness_by_branch'] = ptm_by_branch
-
-# Teaching indicators aggregation
-stats['teaching_indicators'] = {
-    'Concept Clarity': mean_cols(clarity_cols),
-    'Teacher Approachability': mean_cols(approach_cols),
-    'Engagement': mean_cols(engagement_cols),
-    'Communication Skills': mean_cols(comm_skill_cols),
-}
-
-# Environment focus metrics (pick common keywords from Environment Quality group)
-def compute_env_focus(df_subset):
-    env_focus_local = {}
-    for key, col in env_cols.items():
-        if (col + '_numeric') not in df_subset.columns:
+        ptm_by_branch = dict.fromkeys(branches.labels)
+    stats['ptm_effectiveness_by_branch'] = ptm_by_branch
+
+    # Teaching indicators aggregation
+    stats['teaching_indicators'] = {label: average_or_none(overall, 'teaching:' + label) for label, _role in TEACHING_INDICATORS}
+
+# Environment focus metrics (common keywords of the Environment Quality group, roles['env_focus_cols'])
+def add_environment_focus(stats, totals, roles):
+    overall = totals.rollup('cell', [])
+    branches = totals.rollup('cell', ['branch'])
+    scored = set(roles['rating_cols'])
+    env_focus = {}
+    env_focus_by_branch = {b: {} for b in branches.labels}
+    for label, col in roles['env_focus_cols'].items():
+        if col not in scored:
             continue
-        low = key.lower()
-        avg = float(df_subset[col + '_numeric'].replace(0, np.nan).mean())
-        if 'interest' in low or 'enthusiasm' in low:
-            env_focus_local['Interest in attending school'] = avg
-        elif 'secure' in low or 'safety' in low:
-            env_focus_local['Campus safety'] = avg
-        elif 'moral' in low or 'values' in low:
-            env_focus_local['Moral values'] = avg
-        elif 'social' in low or 'confidence' in low:
-            env_focus_local['Social confidence'] = avg
-    return env_focus_local
-
-env_focus = compute_env_focus(df)
-stats['environment_focus'] = env_focus
-
-env_focus_by_branch = {}
-for branch, group in df.groupby(branch_col):
-    env_focus_by_branch[branch] = compute_env_focus(group)
-stats['environment_focus_by_branch'] = env_focus_by_branch
-
-# Communication metrics (common keywords) overall and per branch
-def compute_comm_metrics(df_subset):
-    cm = {}
-    cols_by_label = {}
-    for col in df_subset.columns:
-        low = str(col).lower()
-        label = None
-        if 'front office' in low or 'front-office' in low:
-            label = 'Front Office Support'
-        elif 'leadership' in low or 'principal access' in low or ('access' in low and 'principal' in low):
-            label = 'Leadership Access'
-        elif 'app' in low and ('usability' in low or 'use' in low):
-            label = 'App Usability'
-        elif 'timely updates' in low:
-            label = 'Timely Updates'
-        if label:
-            cols_by_label.setdefault(label, []).append(col)
-    for label, cols in cols_by_label.items():
-        num_cols = [c + '_numeric' for c in cols if (c + '_numeric') in df_subset.columns]
-        if not num_cols:
+        env_focus[label] = float(column_means(overall, col)[0])
+        for b, avg in zip(branches.labels, column_means(branches, col)):
+            env_focus_by_branch[b][label] = float(avg)
+    stats['environment_focus'] = env_focus
+    stats['environment_focus_by_branch'] = env_focus_by_branch
+
+# Communication metrics (common keywords) overall and per branch: the per-respondent 'comm:<metric>'
+# averages feed communication_metrics, communication_metrics_detail and both *_by_branch sections
+def add_communication_metrics(stats, totals, roles):
+    overall = totals.rollup('cell', [])
+    branches = totals.rollup('cell', ['branch'])
+    metrics, detail = {}, {}
+    metrics_by_branch = {b: {} for b in branches.labels}
+    detail_by_branch = {b: {} for b in branches.labels}
+    for label in roles['comm_metric_cols']:
+        name = 'comm:' + label
+        if average_or_none(overall, name) is None:
+            # Unscored question: the detail sections still list it, with every response unanswered
+            detail[label] = {'average': None, 'rating_counts': dict.fromkeys(AVG_BUCKETS, 0)}
+            detail[label]['rating_counts']['Unanswered'] = int(overall.n.sum())
+            for i, b in enumerate(branches.labels):
+                detail_by_branch[b][label] = {'average': None, 'rating_counts': dict.fromkeys(AVG_BUCKETS, 0)}
+                detail_by_branch[b][label]['rating_counts']['Unanswered'] = int(branches.n[i])
             continue
-        cm[label] = float(df_subset[num_cols].replace(0, np.nan).mean(axis=1).mean())
-    return cm
-
-def compute_comm_metrics_detail(df_subset):
-    out = {}
-    cols_by_label = {}
-    for col in df_subset.columns:
-        low = str(col).lower()
-        label = None
-        if 'front office' in low or 'front-office' in low:
-            label = 'Front Office Support'
-        elif 'leadership' in low or 'principal access' in low or ('access' in low and 'principal' in low):
-            label = 'Leadership Access'
-        elif 'app' in low and ('usability' in low or 'use' in low):
-            label = 'App Usability'
-        elif 'timely updates' in low:
-            label = 'Timely Updates'
-        if label:
-            cols_by_label.setdefault(label, []).append(col)
-    for label, cols in cols_by_label.items():
-        num_cols = [c + '_numeric' for c in cols if (c + '_numeric') in df_subset.columns]
-        if num_cols:
-            row_mean = df_subset[num_cols].replace(0, np.nan).mean(axis=1)
-            avg = float(row_mean.mean())
-            counts = bucket_counts_from_avg_series(row_mean)
-        else:
-            avg = None
-            counts = {'Excellent': 0, 'Good': 0, 'Average': 0, 'Poor': 0, 'Not Applicable': 0, 'Unanswered': int(len(df_subset))}
-        out[label] = {
-            'average': avg,
-            'rating_counts': counts
+        metrics[label] = average_or_none(overall, name)
+        detail[label] = {
+            'average': metrics[label],
+            'rating_counts': {k: int(n) for k, n in zip(AVG_BUCKETS, average_bucket_table(overall, name)[0])}
         }
-    return out
-
-comm_metrics = compute_comm_metrics(df)
-stats['communication_metrics'] = comm_metrics
-stats['communication_metrics_detail'] = compute_comm_metrics_detail(df)
-
-comm_by_branch = {}
-for branch, group in df.groupby(branch_col):
-    comm_by_branch[branch] = compute_comm_metrics(group)
-stats['communication_metrics_by_branch'] = comm_by_branch
-
-comm_detail_by_branch = {}
-for branch, group in df.groupby(branch_col):
-    comm_detail_by_branch[branch] = compute_comm_metrics_detail(group)
-stats['communication_metrics_detail_by_branch'] = comm_detail_by_branch
-
-# Concern handling role-wise averages (overall and per branch)
-concern_roles = {}
-for role, col in concern_roles_map.items():
-    num_col = col + '_numeric'
-    if num_col in df.columns:
-        concern_roles[role] = float(df[num_col].replace(0, np.nan).mean())
-stats['concern_roles'] = concern_roles
-
-concern_roles_by_branch = {}
-for branch, group in df.groupby(branch_col):
-    vals = {}
-    for role, col in concern_roles_map.items():
-        num_col = col + '_numeric'
-        if num_col in group.columns:
-            vals[role] = float(group[num_col].replace(0, np.nan).mean())
-    concern_roles_by_branch[branch] = vals
-stats['concern_roles_by_branch'] = concern_roles_by_branch
-
-# Concern resolution distribution (Yes/No/Not Applicable)
-concern_dist = {'Yes': 0, 'No': 0, 'Not Applicable': 0, 'Maybe': 0}
-for col in concern_resolve_cols:
-    mapped = df[col].apply(classify_ynm)
-    vc = mapped.value_counts()
-    for k, v in vc.items():
-        if k in concern_dist:
-            concern_dist[k] += int(v)
-stats['concern_resolution'] = concern_dist
-
-# Branch recommendation percentage
-branch_rec_pct = {}
-if recommend_cols:
-    for branch, group in df.groupby(branch_col):
-        yes = 0
-        total = 0
-        for col in recommend_cols:
-            mapped = group[col].apply(classify_ynm)
-            vc = mapped.value_counts()
-            yes += int(vc.get('Yes', 0))
-            total += int(vc.get('Yes', 0)) + int(vc.get('No', 0)) + int(vc.get('Maybe', 0))
-        branch_rec_pct[branch] = (yes / total * 100.0) if total > 0 else None
-stats['branch_recommendation_pct'] = branch_rec_pct
-
-# Branch recommendation counts (Yes/No/Maybe/Not Applicable)
-branch_rec_counts = {}
-if recommend_cols:
-    for branch, group in df.groupby(branch_col):
-        counts = {'Yes': 0, 'No': 0, 'Maybe': 0, 'Not Applicable': 0}
-        for col in recommend_cols:
-            mapped = group[col].apply(classify_ynm)
-            vc = mapped.value_counts()
-            for k, v in vc.items():
-                if k in counts:
-                    counts[k] += int(v)
-        branch_rec_counts[branch] = counts
-stats['branch_recommendation_counts'] = branch_rec_counts
-
-# Branch concern resolution counts
-branch_concern_counts = {}
-if concern_resolve_cols:
-    for branch, group in df.groupby(branch_col):
-        counts = {'Yes': 0, 'No': 0, 'Maybe': 0, 'Not Applicable': 0}
-        for col in concern_resolve_cols:
-            mapped = group[col].apply(classify_ynm)
-            vc = mapped.value_counts()
-            for k, v in vc.items():
-                if k in counts:
-                    counts[k] += int(v)
-        branch_concern_counts[branch] = counts
-stats['branch_concern_resolution'] = branch_concern_counts
-
-# Branch rating category counts by group (Subjects/Environment/Infrastructure/Parent-Teacher/Admin)
-def count_ratings_for_group(df_group, cols):
-    counts = {'Excellent': 0, 'Good': 0, 'Average': 0, 'Poor': 0}
-    for col in cols:
-        if col not in df_group.columns:
-            continue
-        series = df_group[col].dropna()
-        for val in series:
-            cat = canonicalize_rating(val)
-            if cat in counts:
-                counts[cat] += 1
-    return counts
-
-branch_rating_counts = {}
-for branch, group in df.groupby(branch_col):
-    branch_rating_counts[branch] = {
-        'Subjects': count_ratings_for_group(group, list(subject_cols.values())),
-        'Environment': count_ratings_for_group(group, list(env_cols.values())),
-        'Infrastructure': count_ratings_for_group(group, list(infra_cols.values())),
-        'Parent-Teacher': count_ratings_for_group(group, list(parent_cols.values())),
-        'Administrative Support': count_ratings_for_group(group, list(admin_cols.values())),
+        means = average_means(branches, name)
+        counts = average_bucket_table(branches, name)
+        for i, b in enumerate(branches.labels):
+            metrics_by_branch[b][label] = float(means[i])
+            detail_by_branch[b][label] = {
+                'average': float(means[i]),
+                'rating_counts': {k: int(n) for k, n in zip(AVG_BUCKETS, counts[i])}
+            }
+    stats['communication_metrics'] = metrics
+    stats['communication_metrics_detail'] = detail
+    stats['communication_metrics_by_branch'] = metrics_by_branch
+    stats['communication_metrics_detail_by_branch'] = detail_by_branch
+
+def ynm_codes(series):
+    """Position of classify_ynm(value) in REC_BUCKETS per row, -1 when it is unclassified"""
+    pos = {b: i for i, b in enumerate(REC_BUCKETS)}
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    lookup = np.array([pos.get(classify_ynm(v), -1) for v in uniques] + [pos.get(classify_ynm(None), -1)], dtype=np.int8)
+    return lookup[codes]
+
+def add_concern_and_recommendation_counts(stats, totals, roles):
+    recommend_cols = roles['recommend_cols']
+    concern_resolve_cols = roles['concern_resolve_cols']
+    overall = totals.rollup('cell', [])
+    branches = totals.rollup('cell', ['branch'])
+    scored = set(roles['rating_cols'])
+    # Concern handling role-wise averages (overall and per branch)
+    concern_cols = {role: col for role, col in roles['concern_roles_map'].items() if col in scored}
+    stats['concern_roles'] = {role: float(column_means(overall, col)[0]) for role, col in concern_cols.items()}
+
+    concern_roles_by_branch = {b: {} for b in branches.labels}
+    for role, col in concern_cols.items():
+        for b, avg in zip(branches.labels, column_means(branches, col)):
+            concern_roles_by_branch[b][role] = float(avg)
+    stats['concern_roles_by_branch'] = concern_roles_by_branch
+
+    # Concern resolution distribution (Yes/No/Not Applicable)
+    concern_dist = {'Yes': 0, 'No': 0, 'Not Applicable': 0, 'Maybe': 0}
+    concern_dist.update({b: int(n) for b, n in zip(REC_BUCKETS, ynm_table(overall, concern_resolve_cols)[0])})
+    stats['concern_resolution'] = concern_dist
+
+    # Branch recommendation percentage and counts (Yes/No/Maybe/Not Applicable)
+    branch_rec_pct = {}
+    branch_rec_counts = {}
+    if recommend_cols:
+        table = ynm_table(branches, recommend_cols)
+        answered = table[:, :3].sum(axis=1)
+        for i, b in enumerate(branches.labels):
+            branch_rec_pct[b] = (int(table[i, 0]) / int(answered[i]) * 100.0) if answered[i] > 0 else None
+            branch_rec_counts[b] = {k: int(n) for k, n in zip(REC_BUCKETS, table[i])}
+    stats['branch_recommendation_pct'] = branch_rec_pct
+    stats['branch_recommendation_counts'] = branch_rec_counts
+
+    # Branch concern resolution counts
+    branch_concern_counts = {}
+    if concern_resolve_cols:
+        table = ynm_table(branches, concern_resolve_cols)
+        branch_concern_counts = {b: {k: int(n) for k, n in zip(REC_BUCKETS, table[i])} for i, b in enumerate(branches.labels)}
+    stats['branch_concern_resolution'] = branch_concern_counts
+
+# Branch x class x orientation count cube: the 'cube' grain keeps recommendation and rating
+# bucket counts per (branch, class, orientation); the class/orientation/pair breakdowns are its rollups
+REC_BUCKETS = ['Yes', 'No', 'Maybe', 'Not Applicable']
+# (name, role) pairs: the rating columns of each group come from roles[role]
+RATING_COUNT_GROUPS = [
+    ('Subjects', 'subject_cols'),
+    ('Environment', 'env_cols'),
+    ('Infrastructure', 'infra_cols'),
+    ('Parent-Teacher', 'parent_cols'),
+    ('Administrative Support', 'admin_cols'),
+]
+
+def report_unknown_rating_labels(df, roles, limit=5):
+    """Warn about answers in the bucketed rating columns that no rating rule recognises"""
+    cols = [c for _name, role in RATING_COUNT_GROUPS for c in roles[role].values()]
+    unknown = LABELS.unknown_labels(df, cols)
+    if unknown:
+        shown = ', '.join(f"{label!r} ({n})" for label, n in unknown.most_common(limit))
+        more = f" and {len(unknown) - limit} more" if len(unknown) > limit else ''
+        print(f"Warning: {len(unknown)} unrecognised rating label(s) counted as unanswered: {shown}{more}")
+
+def add_branch_rating_counts(stats, totals, roles):
+    branches = totals.rollup('cell', ['branch'])
+    tables = {name: rating_bucket_table(branches, list(roles[role].values())) for name, role in RATING_COUNT_GROUPS}
+    stats['branch_rating_counts'] = _counts_by_group(branches.labels, tables, RATING_BUCKETS)
+
+    # Build breakdowns by class, orientation, and their pair (intersection); branches in sorted order
+    classes = [c for c in totals.rollup('class', ['class']).labels if _is_known_label(c)]
+    orients = [o for o in totals.rollup('orientation', ['orientation']).labels if _is_known_label(o)]
+    has_rec = bool(roles['recommend_cols'])
+
+    def split(dims):
+        """key over dims -> (recommendation counts, rating counts) per branch with responses in it"""
+        cube = totals.rollup('cube', list(dims) + ['branch'])
+        rows_by_key = {}
+        for i, key in enumerate(cube.keys):
+            rows_by_key.setdefault(key[:-1], []).append(i)
+        rec = cube.table('recommendation').counts
+        ratings = {name: cube.table('ratings:' + name).counts for name, _role in RATING_COUNT_GROUPS}
+
+        def at(key):
+            rows = rows_by_key.get(key, [])
+            rec_counts = {cube.keys[i][-1]: {k: int(n) for k, n in zip(REC_BUCKETS, rec[i])} for i in rows} if has_rec else {}
+            rating_counts = {cube.keys[i][-1]: {name: {b: int(n) for b, n in zip(RATING_BUCKETS, t[i])} for name, t in ratings.items()}
+                             for i in rows}
+            return rec_counts, rating_counts
+        return at
+
+    brc_by_class, brg_by_class = {}, {}
+    by_class = split(['class'])
+    for c in classes:
+        brc_by_class[c], brg_by_class[c] = by_class((c,))
+    brc_by_orient, brg_by_orient = {}, {}
+    by_orient = split(['orientation'])
+    for o in orients:
+        brc_by_orient[o], brg_by_orient[o] = by_orient((o,))
+    brc_by_pair, brg_by_pair = {}, {}
+    by_pair = split(['class', 'orientation'])
+    for c in classes:
+        brc_by_pair[c], brg_by_pair[c] = {}, {}
+        for o in orients:
+            brc_by_pair[c][o], brg_by_pair[c][o] = by_pair((c, o))
+
+    stats['branch_recommendation_counts_by'] = {
+        'class': brc_by_class,
+        'orientation': brc_by_orient,
+        'pair': brc_by_pair
+    }
+    stats['branch_rating_counts_by'] = {
+        'class': brg_by_class,
+        'orientation': brg_by_orient,
+        'pair': brg_by_pair
     }
-stats['branch_rating_counts'] = branch_rating_counts
-
-# Helper: compute per-branch recommendation counts for a dataframe subset
-def compute_branch_rec_counts(df_subset):
-    out = {}
-    if not recommend_cols:
-        return out
-    for branch, group in df_subset.groupby(branch_col):
-        counts = {'Yes': 0, 'No': 0, 'Maybe': 0, 'Not Applicable': 0}
-        for col in recommend_cols:
-            mapped = group[col].apply(classify_ynm)
-            vc = mapped.value_counts()
-            for k, v in vc.items():
-                if k in counts:
-                    counts[k] += int(v)
-        out[branch] = counts
-    return out
-
-# Helper: compute per-branch rating counts (E/G/A/P) for each group for a dataframe subset
-def compute_branch_rating_counts(df_subset):
-    out = {}
-    for branch, group in df_subset.groupby(branch_col):
-        out[branch] = {
-            'Subjects': count_ratings_for_group(group, list(subject_cols.values())),
-            'Environment': count_ratings_for_group(group, list(env_cols.values())),
-            'Infrastructure': count_ratings_for_group(group, list(infra_cols.values())),
-            'Parent-Teacher': count_ratings_for_group(group, list(parent_cols.values())),
-            'Administrative Support': count_ratings_for_group(group, list(admin_cols.values())),
-        }
-    return out
 
-# Build breakdowns by class, orientation, and their pair (intersection)
-classes_unique = [c for c in sorted(df[class_col].dropna().unique()) if c and c != 'Unknown']
-orients_unique = [o for o in sorted(df[orientation_col].dropna().unique()) if o and o != 'Unknown']
-
-brc_by_class = {}
-for c in classes_unique:
-    brc_by_class[c] = compute_branch_rec_counts(df[df[class_col] == c])
-brc_by_orient = {}
-for o in orients_unique:
-    brc_by_orient[o] = compute_branch_rec_counts(df[df[orientation_col] == o])
-brc_by_pair = {}
-for c in classes_unique:
-    brc_by_pair[c] = {}
-    for o in orients_unique:
-        sub = df[(df[class_col] == c) & (df[orientation_col] == o)]
-        brc_by_pair[c][o] = compute_branch_rec_counts(sub)
-stats['branch_recommendation_counts_by'] = {
-    'class': brc_by_class,
-    'orientation': brc_by_orient,
-    'pair': brc_by_pair
-}
-
-brg_by_class = {}
-for c in classes_unique:
-    brg_by_class[c] = compute_branch_rating_counts(df[df[class_col] == c])
-brg_by_orient = {}
-for o in orients_unique:
-    brg_by_orient[o] = compute_branch_rating_counts(df[df[orientation_col] == o])
-brg_by_pair = {}
-for c in classes_unique:
-    brg_by_pair[c] = {}
-    for o in orients_unique:
-        sub = df[(df[class_col] == c) & (df[orientation_col] == o)]
-        brg_by_pair[c][o] = compute_branch_rating_counts(sub)
-stats['branch_rating_counts_by'] = {
-    'class': brg_by_class,
-    'orientation': brg_by_orient,
-    'pair': brg_by_pair
-}
-
-rec_reasons = { 'Yes': Counter(), 'Maybe': Counter(), 'No': Counter() }
-rec_col = recommend_cols[0] if recommend_cols else None
-if rec_col:
-    for _, row in df.iterrows():
-        status = classify_ynm(row.get(rec_col))
-        if status not in rec_reasons:
-            continue
-        # Choose strengths for Yes, improvement for Maybe/No
-        cols = sat_cols if status == 'Yes' else improve_cols
-        reasons = []
-        for c in cols:
-            reasons.extend(parse_reasons(row.get(c)))
-        buckets = [bucket_reason(r) for r in reasons]
-        for b in buckets:
-            rec_reasons[status][b] += 1
-
-# Raw reasons (exact selections from CSV) for transparency in UI
-rec_reasons_raw = { 'Yes': Counter(), 'Maybe': Counter(), 'No': Counter() }
-if rec_col:
-    for _, row in df.iterrows():
-        status = classify_ynm(row.get(rec_col))
-        if status not in rec_reasons_raw:
-            continue
-        cols = sat_cols if status == 'Yes' else improve_cols
-        reasons = []
-        for c in cols:
-            reasons.extend(parse_reasons(row.get(c)))
-        for r in reasons:
-            if r:
-                rec_reasons_raw[status][r] += 1
+# Recommendation reasons: one long (row, status, branch, segment, reason) table, folded into the
+# 'reasons' grain; every reason counter below is read from its per-group reason counts
+REASON_STATUSES = ['Yes', 'Maybe', 'No']
+
+def build_reason_table(df_subset, status_col, strength_cols, improvement_cols, branch_col):
+    """Explode the strength (Yes) / improvement (Maybe, No) selections into one row per reason.
+
+    Rows come out in the order a row-by-row scan would produce them, so first-appearance
+    order of reasons (and hence Counter.most_common tie order) is preserved.
+    """
+    columns = ['row', 'status', 'branch', 'segment', 'reason']
+    if not status_col:
+        return pd.DataFrame(columns=columns)
+    status = map_distinct(df_subset[status_col], classify_ynm)
+    positions = np.arange(len(df_subset))
+    parts = []
+    for statuses, cols in ((['Yes'], strength_cols), (['Maybe', 'No'], improvement_cols)):
+        in_status = status.isin(statuses).to_numpy()
+        for col_idx, col in enumerate(cols):
+            values = df_subset[col]
+            mask = in_status & values.notna().to_numpy()
+            if not mask.any():
+                continue
+            split = values[mask].astype(str).str.split(r'[;|\n]+', regex=True)
+            part = pd.DataFrame({
+                'row': positions[mask],
+                'col': col_idx,
+                'status': status[mask].to_numpy(),
+                'branch': df_subset[branch_col].to_numpy()[mask],
+                'segment': df_subset['Segment'].to_numpy()[mask],
+                'reason': split.to_numpy(),
+            }).explode('reason', ignore_index=True)
+            part['part'] = np.arange(len(part))
+            part['reason'] = part['reason'].astype(object).str.strip()
+            parts.append(part[part['reason'].notna() & (part['reason'] != '')])
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    table = pd.concat(parts, ignore_index=True).sort_values(['row', 'col', 'part'], kind='stable')
+    return table[columns].reset_index(drop=True)
+
+def reason_counter(table, i, key=None):
+    """Counter(reason -> count) of group i of a 'reason' CountTable in first-appearance order;
+    key maps each reason first (e.g. to its bucket)"""
+    counts = table.counts[i]
+    present = np.flatnonzero(counts)
+    counter = Counter()
+    for j in present[np.argsort(table.first[i, present], kind='stable')]:
+        label = table.labels[j]
+        counter[key(label) if key else label] += int(counts[j])
+    return counter
 
 def reasons_to_top(counter):
     total = sum(counter.values())
@@ -1275,162 +1209,204 @@ def reasons_to_top(counter):
         'top_detail': [[k, int(v), round(v*100.0/total, 1)] for k, v in items]
     }
 
-stats['recommendation_reasons'] = {
-    'Yes': reasons_to_top(rec_reasons['Yes']),
-    'Maybe': reasons_to_top(rec_reasons['Maybe']),
-    'No': reasons_to_top(rec_reasons['No'])
-}
-
-stats['recommendation_reasons_raw'] = {
-    'Yes': reasons_to_top(rec_reasons_raw['Yes']),
-    'Maybe': reasons_to_top(rec_reasons_raw['Maybe']),
-    'No': reasons_to_top(rec_reasons_raw['No'])
-}
-
-# Per-branch, per-segment aggregates for side-by-side comparisons
-branch_segment_perf = {}
-branch_segment_rec_counts = {}
-branch_segment_rec_reasons = {}
-segments = [s for s in df['Segment'].dropna().unique()]
-for branch, g_branch in df.groupby(branch_col):
-    branch_segment_perf[branch] = {}
-    branch_segment_rec_counts[branch] = {}
-    branch_segment_rec_reasons[branch] = {}
-    for seg, g in g_branch.groupby('Segment'):
-        branch_segment_perf[branch][seg] = {
-            'count': int(len(g)),
-            'subject_avg': float(g['Subject_Avg'].mean()),
-            'environment_avg': float(g['Environment_Avg'].mean()),
-            'infrastructure_avg': float(g['Infrastructure_Avg'].mean()),
-            'parent_teacher_avg': float(g['Parent_Teacher_Avg'].mean()),
-            'admin_avg': float(g['Admin_Avg'].mean()),
-            'overall_avg': float(g['Overall_Avg'].mean())
-        }
-        counts = {'Yes': 0, 'No': 0, 'Maybe': 0, 'Not Applicable': 0}
-        if 'recommend_cols' in globals() and recommend_cols:
-            for col in recommend_cols:
-                mapped = g[col].apply(classify_ynm)
-                vc = mapped.value_counts()
-                for k, v in vc.items():
-                    if k in counts:
-                        counts[k] += int(v)
-        branch_segment_rec_counts[branch][seg] = counts
-        rec_col = recommend_cols[0] if ('recommend_cols' in globals() and recommend_cols) else None
-        seg_reasons = { 'Yes': Counter(), 'Maybe': Counter(), 'No': Counter() }
-        if rec_col:
-            for _, row in g.iterrows():
-                status = classify_ynm(row.get(rec_col))
-                if status not in seg_reasons:
-                    continue
-                cols = sat_cols if status == 'Yes' else improve_cols
-                reasons = []
-                for c in cols:
-                    reasons.extend(parse_reasons(row.get(c)))
-                buckets = [bucket_reason(r) for r in reasons]
-                for b in buckets:
-                    seg_reasons[status][b] += 1
-        branch_segment_rec_reasons[branch][seg] = {
-            'Yes': reasons_to_top(seg_reasons['Yes']),
-            'Maybe': reasons_to_top(seg_reasons['Maybe']),
-            'No': reasons_to_top(seg_reasons['No'])
-        }
+def build_recommendation_reason_table(df, roles):
+    recommend_cols = roles['recommend_cols']
+    rec_col = recommend_cols[0] if recommend_cols else None
+    return build_reason_table(df, rec_col, roles['sat_cols'], roles['improve_cols'], roles['branch_col'])
+
+def add_recommendation_reasons(stats, totals, roles):
+    """Reason summaries plus the per-branch, per-segment sections"""
+    reasons = totals['reasons']
+    buckets = {label: bucket_reason(label) for label in reasons.table('reason').labels}
+
+    def tops(groups, index, prefix, key=None):
+        out = {}
+        for status in REASON_STATUSES:
+            i = index.get(prefix + (status,))
+            out[status] = reasons_to_top(reason_counter(groups.table('reason'), i, key) if i is not None else Counter())
+        return out
 
-stats['branch_segment_performance'] = branch_segment_perf
-stats['branch_segment_recommendation_counts'] = branch_segment_rec_counts
-stats['branch_segment_recommendation_reasons'] = branch_segment_rec_reasons
+    by_status = totals.rollup('reasons', ['status'])
+    status_index = {key: i for i, key in enumerate(by_status.keys)}
+    stats['recommendation_reasons'] = tops(by_status, status_index, (), buckets.get)
+    # Raw reasons (exact selections from CSV) for transparency in UI
+    stats['recommendation_reasons_raw'] = tops(by_status, status_index, ())
+
+    # Per-branch, per-segment aggregates for side-by-side comparisons
+    branches = totals.rollup('cell', ['branch'])
+    pairs = totals.rollup('cell', ['branch', 'segment'])
+    reason_index = {key: i for i, key in enumerate(reasons.keys)}
+    branch_segment_perf = {b: {} for b in branches.labels}
+    branch_segment_rec_counts = {b: {} for b in branches.labels}
+    branch_segment_rec_reasons = {b: {} for b in branches.labels}
+    seg_perf = performance(pairs)
+    rec_table = ynm_table(pairs, roles['recommend_cols'])
+    for i, (branch, seg) in enumerate(pairs.labels):
+        branch_segment_perf[branch][seg] = seg_perf[i]
+        branch_segment_rec_counts[branch][seg] = {k: int(n) for k, n in zip(REC_BUCKETS, rec_table[i])}
+        branch_segment_rec_reasons[branch][seg] = tops(reasons, reason_index, (branch, seg), buckets.get)
+
+    stats['branch_segment_performance'] = branch_segment_perf
+    stats['branch_segment_recommendation_counts'] = branch_segment_rec_counts
+    stats['branch_segment_recommendation_reasons'] = branch_segment_rec_reasons
+
+def aggregate_stats(totals, roles, timer=None):
+    """Every feedback_stats.json section, built from the ResponseTotals of response_totals"""
+    timer = timer if timer is not None else StageTimer()
+    with timer.stage('init_stats'):
+        stats = init_stats(totals)
+    with timer.stage('group_performance'):
+        add_group_performance(stats, totals)
+    with timer.stage('subject_performance'):
+        add_subject_performance(stats, totals, roles)
+    with timer.stage('category_performance'):
+        add_category_performance(stats, totals, roles)
+    with timer.stage('program_excellence'):
+        add_program_excellence(stats, totals, roles)
+    with timer.stage('rankings'):
+        add_rankings(stats)
+    with timer.stage('summary_scores'):
+        add_summary_scores(stats, totals)
+    with timer.stage('recommendation_and_teaching'):
+        add_recommendation_and_teaching(stats, totals, roles)
+    with timer.stage('environment_focus'):
+        add_environment_focus(stats, totals, roles)
+    with timer.stage('communication_metrics'):
+        add_communication_metrics(stats, totals, roles)
+    with timer.stage('concern_and_recommendation_counts'):
+        add_concern_and_recommendation_counts(stats, totals, roles)
+    with timer.stage('branch_rating_counts'):
+        add_branch_rating_counts(stats, totals, roles)
+    with timer.stage('recommendation_reasons'):
+        add_recommendation_reasons(stats, totals, roles)
+    return stats
+
+# Saved totals go stale when the input columns, the rating / role rules or the code that folds
+# responses into them changes
+TOTALS_FINGERPRINT = code_fingerprint(normalize_keys, branch_display_names, normalize_branch_name, branch_canonical_key,
+                                      add_numeric_scores, respondent_average_columns, distribution_columns,
+                                      _add_average_tables, avg_bucket_codes, ynm_codes, classify_ynm, build_reason_table,
+                                      build_recommendation_reason_table, reason_totals, response_totals,
+                                      row_keys, content_hashes, GroupKey, CountTable, GroupTotals, RATING_RULES_FINGERPRINT,
+                                      ROLE_RULES_FINGERPRINT)
+
+def totals_fingerprint(columns):
+    return code_fingerprint(TOTALS_FINGERPRINT, columns_fingerprint(columns))
+
+def add_saved_totals(state, totals, positions, branch_names):
+    """The saved totals plus those of the new responses: saved first rows moved to their
+    current positions, and saved branches renamed where the new responses changed the most
+    frequent spelling (branch_names are the combined counts from normalize_responses)"""
+    old_display = branch_display_names(state.branch_names)
+    new_display = branch_display_names(branch_names)
+    renamed = {name: new_display[key] for key, name in old_display.items() if new_display[key] != name}
+    return state.totals.remap_rows(positions).relabel('branch', renamed).add(totals)
 
 # Fallback post-processing: compute averages from distributions if missing
 def weighted_avg_from_distribution(dist_obj):
+    """Mean score of a {raw label: count} distribution (Not Applicable and unknown labels skipped)"""
     if not isinstance(dist_obj, dict):
         return None
-    e=g=a=n2=p=0
+    num = denom = 0
     for k, v in dist_obj.items():
         try:
             val = int(v) if v is not None else 0
         except Exception:
             continue
-        low = str(k).lower()
-        lownorm = re.sub(r"[\s./-]", '', low)
-        if 'not applicable' in low or 'பொருந்தாது' in low or low in ('na','n/a','n.a') or lownorm=='notapplicable':
+        score = weighted_score(k)
+        if score is None:
             continue
-        if 'excellent' in low or 'மிகநன்று' in low or 'மிக நன்று' in low:
-            e += val
-        elif 'good' in low or 'நன்று' in low:
-            g += val
-        elif 'average' in low or 'satisfactory' in low or 'சராசரி' in low or 'திருப்தி' in low:
-            a += val
-        elif 'need' in low or 'needs' in low or 'improve' in low or 'முன்னேற்றம்' in low:
-            n2 += val
-        elif 'poor' in low or 'மோசம்' in low:
-            p += val
-    denom = e+g+a+n2+p
+        num += score * val
+        denom += val
     if denom <= 0:
         return None
-    num = 5*e + 4*g + 3*a + 2*n2 + 1*p
     return float(num/denom)
 
-# Subjects
-for name, info in list(stats.get('subject_performance', {}).items()):
-    avg = info.get('average')
-    if avg is None or (isinstance(avg, float) and np.isnan(avg)):
-        dist = info.get('rating_distribution') or {}
-        wa = weighted_avg_from_distribution(dist)
-        stats['subject_performance'][name]['average'] = wa
-
-# Category groups
-cat_perf = stats.get('category_performance', {})
-for grp in list(cat_perf.keys()):
-    for name, info in list(cat_perf.get(grp, {}).items()):
+def avg_values(d):
+    vals = [v for v in d.values() if v is not None and not (isinstance(v, float) and np.isnan(v))]
+    return float(sum(vals)/len(vals)) if vals else None
+
+def apply_fallbacks(stats):
+    """Fill missing averages from rating distributions / category scores"""
+    # Subjects
+    for name, info in list(stats.get('subject_performance', {}).items()):
         avg = info.get('average')
         if avg is None or (isinstance(avg, float) and np.isnan(avg)):
             dist = info.get('rating_distribution') or {}
             wa = weighted_avg_from_distribution(dist)
-            stats['category_performance'][grp][name]['average'] = wa
+            stats['subject_performance'][name]['average'] = wa
+
+    # Category groups
+    cat_perf = stats.get('category_performance', {})
+    for grp in list(cat_perf.keys()):
+        for name, info in list(cat_perf.get(grp, {}).items()):
+            avg = info.get('average')
+            if avg is None or (isinstance(avg, float) and np.isnan(avg)):
+                dist = info.get('rating_distribution') or {}
+                wa = weighted_avg_from_distribution(dist)
+                stats['category_performance'][grp][name]['average'] = wa
+
+    # Summary category scores fallback
+    summary = stats.get('summary', {})
+    if summary.get('category_scores', {}).get('Academics') in (None,) or np.isnan(summary.get('category_scores', {}).get('Academics')):
+        subj_avgs = [v.get('average') for v in (stats.get('subject_performance') or {}).values()]
+        val = avg_values({i:a for i,a in enumerate(subj_avgs) if a is not None})
+        stats['summary']['category_scores']['Academics'] = val
+
+    groups_map = {
+        'Environment': 'Environment Quality',
+        'Infrastructure': 'Infrastructure',
+        'Administration': 'Administrative Support'
+    }
+    for key, grp in groups_map.items():
+        cs = stats['summary']['category_scores'].get(key)
+        if cs is None or (isinstance(cs, float) and np.isnan(cs)):
+            items = stats.get('category_performance', {}).get(grp, {})
+            val = avg_values({k:items[k].get('average') for k in items})
+            stats['summary']['category_scores'][key] = val
+
+    # Overall avg fallback
+    if stats['summary'].get('overall_avg') is None or (isinstance(stats['summary'].get('overall_avg'), float) and np.isnan(stats['summary'].get('overall_avg'))):
+        vals = [v for v in (stats['summary'].get('category_scores') or {}).values() if v is not None and not (isinstance(v, float) and np.isnan(v))]
+        stats['summary']['overall_avg'] = float(sum(vals)/len(vals)) if vals else None
+
+# Replace NaN values with None; only the PPT report needs the cleaned copy, the JSON
+# artifacts are streamed straight from stats by json_export
+def clean_nan(obj):
+    if isinstance(obj, dict):
+        return {k: clean_nan(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [clean_nan(item) for item in obj]
+    elif isinstance(obj, float) and np.isnan(obj):
+        return None
+    return obj
 
-# Summary category scores fallback
-summary = stats.get('summary', {})
-def avg_values(d):
-    vals = [v for v in d.values() if v is not None and not (isinstance(v, float) and np.isnan(v))]
-    return float(sum(vals)/len(vals)) if vals else None
 
-if summary.get('category_scores', {}).get('Academics') in (None,) or np.isnan(summary.get('category_scores', {}).get('Academics')):
-    subj_avgs = [v.get('average') for v in (stats.get('subject_performance') or {}).values()]
-    val = avg_values({i:a for i,a in enumerate(subj_avgs) if a is not None})
-    stats['summary']['category_scores']['Academics'] = val
-
-groups_map = {
-    'Environment': 'Environment Quality',
-    'Infrastructure': 'Infrastructure',
-    'Administration': 'Administrative Support'
-}
-for key, grp in groups_map.items():
-    cs = stats['summary']['category_scores'].get(key)
-    if cs is None or (isinstance(cs, float) and np.isnan(cs)):
-        items = stats.get('category_performance', {}).get(grp, {})
-        val = avg_values({k:items[k].get('average') for k in items})
-        stats['summary']['category_scores'][key] = val
-
-# Overall avg fallback
-if stats['summary'].get('overall_avg') is None or (isinstance(stats['summary'].get('overall_avg'), float) and np.isnan(stats['summary'].get('overall_avg'))):
-    vals = [v for v in (stats['summary'].get('category_scores') or {}).values() if v is not None and not (isinstance(v, float) and np.isnan(v))]
-    stats['summary']['overall_avg'] = float(sum(vals)/len(vals)) if vals else None
-
-# Now that all aggregates are computed, clean and save JSON
-stats_clean = clean_nan(stats)
-with open('/Users/venkubabugollapudi/Desktop/Feedback/Feed Back/feedback_stats.json', 'w', encoding='utf-8') as f:
-    json.dump(stats_clean, f, indent=2, ensure_ascii=False)
-
-print("\n✅ Analysis complete! Statistics saved to feedback_stats.json")
-print(f"\nTop 3 Branches by Overall Performance:")
-for i, (name, score, count) in enumerate(stats['rankings']['branches'][:3], 1):
-    print(f"  {i}. {name}: {score:.2f}/5.0 (n={count})")
-
-print(f"\nTop 3 Orientations by Overall Performance:")
-for i, (name, score, count) in enumerate(stats['rankings']['orientations'][:3], 1):
-    print(f"  {i}. {name}: {score:.2f}/5.0 (n={count})")
+def export_json(stats, path, compact=False):
+    """Stream stats to path (NaN -> null, NumPy scalars -> plain numbers); compact drops the indentation"""
+    write_json(stats, path, compact=compact)
+
+def print_rankings(stats):
+    print(f"\nTop 3 Branches by Overall Performance:")
+    for i, (name, score, count) in enumerate(stats['rankings']['branches'][:3], 1):
+        print(f"  {i}. {name}: {score:.2f}/5.0 (n={count})")
+
+    print(f"\nTop 3 Orientations by Overall Performance:")
+    for i, (name, score, count) in enumerate(stats['rankings']['orientations'][:3], 1):
+        print(f"  {i}. {name}: {score:.2f}/5.0 (n={count})")
 
 # Create a concise PowerPoint presentation
-def create_ppt_report(stats_dict, output_file):
+def create_ppt_report(stats_dict, output_file, input_files=()):
+    # python-pptx is only needed for the report; importing it here keeps the library and
+    # JSON-only runs free of the dependency
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import PP_ALIGN
+    from pptx.dml.color import RGBColor
+    from pptx.chart.data import CategoryChartData, ChartData, XyChartData
+    from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
+    from pptx.enum.shapes import MSO_SHAPE
+
     def safe_float(x, default=0.0):
         try:
             return float(x) if x is not None else default
@@ -1449,7 +1425,7 @@ def create_ppt_report(stats_dict, output_file):
     fill.fore_color.rgb = RGBColor(0, 31, 63)
     # Derive base_dir from first configured input file (XLSX/CSV) if available; fallback to script folder
     try:
-        first_input = next((p for p in input_files_used if os.path.exists(p)), None)
+        first_input = next((p for p in input_files if os.path.exists(p)), None)
     except Exception:
         first_input = None
     base_dir = os.path.dirname(first_input) if first_input else os.path.dirname(__file__)
@@ -2083,7 +2059,265 @@ def create_ppt_report(stats_dict, output_file):
 
     prs.save(output_file)
 
-# Generate PPT next to JSON
-ppt_path = '/Users/venkubabugollapudi/Desktop/Feedback/Feed Back/Pre_Primary_Feedback_Analysis.pptx'
-create_ppt_report(stats_clean, ppt_path)
-print(f"\n📁 PowerPoint saved: {ppt_path}")
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Aggregate parent feedback workbooks into feedback_stats.json and a PPT report.")
+    parser.add_argument("--config", default=None, help="JSON file of option values keyed by long option name (e.g. {\"input\": [\"inbox/*.xlsx\"], \"output_dir\": \"out\", \"no_ppt\": true}); command-line options override it")
+    parser.add_argument("--input", nargs="+", default=None, metavar="GLOB", help="Input CSV/XLSX files or glob patterns ('**' recurses; default: Parent Feedback Form files next to the script)")
+    parser.add_argument("--output-dir", default=None, help=f"Folder for {JSON_OUTPUT_NAME}, the shards and the PPT (default: {DEFAULT_OUTPUT_DIR} if it exists, else the script folder)")
+    parser.add_argument("--watch", action="store_true", help="Keep running: poll the inputs and re-run the whole pipeline once new or changed files have settled (unchanged workbooks come from the ingest cache; add --incremental to aggregate only new responses)")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="--watch: seconds between input scans (default: 5)")
+    parser.add_argument("--debounce", type=float, default=10.0, help="--watch: seconds the inputs must stay unchanged before a re-run (default: 10)")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every workbook from scratch without reading or writing the ingest cache")
+    parser.add_argument("--refresh-cache", action="store_true", help="Re-parse every workbook and overwrite its ingest cache entry")
+    parser.add_argument("--cache-dir", default=None, help=f"Ingest cache directory (default: {DEFAULT_CACHE_DIR_NAME} next to the script)")
+    parser.add_argument("--incremental", action="store_true", help="Only fold responses not seen by the previous run into the saved totals, then rebuild every JSON section from them (falls back to a full run when saved responses changed)")
+    parser.add_argument("--jobs", type=int, default=1, help="Parse input workbooks in N worker processes (0 = one per CPU); results are combined in file order")
+    parser.add_argument("--no-shards", action="store_true", help=f"Do not write the {DEFAULT_SHARD_DIR_NAME}/ manifest, summary and per-branch/per-section files the dashboard loads lazily")
+    parser.add_argument("--compact-json", action="store_true", help="Write feedback_stats.json and the shard files with compact separators and no indentation")
+    parser.add_argument("--compact", action="store_true", help=f"Also write {DEFAULT_COMPACT_NAME}, the dictionary-encoded form of the stats (see compact_stats.py)")
+    parser.add_argument("--precompress", action="store_true", help=f"Write deterministic .gz/.br siblings of every JSON artifact and a per-section size report ({DEFAULT_SIZE_REPORT_NAME})")
+    parser.add_argument("--no-ppt", action="store_true", help="Only write feedback_stats.json; skip the PowerPoint report")
+    parser.add_argument("--timings", default=None, metavar="PATH", help=f"Also write the per-stage timing table as JSON to PATH (e.g. {DEFAULT_TIMINGS_NAME})")
+    return parser
+
+def load_config(path):
+    """Read a --config JSON object; keys may use dashes or underscores, relative paths are taken from the config's folder"""
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path}: expected a JSON object of option values")
+    config_dir = os.path.dirname(os.path.abspath(path))
+    config = {}
+    for key, value in raw.items():
+        key = key.lstrip('-').replace('-', '_')
+        if key in CONFIG_PATH_KEYS and value:
+            if key == 'input':
+                value = [value] if isinstance(value, str) else list(value)
+                value = [os.path.join(config_dir, os.path.expanduser(v)) for v in value]
+            else:
+                value = os.path.join(config_dir, os.path.expanduser(value))
+        config[key] = value
+    return config
+
+def parse_args(argv=None):
+    """Command-line options layered over the --config file (if any)"""
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.config:
+        try:
+            config = load_config(args.config)
+        except Exception as e:
+            parser.error(f"could not read --config {args.config}: {e}")
+        unknown = sorted(k for k in config if k not in vars(args) or k == 'config')
+        if unknown:
+            parser.error(f"unknown option(s) in {args.config}: {', '.join(unknown)}")
+        parser.set_defaults(**config)
+        args = parser.parse_args(argv)
+    return args
+
+def input_snapshot(base_dir, patterns=None):
+    """{path: (size, mtime_ns)} for every file discover_input_files would consider"""
+    _, xlsx_files, csv_files = discover_input_files(base_dir, patterns)
+    snapshot = {}
+    for path in xlsx_files + csv_files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        snapshot[path] = (st.st_size, st.st_mtime_ns)
+    return snapshot
+
+def watch_inputs(args, poll_interval=5.0, debounce=10.0):
+    """Run the pipeline now and again whenever the inputs change and then stay unchanged for
+    debounce seconds (so a workbook still being copied or exported is not read half-written).
+
+    Each re-run is a full run_pipeline call (stats, JSON, shards, PPT); it stays cheap because
+    unchanged workbooks come from the ingest cache and, with --incremental, only responses not
+    seen before are folded into the saved totals. A failed run is retried after another debounce
+    period. Stops on Ctrl+C.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    print(f"Watching {', '.join(args.input) if args.input else base_dir} (poll every {poll_interval:g}s, debounce {debounce:g}s)")
+    processed = None
+    seen = input_snapshot(base_dir, args.input)
+    changed_at = None
+    try:
+        while True:
+            if seen != processed and (changed_at is None or time.monotonic() - changed_at >= debounce):
+                if seen:
+                    print(f"\n=== Running on {len(seen)} input file(s) at {time.strftime('%Y-%m-%d %H:%M:%S')} ===")
+                    try:
+                        run_pipeline(args)
+                        processed = seen
+                    except Exception as e:
+                        # Not marked processed: retried once another debounce period has passed
+                        print(f"Warning: run failed: {e}; retrying in {debounce:g}s")
+                        changed_at = time.monotonic()
+                else:
+                    processed = seen
+                    print("No input files yet; waiting.")
+            time.sleep(poll_interval)
+            current = input_snapshot(base_dir, args.input)
+            if current != seen:
+                seen = current
+                changed_at = time.monotonic()
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    return 0
+
+def run_pipeline(args):
+    """One full (or --incremental) run: inputs -> feedback_stats.json, shards, extras and the PPT"""
+    timer = StageTimer()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    cache_dir = args.cache_dir or os.path.join(base_dir, DEFAULT_CACHE_DIR_NAME)
+    output_dir = resolve_output_dir(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    json_path = os.path.join(output_dir, JSON_OUTPUT_NAME)
+    ppt_path = os.path.join(output_dir, PPT_OUTPUT_NAME)
+
+    # Read multiple CSV/XLSX files: the --input globs, or auto-discover in the script directory
+    with timer.stage('discover_inputs'):
+        input_files_used, xlsx_files, csv_files = discover_input_files(base_dir, args.input)
+
+    ingest_cache = None
+    if not args.no_cache:
+        try:
+            ingest_cache = IngestCache(cache_dir, refresh=args.refresh_cache, parser_fingerprint=PARSER_FINGERPRINT)
+        except Exception as e:
+            print(f"Warning: ingest cache disabled: {e}")
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    with timer.stage('read_inputs') as size:
+        df = load_responses(input_files_used, xlsx_files, csv_files, ingest_cache, jobs, timer)
+        size['rows'], size['cols'] = df.shape
+    if ingest_cache is not None:
+        try:
+            ingest_cache.prune()
+        except OSError as e:
+            print(f"Warning: could not prune the ingest cache: {e}")
+
+    # Totals saved by the previous run: --incremental folds only the responses they have not seen.
+    # Nothing is saved without the cache, so --no-cache runs skip the row hashes altogether.
+    state_path = os.path.join(cache_dir, DEFAULT_STATE_NAME)
+    hashes = contents = fingerprint = state = rows = positions = None
+    if not args.no_cache:
+        fingerprint = totals_fingerprint(df.columns)
+        with timer.stage('row_hashes', df):
+            hashes = key_hashes(row_keys(df))
+            contents = content_hashes(df)
+    if args.incremental and args.no_cache:
+        print("Note: --incremental needs the totals saved in the cache; running a full analysis (--no-cache).")
+    elif args.incremental:
+        with timer.stage('select_new_responses') as size:
+            df, rows, state, positions = select_new_responses(df, hashes, contents, state_path, fingerprint)
+            size['rows'], size['cols'] = df.shape
+        if state is not None:
+            # Nothing new still rebuilds the stats from the saved totals (no rows to fold), so
+            # --compact, --precompress, --no-shards, --output-dir and the PPT are honoured
+            if df.empty:
+                print("No new responses since the last run; writing the outputs from the saved totals.")
+            else:
+                print(f"Incremental refresh: {len(df)} new response(s)")
+
+    # Print basic info
+    print(f"Total records: {len(df)}")
+    print(f"\nColumns ({len(df.columns)}):")
+    for i, col in enumerate(df.columns, 1):
+        print(f"{i}. {col}")
+
+    # Rating labels and column roles resolved on earlier runs
+    label_table_path = os.path.join(cache_dir, DEFAULT_LABEL_TABLE_NAME)
+    role_cache_path = os.path.join(cache_dir, DEFAULT_ROLE_CACHE_NAME)
+    if not args.no_cache:
+        LABELS.load(label_table_path)
+        ROLES.load(role_cache_path)
+    with timer.stage('normalize') as size:
+        df, roles, branch_names = normalize_responses(df, state.branch_names if state is not None else None, timer)
+        size['rows'], size['cols'] = df.shape
+    report_unknown_rating_labels(df, roles)
+    with timer.stage('reason_table', df):
+        reason_table = build_recommendation_reason_table(df, roles)
+    with timer.stage('stats', df):
+        with timer.stage('totals'):
+            totals = response_totals(df, roles, reason_table, rows)
+            if state is not None:
+                totals = add_saved_totals(state, totals, positions, branch_names)
+        stats = aggregate_stats(totals, roles, timer)
+
+    with timer.stage('fallbacks'):
+        apply_fallbacks(stats)
+
+    # Now that all aggregates are computed, save JSON (NaN becomes null while streaming)
+    with timer.stage('export'):
+        with timer.stage('json'):
+            export_json(stats, json_path, compact=args.compact_json)
+        artifact_paths = [json_path]
+        if args.compact:
+            compact_path = os.path.join(output_dir, DEFAULT_COMPACT_NAME)
+            with timer.stage('compact'):
+                write_compact(stats, compact_path)
+            artifact_paths.append(compact_path)
+            print(f"Compact stats: {compact_path} ({os.path.getsize(compact_path):,} bytes vs {os.path.getsize(json_path):,})")
+        shard_dir = os.path.join(output_dir, DEFAULT_SHARD_DIR_NAME)
+        if args.no_shards:
+            # Stale shards would shadow the fresh JSON in the dashboard
+            if remove_manifest(shard_dir):
+                print(f"Note: removed the old shard manifest in {shard_dir}; the dashboard will load feedback_stats.json")
+        else:
+            with timer.stage('shards'):
+                manifest = write_shards(stats, shard_dir, compact=args.compact_json)
+            artifact_paths.extend(os.path.join(shard_dir, rel) for rel in shard_files(manifest))
+            print(f"Dashboard shards: summary + {len(manifest['branches'])} branch and {len(manifest['sections'])} section file(s) in {shard_dir}")
+        if args.precompress:
+            with timer.stage('precompress'):
+                report = precompress_artifacts(artifact_paths, stats, os.path.join(output_dir, DEFAULT_SIZE_REPORT_NAME), base_dir=output_dir)
+            print_size_report(report)
+        else:
+            # .gz/.br files from an earlier --precompress run no longer match the JSON written above
+            remove_compressed_siblings(artifact_paths)
+        if hashes is not None:
+            try:
+                with timer.stage('incremental_state'):
+                    IncrementalState(fingerprint, totals, hashes, contents, branch_names).save(state_path)
+            except Exception as e:
+                print(f"Warning: could not save the response totals: {e}")
+        if not args.no_cache and LABELS.added:
+            try:
+                LABELS.save(label_table_path)
+            except Exception as e:
+                print(f"Warning: could not save the rating label table: {e}")
+        if not args.no_cache and ROLES.added:
+            try:
+                ROLES.save(role_cache_path)
+            except Exception as e:
+                print(f"Warning: could not save the column roles: {e}")
+
+    print(f"\n✅ Analysis complete! Statistics saved to {json_path}")
+    print_rankings(stats)
+
+    # Generate PPT next to JSON
+    if not args.no_ppt:
+        with timer.stage('ppt'):
+            with timer.stage('clean_nan'):
+                stats_clean = clean_nan(stats)
+            with timer.stage('create_ppt_report'):
+                create_ppt_report(stats_clean, ppt_path, input_files_used)
+        print(f"\n📁 PowerPoint saved: {ppt_path}")
+
+    timer.print_summary()
+    if args.timings:
+        try:
+            timer.write(args.timings)
+            print(f"Timings written to {args.timings}")
+        except Exception as e:
+            print(f"Warning: could not write timings: {e}")
+    return 0
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.watch:
+        return watch_inputs(args, args.poll_interval, args.debounce)
+    return run_pipeline(args)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,345 @@
+"""Scaling benchmark for analyze_feedback.py on synthetic feedback workbooks.
+
+Synthetic inputs are modelled on a template workbook, by default the Parent Feedback Form
+export next to this script. They reuse its exact header row, i.e. the real bilingual
+headers, and sample every column from the values seen in that column: rating labels, class,
+orientation, reasons, blanks. Timestamp and SCS NUMBER are unique per row, and branches are
+the template's branches plus synthetic ones up to --branches. Rows are split over one file
+per segment (--segments), with the segment in the file name as in production exports.
+Workbooks with more rows than an Excel sheet allows are split into parts.
+
+    python3 benchmark.py --rows 50k,500k --branches 48,200
+    python3 benchmark.py --rows 5M --format csv --segments "Pre Primary=2,Primary=2,High School=1"
+    python3 benchmark.py --rows 50k --out bench.json --compare bench_prev.json -- --jobs 2
+
+Generated inputs are kept in .bench_data/ (keyed by every generation setting and the
+template's hash), so re-running on another commit measures the same data. Each size is
+analyzed in a fresh process (`--no-cache --no-ppt --timings`, plus anything after `--`),
+so peak RSS belongs to that run alone. The per-stage table reports wall time, throughput
+(input rows per second) and peak RSS. --out saves the results with the commit id, and
+--compare flags stages that got slower than --threshold times a previous results file.
+"""
+import argparse
+import datetime
+import glob
+import hashlib
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from json_export import write_json
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_DIR = os.path.join(SCRIPT_DIR, '.bench_data')
+INPUT_NAME = 'Parent Feedback Form – Academic & Administrative Review - {segment}{part}.{ext}'
+XLSX_MAX_ROWS = 1048575  # one sheet, minus the header row
+CHUNK_ROWS = 50000
+# Stages shorter than this are too noisy to call a regression
+MIN_COMPARE_SECONDS = 0.05
+
+
+def parse_count(text):
+    """'50k' -> 50000, '5M' -> 5000000, '1200' -> 1200"""
+    m = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kKmM]?)\s*', text)
+    if not m:
+        raise argparse.ArgumentTypeError(f"not a row count: {text!r}")
+    scale = {'': 1, 'k': 1000, 'm': 1000000}[m.group(2).lower()]
+    return int(float(m.group(1)) * scale)
+
+
+def parse_segments(text):
+    """'Pre Primary=2,Primary=1' -> [('Pre Primary', 2.0), ('Primary', 1.0)] (weights)"""
+    segments = []
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip():
+            segments.append((name.strip(), float(weight) if weight.strip() else 1.0))
+    if not segments or sum(w for _, w in segments) <= 0:
+        raise argparse.ArgumentTypeError(f"no segment weights in {text!r}")
+    return segments
+
+
+def split_rows(total, weights):
+    """Split total rows in proportion to weights (largest remainder, so the parts add up)"""
+    weights = np.asarray(weights, dtype=float)
+    exact = total * weights / weights.sum()
+    counts = np.floor(exact).astype(int)
+    for i in np.argsort(-(exact - counts))[:total - counts.sum()]:
+        counts[i] += 1
+    return counts.tolist()
+
+
+def default_template():
+    sys.path.insert(0, SCRIPT_DIR)
+    from analyze_feedback import discover_input_files
+    input_files, _, _ = discover_input_files(SCRIPT_DIR)
+    if not input_files:
+        raise SystemExit("No template workbook found next to benchmark.py; pass --template")
+    return input_files[0]
+
+
+def load_template(path):
+    """(headers, frame) of the template: raw header strings by position and its response rows"""
+    sys.path.insert(0, SCRIPT_DIR)
+    from analyze_feedback import detect_excel_header_row, try_read_excel_with_header_detection
+    if path.lower().endswith('.csv'):
+        frame = pd.read_csv(path, dtype=object)
+        headers = list(pd.read_csv(path, nrows=0).columns)
+        return headers, frame
+    from openpyxl import load_workbook
+    header_row = detect_excel_header_row(path)
+    # Read the header cells themselves: pandas would rename repeated headers ("X.1")
+    wb = load_workbook(path, read_only=True)
+    try:
+        ws = wb.worksheets[0]
+        headers = next(ws.iter_rows(min_row=header_row + 1, max_row=header_row + 1, values_only=True))
+    finally:
+        wb.close()
+    frame = try_read_excel_with_header_detection(path, header_row)
+    headers = [str(h) if h is not None else '' for h in headers][:frame.shape[1]]
+    return headers, frame.dropna(how='all')
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def template_branches(headers, frame):
+    """Branch names in the template's branch column, most frequent first"""
+    col = next((i for i, h in enumerate(headers) if h.strip().lower().startswith('name of the branch')), None)
+    if col is None:
+        return []
+    return list(frame.iloc[:, col].dropna().astype(str).str.strip().value_counts().index)
+
+
+class RowSampler:
+    """Draws synthetic response rows column by column from a template's value frequencies"""
+
+    def __init__(self, headers, frame, branches, seed):
+        self.headers = headers
+        self.rng = np.random.default_rng(seed)
+        self.columns = []
+        for i, header in enumerate(headers):
+            low = header.strip().lower()
+            if low.startswith('timestamp'):
+                self.columns.append(('timestamp', None, None))
+            elif low.startswith('scs number'):
+                self.columns.append(('scs', None, None))
+            elif low.startswith('name of the branch'):
+                self.columns.append(('branch', None, None))
+            else:
+                counts = frame.iloc[:, i].value_counts(dropna=False)
+                values = np.array([None if pd.isna(v) else v for v in counts.index], dtype=object)
+                self.columns.append(('sample', values, (counts.values / counts.values.sum())))
+        real = template_branches(headers, frame)
+        self.branches = np.array((real + [f"SYNTHETIC BRANCH {n:04d}" for n in range(len(real) + 1, branches + 1)])[:branches], dtype=object)
+        self.start = datetime.datetime(2025, 12, 22, 9, 0, 0)
+
+    def chunk(self, first_row, n):
+        """DataFrame of rows first_row .. first_row + n - 1 (positional columns)"""
+        out = {}
+        row_ids = np.arange(first_row, first_row + n)
+        for i, (kind, values, probs) in enumerate(self.columns):
+            if kind == 'timestamp':
+                out[i] = [(self.start + datetime.timedelta(seconds=int(r))).strftime('%Y/%m/%d %I:%M:%S %p GMT+5:30') for r in row_ids]
+            elif kind == 'scs':
+                out[i] = [f"Scs{1000000 + int(r)}" for r in row_ids]
+            elif kind == 'branch':
+                out[i] = self.branches[self.rng.integers(0, len(self.branches), n)]
+            else:
+                out[i] = values[self.rng.choice(len(values), size=n, p=probs)]
+        return pd.DataFrame(out)
+
+
+def _write_xlsx(path, headers, chunks):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Form Responses 1')
+    ws.append(headers)
+    for chunk in chunks:
+        for row in chunk.itertuples(index=False, name=None):
+            ws.append(list(row))
+    wb.save(path)
+
+
+def _write_csv(path, headers, chunks):
+    first = True
+    for chunk in chunks:
+        chunk.to_csv(path, mode='w' if first else 'a', header=headers if first else False, index=False)
+        first = False
+
+
+def generate_inputs(data_dir, template, rows, branches, segments, fmt, seed):
+    """Write (or reuse) one synthetic input set; returns its directory"""
+    key = json.dumps([rows, branches, segments, fmt, seed, file_hash(template)])
+    set_dir = os.path.join(data_dir, f"{fmt}-r{rows}-b{branches}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]}")
+    done_marker = os.path.join(set_dir, 'generated.json')
+    if os.path.exists(done_marker):
+        return set_dir
+    os.makedirs(set_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(set_dir, '*.' + fmt)):
+        os.remove(stale)
+
+    headers, frame = load_template(template)
+    sampler = RowSampler(headers, frame, branches, seed)
+    first_row = 0
+    for (segment, _), seg_rows in zip(segments, split_rows(rows, [w for _, w in segments])):
+        per_file = XLSX_MAX_ROWS if fmt == 'xlsx' else max(seg_rows, 1)
+        parts = max(1, -(-seg_rows // per_file))
+        for part in range(parts):
+            part_rows = min(per_file, seg_rows - part * per_file)
+            name = INPUT_NAME.format(segment=segment, part=f' part {part + 1}' if parts > 1 else '', ext=fmt)
+
+            def chunks(start=first_row, count=part_rows):
+                for offset in range(0, count, CHUNK_ROWS):
+                    yield sampler.chunk(start + offset, min(CHUNK_ROWS, count - offset))
+
+            (_write_xlsx if fmt == 'xlsx' else _write_csv)(os.path.join(set_dir, name), headers, chunks())
+            first_row += part_rows
+    write_json({'rows': rows, 'branches': branches, 'segments': segments, 'format': fmt, 'seed': seed, 'template': os.path.basename(template)}, done_marker)
+    return set_dir
+
+
+def run_pipeline_benchmark(input_dir, fmt, rows, extra_args):
+    """Run analyze_feedback.py on one input set in a fresh process; returns its timing summary"""
+    with tempfile.TemporaryDirectory(prefix='feedback-bench-') as out_dir:
+        timings_path = os.path.join(out_dir, 'timings.json')
+        cmd = [sys.executable, os.path.join(SCRIPT_DIR, 'analyze_feedback.py'),
+               '--input', os.path.join(input_dir, '*.' + fmt), '--output-dir', out_dir,
+               '--no-cache', '--no-ppt', '--timings', timings_path] + list(extra_args)
+        started = time.perf_counter()
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - started
+        if proc.returncode != 0:
+            raise RuntimeError(f"analyze_feedback.py failed on {input_dir}:\n{proc.stderr[-2000:]}")
+        with open(timings_path, 'r', encoding='utf-8') as f:
+            timings = json.load(f)
+    for stage in timings['stages']:
+        stage['rows_per_s'] = round(rows / stage['wall_s']) if stage['wall_s'] > 0 else None
+    timings['process_wall_s'] = round(wall, 3)
+    return timings
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_key(run):
+    return (run['rows'], run['branches'], json.dumps(run['segments']), run['format'])
+
+
+def print_run(run, top_level_only=False):
+    t = run['timings']
+    print(f"\n{run['rows']:,} rows, {run['branches']} branches, {run['format']}, segments "
+          f"{', '.join(f'{s}={w:g}' for s, w in run['segments'])}: {t['total_wall_s']:.2f}s wall, "
+          f"{run['rows'] / max(t['total_wall_s'], 1e-9):,.0f} rows/s, peak RSS {t['peak_rss_mb'] or 0:.0f} MB")
+    print(f"  {'stage':<40} {'wall s':>9} {'rows/s':>12} {'peak MB':>9}")
+    for s in t['stages']:
+        if top_level_only and s['depth']:
+            continue
+        label = '  ' * s['depth'] + s['stage'].rsplit('/', 1)[-1]
+        rate = '-' if s['rows_per_s'] is None else f"{s['rows_per_s']:,}"
+        peak = '-' if s['peak_rss_mb'] is None else f"{s['peak_rss_mb']:.1f}"
+        print(f"  {label:<40} {s['wall_s']:>9.3f} {rate:>12} {peak:>9}")
+
+
+def compare_results(current, previous, threshold):
+    """Print per-stage slowdowns vs a previous results file; returns the regressed (run, stage) pairs"""
+    before = {run_key(r): {s['stage']: s for s in r['timings']['stages']} for r in previous['runs']}
+    regressions = []
+    print(f"\nCompared with {previous.get('commit') or 'previous results'} (threshold {threshold:g}x):")
+    for run in current['runs']:
+        old_stages = before.get(run_key(run))
+        if old_stages is None:
+            print(f"  {run['rows']:,} rows / {run['branches']} branches: no matching run")
+            continue
+        for s in run['timings']['stages']:
+            old = old_stages.get(s['stage'])
+            if old is None or max(old['wall_s'], s['wall_s']) < MIN_COMPARE_SECONDS:
+                continue
+            ratio = s['wall_s'] / max(old['wall_s'], 1e-9)
+            if ratio >= threshold:
+                regressions.append((run_key(run), s['stage']))
+                print(f"  SLOWER {run['rows']:,} rows / {run['branches']} branches  {s['stage']}: {old['wall_s']:.3f}s -> {s['wall_s']:.3f}s ({ratio:.2f}x)")
+            elif ratio <= 1 / threshold:
+                print(f"  faster {run['rows']:,} rows / {run['branches']} branches  {s['stage']}: {old['wall_s']:.3f}s -> {s['wall_s']:.3f}s ({ratio:.2f}x)")
+    if not regressions:
+        print("  no stage regressed")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark analyze_feedback.py on synthetic workbooks of growing size.")
+    parser.add_argument("--rows", default="50k", help="Comma-separated total row counts, e.g. 50k,500k,5M (default: 50k)")
+    parser.add_argument("--branches", default=None, help="Comma-separated branch counts (default: the template's)")
+    parser.add_argument("--segments", type=parse_segments, default=parse_segments("Pre Primary=1"), help="Segment mix as name=weight pairs (default: 'Pre Primary=1')")
+    parser.add_argument("--format", choices=("xlsx", "csv"), default="xlsx", help="Input format to generate (default: xlsx; csv is much faster to write for millions of rows)")
+    parser.add_argument("--template", default=None, help="Workbook (or CSV) whose headers and value frequencies are copied (default: the feedback form next to this script)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Where generated inputs are kept between runs (default: .bench_data next to this script)")
+    parser.add_argument("--generate-only", action="store_true", help="Write the synthetic inputs and stop")
+    parser.add_argument("--all-stages", action="store_true", help="Also print nested stages (per stats block, Excel read, ...)")
+    parser.add_argument("--out", default=None, help="Write the results as JSON")
+    parser.add_argument("--compare", default=None, help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="--compare: slowdown ratio reported as a regression (default: 1.2)")
+    parser.add_argument("pipeline_args", nargs=argparse.REMAINDER, help="Options after -- are passed to analyze_feedback.py")
+    args = parser.parse_args(argv)
+
+    extra_args = args.pipeline_args[1:] if args.pipeline_args[:1] == ['--'] else args.pipeline_args
+    template = args.template or default_template()
+    row_counts = [parse_count(r) for r in args.rows.split(',') if r.strip()]
+    if args.branches:
+        branch_counts = [int(b) for b in args.branches.split(',') if b.strip()]
+    else:
+        branch_counts = [max(1, len(template_branches(*load_template(template))))]
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'pipeline_args': extra_args,
+        'runs': [],
+    }
+    for rows in row_counts:
+        for branches in branch_counts:
+            started = time.perf_counter()
+            input_dir = generate_inputs(args.data_dir, template, rows, branches, args.segments, args.format, args.seed)
+            print(f"Inputs for {rows:,} rows / {branches} branches: {input_dir} ({time.perf_counter() - started:.1f}s)")
+            if args.generate_only:
+                continue
+            run = {'rows': rows, 'branches': branches, 'segments': args.segments, 'format': args.format,
+                   'timings': run_pipeline_benchmark(input_dir, args.format, rows, extra_args)}
+            results['runs'].append(run)
+            print_run(run, top_level_only=not args.all_stages)
+
+    if args.out and results['runs']:
+        write_json(results, args.out)
+        print(f"\nResults written to {args.out}")
+    if args.compare and results['runs']:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if compare_results(results, previous, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
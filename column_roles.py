@@ -0,0 +1,344 @@
+"""Column roles: which headers each stats block reads, resolved once per header set.
+
+normalize_responses needs a few dozen header lists: the subject / environment / admin
+question groups, the recommend / app / transport / PTM columns, the communication metric
+questions, the teaching indicators, the concern columns and the multi-select reason columns.
+All of them are keyword tests on the headers alone, so resolve_roles() computes the whole
+roles dict from (columns, key_cols), and ColumnRoleCache keeps one entry per distinct header
+set, keyed by a fingerprint of the headers. Every stage then reads roles[...] instead of
+rescanning df.columns.
+
+The cache can be saved next to the ingest cache (column_roles.json) and loaded on the next
+run; entries are ignored once the rules in this file change. The file is indented JSON, one
+roles dict per header set, and `python3 column_roles.py [path]` prints it role by role.
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import re
+import sys
+
+from ingest_cache import DEFAULT_CACHE_DIR_NAME
+from json_export import write_json
+
+DEFAULT_ROLE_CACHE_NAME = 'column_roles.json'
+# Header sets kept in the saved cache (the most recently used ones)
+MAX_SAVED_SCHEMAS = 20
+
+# Identifier / free-text columns that are never converted to rating scores
+NON_RATING_COLUMNS = ['Timestamp', 'Student Name( மாணவர் பெயர்)', 'SCS NUMBER( SCS எண்)',
+                      'Parent Name( பெற்றோர் பெயர்) ', 'Parent Phone Number( பெற்றோர் தொலைபேசி எண்)']
+# The same columns matched on the English start of the header, so exports whose Tamil part
+# is mis-encoded are recognised too
+NON_RATING_PREFIXES = ('timestamp', 'student name', 'scs number', 'parent name', 'parent phone number')
+
+# Per-respondent columns normalize_responses adds, in the order it adds them: the group
+# averages after the *_numeric scores, then the focus averages
+GROUP_AVG_COLUMNS = ['Subject_Avg', 'Environment_Avg', 'Infrastructure_Avg', 'Parent_Teacher_Avg', 'Admin_Avg', 'Overall_Avg']
+FOCUS_AVG_COLUMNS = ['Communication_Avg', 'Safety_Avg', 'Hygiene_Avg', 'PTM_Avg']
+
+with open(__file__, 'rb') as _f:
+    # Any edit to the rules below invalidates saved roles
+    RULES_FINGERPRINT = hashlib.sha1(_f.read()).hexdigest()
+
+
+def normalize_header(s):
+    try:
+        t = str(s).strip().lower()
+    except Exception:
+        t = str(s).lower()
+    t = re.sub(r"\s+", " ", t)
+    return t
+
+
+def detect_rating_groups(columns):
+    """Subject / environment / infrastructure / parent-teacher / admin / excellence columns, {short name: header}"""
+    subject_cols = {}
+    for col in columns:
+        lowc = str(col).lower()
+        if 'subject wise feedback' in lowc:
+            # Extract name inside square brackets if present
+            m = re.search(r'\[(.*?)\]', str(col))
+            if m:
+                name = m.group(1).strip()
+            else:
+                # Fallback: take text after the keyword
+                name = str(col).split(')', 1)[-1].strip()[:60]
+            # Shorten noisy names
+            name = re.sub(r'\s+', ' ', name)
+            name = name.replace('skills', '').replace(' - ', ' ').strip()
+            # Avoid duplicates
+            base = name if name else 'Subject'
+            key = base
+            i = 2
+            while key in subject_cols:
+                key = f"{base} {i}"
+                i += 1
+            subject_cols[key] = col
+
+    # Environment quality columns (shortened names for analysis)
+    env_cols = {}
+    infra_cols = {}
+    parent_cols = {}
+    admin_cols = {}
+    excellence_cols = {}
+
+    for col in columns:
+        lowc = str(col).lower()
+        if 'overall quality of the school environment' in lowc:
+            match = re.search(r'\[(.*?)\]', col)
+            if match:
+                key = match.group(1).split('(')[0].strip()[:50]
+                env_cols[key] = col
+        elif 'overall school infrastructure' in lowc:
+            match = re.search(r'\[(.*?)\]', col)
+            if match:
+                key = match.group(1).split('(')[0].strip()[:50]
+                infra_cols[key] = col
+        elif ('parent-teacher' in lowc or 'parent–teacher' in lowc or 'ptm' in lowc):
+            match = re.search(r'\[(.*?)\]', col)
+            if match:
+                key = match.group(1).split('(')[0].strip()[:50]
+                parent_cols[key] = col
+        elif ('administration' in lowc or 'admin team' in lowc or 'front office' in lowc or 'leadership' in lowc or 'principal' in lowc or 'vice principal' in lowc or 'coordinator' in lowc or 'administrative support' in lowc):
+            match = re.search(r'\[(.*?)\]', col)
+            if match:
+                key = match.group(1).split('(')[0].strip()[:50]
+                admin_cols[key] = col
+        elif 'program for excellence' in lowc:
+            match = re.search(r'\[(.*?)\]', col)
+            if match:
+                key = match.group(1).split('(')[0].strip()[:80]
+                excellence_cols[key] = col
+    return subject_cols, env_cols, infra_cols, parent_cols, admin_cols, excellence_cols
+
+
+def reason_columns(columns):
+    """(strength, improvement) multi-select reason columns: "Mention two areas ..." / "... further improve" """
+    columns = list(columns)
+    sat_cols = [c for c in columns if 'mention two areas' in str(c).lower() or 'most satisfied' in str(c).lower() or ('you are most satisfied' in str(c).lower())]
+    improve_cols = [c for c in columns if 'further improve' in str(c).lower() or 'can further improve' in str(c).lower() or ('choose two areas' in str(c).lower() and 'improve' in str(c).lower())]
+    return sat_cols, improve_cols
+
+
+def non_rating_columns(columns, key_cols):
+    """Key, Segment, identifier and multi-select reason columns: free text that gets no *_numeric score"""
+    sat_cols, improve_cols = reason_columns(columns)
+    skip = set(key_cols.values()) | set(NON_RATING_COLUMNS) | {'Segment'} | set(sat_cols) | set(improve_cols)
+    skip.update(c for c in columns if normalize_header(c).startswith(NON_RATING_PREFIXES))
+    return skip
+
+
+def comm_metric_label(col):
+    """Communication metric a question belongs to (None for other columns)"""
+    low = str(col).lower()
+    if 'front office' in low or 'front-office' in low:
+        return 'Front Office Support'
+    if 'leadership' in low or 'principal access' in low or ('access' in low and 'principal' in low):
+        return 'Leadership Access'
+    if 'app' in low and ('usability' in low or 'use' in low):
+        return 'App Usability'
+    if 'timely updates' in low:
+        return 'Timely Updates'
+    return None
+
+
+def communication_metric_cols(columns):
+    """{metric label: [source columns]}, labels in order of their first column; *_numeric twins skipped"""
+    out = {}
+    for col in columns:
+        if str(col).endswith('_numeric'):
+            continue
+        label = comm_metric_label(col)
+        if label:
+            out.setdefault(label, []).append(col)
+    return out
+
+
+def env_focus_label(question):
+    """Environment focus metric of an environment-quality question (None for the others)"""
+    low = question.lower()
+    if 'interest' in low or 'enthusiasm' in low:
+        return 'Interest in attending school'
+    if 'secure' in low or 'safety' in low:
+        return 'Campus safety'
+    if 'moral' in low or 'values' in low:
+        return 'Moral values'
+    if 'social' in low or 'confidence' in low:
+        return 'Social confidence'
+    return None
+
+
+def resolve_roles(columns, key_cols):
+    """The roles dict of a response frame with these (key-normalized) headers.
+
+    Each list is taken over the columns the frame has at the point normalize_responses used
+    to scan it: the raw headers, then their *_numeric twins and the group averages, then the
+    focus averages.
+    """
+    columns = list(columns)
+    rating_cols = [c for c in columns if c not in non_rating_columns(columns, key_cols)]
+    subject_cols, env_cols, infra_cols, parent_cols, admin_cols, excellence_cols = detect_rating_groups(columns)
+    scored = list(dict.fromkeys(columns + [c + '_numeric' for c in rating_cols] + GROUP_AVG_COLUMNS))
+    final = list(dict.fromkeys(scored + FOCUS_AVG_COLUMNS))
+
+    # Additional column detections for advanced dashboards
+    recommend_cols = [c for c in scored if 'recommend' in str(c).lower()]
+    app_cols = [c for c in scored if ' app' in str(c).lower() or 'app ' in str(c).lower() or 'application' in str(c).lower()]
+    transport_cols = [c for c in scored if 'transport' in str(c).lower()]
+    ptm_cols = [c for c in scored if 'parent-teacher' in str(c).lower() or 'parent–teacher' in str(c).lower() or 'ptm' in str(c).lower()]
+    comm_cols_all = [c for c in scored if not str(c).endswith('_numeric') and comm_metric_label(c)]
+    safety_cols = [col for key, col in env_cols.items() if ('secure' in str(key).lower() or 'safety' in str(key).lower() or 'security' in str(key).lower())]
+    hygiene_cols = [col for key, col in infra_cols.items() if ('hygiene' in str(key).lower() or 'clean' in str(key).lower())]
+    # Later questions with the same focus label replace earlier ones
+    env_focus_cols = {}
+    for key, col in env_cols.items():
+        label = env_focus_label(key)
+        if label:
+            env_focus_cols[label] = col
+
+    sat_cols, improve_cols = reason_columns(c for c in final if not str(c).endswith('_numeric'))
+
+    # Teaching indicators
+    clarity_cols = [c for c in final if 'concept' in str(c).lower() or 'clarity' in str(c).lower()]
+    approach_cols = [c for c in final if 'approach' in str(c).lower() or 'approachability' in str(c).lower()]
+    engagement_cols = [c for c in final if 'engage' in str(c).lower() or 'stories' in str(c).lower() or 'rhymes' in str(c).lower() or 'activities' in str(c).lower()]
+    comm_skill_cols = [c for c in final if 'communication skills' in str(c).lower()]
+
+    # Concern handling (role-wise)
+    concern_roles_map = {}
+    for col in final:
+        low = str(col).lower()
+        if 'addresses my concerns' in low or 'handles my concerns' in low or 'addresses concerns' in low:
+            m = re.search(r'\[(.*?)\]', str(col))
+            if m:
+                role = m.group(1).strip()
+                concern_roles_map[role] = col
+
+    # Concern resolution satisfaction (Yes/No/NA)
+    concern_resolve_cols = [c for c in final if ('handles concerns' in str(c).lower() or 'actions taken' in str(c).lower() or 'resolve' in str(c).lower()) and ('select' in str(c).lower() or 'not applicable' in str(c).lower())]
+
+    roles = dict(key_cols)
+    roles.update({
+        'rating_cols': rating_cols,
+        'subject_cols': subject_cols,
+        'env_cols': env_cols,
+        'infra_cols': infra_cols,
+        'parent_cols': parent_cols,
+        'admin_cols': admin_cols,
+        'excellence_cols': excellence_cols,
+        'recommend_cols': recommend_cols,
+        'app_cols': app_cols,
+        'transport_cols': transport_cols,
+        'ptm_cols': ptm_cols,
+        'comm_cols_all': comm_cols_all,
+        'comm_metric_cols': communication_metric_cols(scored),
+        'safety_cols': safety_cols,
+        'hygiene_cols': hygiene_cols,
+        'env_focus_cols': env_focus_cols,
+        'sat_cols': sat_cols,
+        'improve_cols': improve_cols,
+        'clarity_cols': clarity_cols,
+        'approach_cols': approach_cols,
+        'engagement_cols': engagement_cols,
+        'comm_skill_cols': comm_skill_cols,
+        'concern_roles_map': concern_roles_map,
+        'concern_resolve_cols': concern_resolve_cols,
+    })
+    return roles
+
+
+def schema_fingerprint(columns, key_cols):
+    """Fingerprint of a header list (in order) and the key columns resolved from it"""
+    payload = json.dumps([[str(c) for c in columns], sorted(key_cols.items())], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ColumnRoleCache:
+    """Header fingerprint -> roles dict, each distinct header set resolved the first time it is seen"""
+
+    def __init__(self):
+        self.schemas = {}
+        self.added = 0
+
+    def resolve(self, columns, key_cols):
+        """roles for these headers (a copy, so callers may modify it)"""
+        columns = list(columns)
+        fingerprint = schema_fingerprint(columns, key_cols)
+        entry = self.schemas.pop(fingerprint, None)
+        if entry is None:
+            entry = {'columns': len(columns), 'roles': resolve_roles(columns, key_cols)}
+            # Headers that are not strings would not survive the JSON round trip
+            entry['persist'] = all(isinstance(c, str) for c in columns)
+            self.added += 1
+        # Most recently used last, so save() keeps the newest header sets
+        self.schemas[fingerprint] = entry
+        return copy.deepcopy(entry['roles'])
+
+    def load(self, path):
+        """Add the header sets saved at path (when written with the current rules); returns how many"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except Exception:
+            return 0
+        if raw.get('rules') != RULES_FINGERPRINT:
+            return 0
+        for fingerprint, entry in raw.get('schemas', {}).items():
+            self.schemas.setdefault(fingerprint, {'columns': entry['columns'], 'roles': entry['roles'], 'persist': True})
+        return len(raw.get('schemas', {}))
+
+    def save(self, path):
+        saved = [(fp, e) for fp, e in self.schemas.items() if e['persist']][-MAX_SAVED_SCHEMAS:]
+        write_json({
+            'rules': RULES_FINGERPRINT,
+            'schemas': {fp: {'columns': e['columns'], 'roles': e['roles']} for fp, e in saved},
+        }, path)
+        self.added = 0
+
+
+# Shared cache used by analyze_feedback.py
+ROLES = ColumnRoleCache()
+
+
+def describe_roles(roles):
+    """One line per role: its name, how many headers it holds and the headers (long ones shortened)"""
+    lines = []
+    for role, value in roles.items():
+        if isinstance(value, dict):
+            items = [f"{k} = {v}" if not isinstance(v, list) else f"{k} = {len(v)} column(s)" for k, v in value.items()]
+        elif isinstance(value, list):
+            items = [str(v) for v in value]
+        else:
+            lines.append(f"  {role}: {value}")
+            continue
+        lines.append(f"  {role} ({len(items)}):")
+        # Keep both ends: question groups share the start and differ in the [sub-question]
+        lines.extend(f"    {item if len(item) <= 100 else item[:45] + ' ... ' + item[-50:]}" for item in items)
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the column roles saved by analyze_feedback.py, role by role.")
+    parser.add_argument("path", nargs='?', default=os.path.join(DEFAULT_CACHE_DIR_NAME, DEFAULT_ROLE_CACHE_NAME),
+                        help=f"Saved roles file (default: {DEFAULT_CACHE_DIR_NAME}/{DEFAULT_ROLE_CACHE_NAME})")
+    args = parser.parse_args(argv)
+    try:
+        with open(args.path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read {args.path}: {e}", file=sys.stderr)
+        return 1
+    if raw.get('rules') != RULES_FINGERPRINT:
+        print("Note: saved with different rules; the next run resolves these headers again")
+    for fingerprint, entry in raw.get('schemas', {}).items():
+        print(f"Header set {fingerprint[:12]} ({entry['columns']} columns):")
+        for line in describe_roles(entry['roles']):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
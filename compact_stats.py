@@ -0,0 +1,134 @@
+"""Compact, dictionary-encoded form of feedback_stats.json.
+
+The stats repeat the same few hundred keys (bilingual rating labels, branch, class and
+category names) in thousands of small objects, mostly with the same key order, e.g. every
+rating_distribution. The compact form stores each key once and each distinct key order
+once, so an object becomes a fixed-order array of its values.
+
+Schema (format "feedback-compact", version 1), written without indentation:
+
+    {
+      "format": "feedback-compact",
+      "version": 1,
+      "strings": [str, ...],         # vocabulary: every object key, in first-appearance order
+      "shapes": [[int, ...], ...],   # key orders: indexes into "strings"
+      "data": <value>
+    }
+
+    <value> is one of
+      number | string | true | false | null   stored as is
+      [shape, v1, v2, ...]    object (shape >= 0): keys are strings[i] for i in shapes[shape],
+                              values v1, v2, ... follow in the same order
+      [-1, v1, v2, ...]       array
+
+Example: {"Excellent(மிகநன்று)": 120, "Good(நன்று)": 40} with strings ["Excellent(மிகநன்று)",
+"Good(நன்று)"] and shapes [[0, 1]] is stored as [0, 120, 40].
+
+read_compact() / decode_stats() expand it back to exactly today's dict (same keys, key
+order and values). Run `python3 compact_stats.py expand feedback_stats.compact.json out.json`
+to get a regular JSON file back.
+"""
+import argparse
+import json
+import os
+
+from json_export import dumps_json, write_json
+
+COMPACT_FORMAT = 'feedback-compact'
+COMPACT_VERSION = 1
+DEFAULT_COMPACT_NAME = 'feedback_stats.compact.json'
+LIST_TAG = -1
+
+
+def _json_key(key):
+    # Non-string keys (ints, floats, bools, None) become their JSON literal, as in feedback_stats.json
+    return key if isinstance(key, str) else dumps_json(key)
+
+
+def encode_stats(stats):
+    """Dictionary-encode a stats dict; returns the compact document (NaN stays NaN until written)"""
+    strings, string_ids = [], {}
+    shapes, shape_ids = [], {}
+
+    def string_id(s):
+        sid = string_ids.get(s)
+        if sid is None:
+            sid = string_ids[s] = len(strings)
+            strings.append(s)
+        return sid
+
+    def encode(value):
+        if isinstance(value, dict):
+            keys = tuple(string_id(_json_key(k)) for k in value)
+            shape = shape_ids.get(keys)
+            if shape is None:
+                shape = shape_ids[keys] = len(shapes)
+                shapes.append(list(keys))
+            return [shape] + [encode(v) for v in value.values()]
+        if isinstance(value, (list, tuple)):
+            return [LIST_TAG] + [encode(v) for v in value]
+        return value
+
+    data = encode(stats)
+    return {
+        'format': COMPACT_FORMAT,
+        'version': COMPACT_VERSION,
+        'strings': strings,
+        'shapes': shapes,
+        'data': data,
+    }
+
+
+def decode_stats(doc):
+    """Expand a compact document back to the regular stats dict"""
+    if doc.get('format') != COMPACT_FORMAT or doc.get('version') != COMPACT_VERSION:
+        raise ValueError(f"not a {COMPACT_FORMAT} v{COMPACT_VERSION} document")
+    strings = doc['strings']
+    shapes = [[strings[i] for i in shape] for shape in doc['shapes']]
+
+    def decode(value):
+        if not isinstance(value, list):
+            return value
+        if value[0] == LIST_TAG:
+            return [decode(v) for v in value[1:]]
+        return dict(zip(shapes[value[0]], (decode(v) for v in value[1:])))
+
+    return decode(doc['data'])
+
+
+def write_compact(stats, path):
+    doc = encode_stats(stats)
+    write_json(doc, path, compact=True)
+    return doc
+
+
+def read_compact(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return decode_stats(json.load(f))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert between feedback_stats.json and its compact dictionary-encoded form.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enc = sub.add_parser("encode", help="feedback_stats.json -> compact file")
+    enc.add_argument("json_path")
+    enc.add_argument("out_path", nargs="?", default=None, help=f"default: {DEFAULT_COMPACT_NAME} next to the input")
+    exp = sub.add_parser("expand", help="compact file -> regular JSON (indent=2, as analyze_feedback.py writes it)")
+    exp.add_argument("compact_path")
+    exp.add_argument("out_path")
+    args = parser.parse_args(argv)
+
+    if args.command == "encode":
+        with open(args.json_path, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+        out_path = args.out_path or os.path.join(os.path.dirname(os.path.abspath(args.json_path)), DEFAULT_COMPACT_NAME)
+        write_compact(stats, out_path)
+        before, after = os.path.getsize(args.json_path), os.path.getsize(out_path)
+        print(f"Wrote {out_path}: {after:,} bytes ({before / max(after, 1):.1f}x smaller than {before:,})")
+    else:
+        write_json(read_compact(args.compact_path), args.out_path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
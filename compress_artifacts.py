@@ -0,0 +1,150 @@
+"""Precompressed .gz / .br siblings for the JSON artifacts, plus a payload size report.
+
+Static hosts can serve `x.json.gz` / `x.json.br` directly instead of compressing on every
+request. Both encoders are run with fixed settings (gzip mtime=0, no file name) so the
+same input always gives byte-identical output and unchanged artifacts do not churn in a
+deploy. Brotli needs the optional `brotli` package; without it only .gz files are written.
+
+The size report (feedback_stats.sizes.json) lists raw/gzip/brotli bytes for every stats
+section, serialized on its own the way feedback_stats.json is written, and for every
+artifact file, so payload growth can be compared release by release.
+"""
+import argparse
+import gzip
+import json
+import os
+
+from json_export import dumps_json, write_json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+DEFAULT_SIZE_REPORT_NAME = 'feedback_stats.sizes.json'
+
+
+def compressed_sizes(data):
+    """{'raw', 'gzip', 'brotli'} byte counts for data (brotli is None when unavailable)"""
+    return {
+        'raw': len(data),
+        'gzip': len(gzip.compress(data, compresslevel=9, mtime=0)),
+        'brotli': len(brotli.compress(data, quality=11)) if brotli is not None else None,
+    }
+
+
+def _write_bytes(path, data):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def precompress_file(path):
+    """Write path.gz (and path.br) next to path; returns its size entry"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    _write_bytes(path + '.gz', gz)
+    entry = {'raw': len(data), 'gzip': len(gz), 'brotli': None}
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        _write_bytes(path + '.br', br)
+        entry['brotli'] = len(br)
+    elif os.path.exists(path + '.br'):
+        # An older .br would no longer match the file it sits next to
+        os.remove(path + '.br')
+    return entry
+
+
+def remove_compressed_siblings(paths):
+    """Delete .gz/.br files left next to paths by an earlier --precompress run; returns how many"""
+    removed = 0
+    for path in paths:
+        for suffix in COMPRESSED_SUFFIXES:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+                removed += 1
+    return removed
+
+
+def section_size_report(stats):
+    """Per-section size rows, largest first"""
+    rows = []
+    for key, value in stats.items():
+        data = dumps_json(value).encode('utf-8')
+        rows.append(dict(section=key, **compressed_sizes(data)))
+    rows.sort(key=lambda r: (-r['raw'], r['section']))
+    return rows
+
+
+def precompress_artifacts(paths, stats=None, report_path=None, base_dir=None):
+    """Precompress every artifact in paths and, when report_path is given, write the size report.
+
+    Returns the report dict. File paths in the report are relative to base_dir when given.
+    """
+    files = []
+    for path in paths:
+        entry = precompress_file(path)
+        rel = os.path.relpath(path, base_dir) if base_dir else path
+        files.append(dict(path=rel.replace(os.sep, '/'), **entry))
+    report = {
+        'brotli_available': brotli is not None,
+        'files': files,
+        'sections': section_size_report(stats) if stats is not None else [],
+    }
+    if report_path:
+        # No timestamps: the report only changes when the payload does
+        write_json(report, report_path)
+    return report
+
+
+def _fmt(n):
+    return '-' if n is None else f"{n:,}"
+
+
+def print_size_report(report, top=10):
+    files = report['files']
+    if files:
+        print(f"\nPrecompressed {len(files)} JSON artifact(s) (raw -> gzip / brotli bytes):")
+        for row in files[:top]:
+            print(f"  {row['path']}: {_fmt(row['raw'])} -> {_fmt(row['gzip'])} / {_fmt(row['brotli'])}")
+        if len(files) > top:
+            rest = files[top:]
+            print(f"  ... {len(rest)} more: {_fmt(sum(r['raw'] for r in rest))} -> {_fmt(sum(r['gzip'] for r in rest))}")
+    sections = report['sections']
+    if sections:
+        print("Largest sections (raw -> gzip / brotli bytes):")
+        for row in sections[:top]:
+            print(f"  {row['section']}: {_fmt(row['raw'])} -> {_fmt(row['gzip'])} / {_fmt(row['brotli'])}")
+    if not report['brotli_available']:
+        print("Note: the 'brotli' package is not installed; only .gz files were written.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write deterministic .gz/.br siblings for JSON artifacts and report raw vs compressed sizes.")
+    parser.add_argument("paths", nargs="+", help="JSON files or directories (searched recursively for *.json)")
+    parser.add_argument("--stats", default=None, help="feedback_stats.json to break down per section in the report")
+    parser.add_argument("--report", default=None, help="Write the size report to this JSON file")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for p in args.paths:
+        if os.path.isdir(p):
+            for root, dirs, files in os.walk(p):
+                dirs.sort()
+                paths.extend(os.path.join(root, f) for f in sorted(files) if f.endswith('.json'))
+        else:
+            paths.append(p)
+    stats = None
+    if args.stats:
+        with open(args.stats, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+    report = precompress_artifacts(paths, stats, args.report)
+    print_size_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
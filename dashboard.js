@@ -4,8 +4,86 @@ let CURRENT_BRANCH = '';
 // Debug: Log when script loads
 console.log('🟢 Dashboard script loaded at:', new Date().toISOString());
 
-fetch('feedback_stats.json')
-    .then(response => response.json())
+// Sharded export (see export_shards.py): summary first, branch/section shards fetched on demand
+const SHARD_DIR = 'feedback_shards/';
+let SHARD_MANIFEST = null;
+const __shardRequests = {};
+
+function fetchJson(url) {
+    return fetch(url).then(response => {
+        if (!response.ok) throw new Error(`${url}: HTTP ${response.status}`);
+        return response.json();
+    });
+}
+
+// Prefer the small summary shard; fall back to the single feedback_stats.json when no shards are published
+function loadDashboardData() {
+    return fetchJson(SHARD_DIR + 'manifest.json')
+        .then(manifest => fetchJson(SHARD_DIR + manifest.summary).then(summary => {
+            SHARD_MANIFEST = manifest;
+            return summary;
+        }))
+        .catch(() => {
+            SHARD_MANIFEST = null;
+            return fetchJson('feedback_stats.json');
+        });
+}
+
+// Merge a branch shard into RAW_DATA so every section reads exactly as in the full JSON
+function mergeBranchShard(branch, shard) {
+    for (const [section, value] of Object.entries(shard.sections || {})) {
+        RAW_DATA[section] = RAW_DATA[section] || {};
+        RAW_DATA[section][branch] = value;
+    }
+    for (const [section, slice] of Object.entries(shard.nested_sections || {})) {
+        const target = RAW_DATA[section] = RAW_DATA[section] || {};
+        for (const kind of ['class', 'orientation']) {
+            target[kind] = target[kind] || {};
+            for (const [k, v] of Object.entries(slice[kind] || {})) {
+                target[kind][k] = target[kind][k] || {};
+                target[kind][k][branch] = v;
+            }
+        }
+        target.pair = target.pair || {};
+        for (const [cls, byOrient] of Object.entries(slice.pair || {})) {
+            target.pair[cls] = target.pair[cls] || {};
+            for (const [ori, v] of Object.entries(byOrient || {})) {
+                target.pair[cls][ori] = target.pair[cls][ori] || {};
+                target.pair[cls][ori][branch] = v;
+            }
+        }
+    }
+}
+
+// Resolve once the selected branch's shard is in RAW_DATA (immediately when not sharded or already loaded)
+function ensureBranchShard(branch) {
+    const rel = branch ? SHARD_MANIFEST?.branches?.[branch] : null;
+    if (!rel) return Promise.resolve();
+    const key = 'branch:' + branch;
+    if (!__shardRequests[key]) {
+        __shardRequests[key] = fetchJson(SHARD_DIR + rel)
+            .then(shard => mergeBranchShard(branch, shard))
+            .catch(err => { delete __shardRequests[key]; throw err; });
+    }
+    return __shardRequests[key];
+}
+
+// Resolve once the named whole-section shards (e.g. class/orientation breakdowns) are in RAW_DATA
+function ensureSectionShards(names) {
+    return Promise.all(names.map(name => {
+        const rel = SHARD_MANIFEST?.sections?.[name];
+        if (!rel) return Promise.resolve();
+        const key = 'section:' + name;
+        if (!__shardRequests[key]) {
+            __shardRequests[key] = fetchJson(SHARD_DIR + rel)
+                .then(value => { RAW_DATA[name] = value; })
+                .catch(err => { delete __shardRequests[key]; throw err; });
+        }
+        return __shardRequests[key];
+    }));
+}
+
+loadDashboardData()
     .then(data => {
         RAW_DATA = data;
         renderDashboard(data);
@@ -683,14 +761,22 @@ function initGlobalBranchSelector(data) {
             CURRENT_BRANCH = sel.value || '';
             console.log('🔵 Branch selected:', CURRENT_BRANCH || 'All Branches');
             console.log('🔵 RAW_DATA available:', !!RAW_DATA);
-            const view = deriveViewData(RAW_DATA, CURRENT_BRANCH);
-            console.log('🔵 Derived view summary:', view.summary);
-            console.log('🔵 About to call renderAllSections...');
-            renderAllSections(view);
-            console.log('🔵 Finished renderAllSections, now calling renderComparison...');
-            renderComparison(view);
-            sanitizeDisplayedText();
-            console.log('🔵 Render complete for branch:', CURRENT_BRANCH || 'All Branches');
+            const branch = CURRENT_BRANCH;
+            const render = () => {
+                // A later selection superseded this one while its shard was loading
+                if (branch !== CURRENT_BRANCH) return;
+                const view = deriveViewData(RAW_DATA, CURRENT_BRANCH);
+                console.log('🔵 Derived view summary:', view.summary);
+                console.log('🔵 About to call renderAllSections...');
+                renderAllSections(view);
+                console.log('🔵 Finished renderAllSections, now calling renderComparison...');
+                renderComparison(view);
+                sanitizeDisplayedText();
+                console.log('🔵 Render complete for branch:', CURRENT_BRANCH || 'All Branches');
+            };
+            ensureBranchShard(branch)
+                .then(render)
+                .catch(err => { console.error('Could not load branch shard:', err); render(); });
         });
     }
  else {
@@ -2797,8 +2883,14 @@ function renderBranchComparisonSection(data) {
     // Wire up listeners
     const ratingGroupSel = document.getElementById('ratingGroupSelect');
     if (ratingGroupSel) ratingGroupSel.addEventListener('change', updateRatingTables);
-    if (classSel) classSel.addEventListener('change', () => { updateRecTables(); updateRatingTables(); });
-    if (orientSel) orientSel.addEventListener('change', () => { updateRecTables(); updateRatingTables(); });
+    // Class/orientation breakdowns across all branches live in section shards; fetch them on first use
+    const updateFilteredTables = () => {
+        ensureSectionShards(['branch_recommendation_counts_by', 'branch_rating_counts_by'])
+            .catch(err => console.error('Could not load breakdown shards:', err))
+            .then(() => { updateRecTables(); updateRatingTables(); });
+    };
+    if (classSel) classSel.addEventListener('change', updateFilteredTables);
+    if (orientSel) orientSel.addEventListener('change', updateFilteredTables);
     // no branchCompareScope control; section visibility auto-handled by CURRENT_BRANCH
 
     // Top 5 branches by total reviews (all)
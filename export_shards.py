@@ -0,0 +1,186 @@
+"""Split feedback_stats.json into a manifest, a summary file and lazily loaded shards.
+
+The dashboard only needs the summary to paint the All Branches view. Sections that are only
+read for the branch picked in the selector go into one file per branch; the large
+class/orientation breakdowns that the Branch Comparison filters read across all branches
+go into one file per section. manifest.json (written last) ties them together:
+
+    feedback_shards/
+        manifest.json
+        summary.json
+        branches/<slug>-<hash>.json   {"branch": ..., "sections": {...}, "nested_sections": {...}}
+        sections/<section>.json
+
+Run `python3 export_shards.py feedback_stats.json` to shard an existing JSON file.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from json_export import write_json
+
+SHARD_FORMAT_VERSION = 1
+DEFAULT_SHARD_DIR_NAME = 'feedback_shards'
+MANIFEST_NAME = 'manifest.json'
+
+# Sections keyed by branch whose values are only read for the selected branch
+BRANCH_SECTIONS = [
+    'branch_category_performance',
+    'branch_subject_performance',
+    'branch_segment_subject_performance',
+    'branch_segment_recommendation_reasons',
+    'overall_rating_counts_by_branch',
+    'communication_metrics_by_branch',
+    'communication_metrics_detail_by_branch',
+    'environment_focus_by_branch',
+    'ptm_effectiveness_by_branch',
+    'concern_roles_by_branch',
+    'branch_concern_resolution',
+    'program_excellence_by_branch',
+]
+
+# {class|orientation: {key: {branch: ...}}, pair: {class: {orientation: {branch: ...}}}} sections:
+# the whole section is a section shard, and each branch shard carries its own slice
+NESTED_BRANCH_SECTIONS = [
+    'branch_recommendation_counts_by',
+    'branch_rating_counts_by',
+]
+
+
+def branch_shard_name(branch):
+    """Filesystem-safe, collision-free file name for a branch shard"""
+    slug = re.sub(r'[^a-z0-9]+', '-', str(branch).lower()).strip('-') or 'branch'
+    digest = hashlib.sha1(str(branch).encode('utf-8')).hexdigest()[:8]
+    return f"{slug[:40]}-{digest}.json"
+
+
+def _nested_slice(section, branch):
+    out = {}
+    for kind in ('class', 'orientation'):
+        part = {k: v[branch] for k, v in (section.get(kind) or {}).items() if isinstance(v, dict) and branch in v}
+        if part:
+            out[kind] = part
+    pair = {}
+    for cls, by_orient in (section.get('pair') or {}).items():
+        part = {o: v[branch] for o, v in (by_orient or {}).items() if isinstance(v, dict) and branch in v}
+        if part:
+            pair[cls] = part
+    if pair:
+        out['pair'] = pair
+    return out
+
+
+def split_stats(stats):
+    """Returns (summary, {branch: shard}, {section: value}); sections not listed above stay in the summary"""
+    summary = {}
+    sections = {}
+    branches = []
+    for key, value in stats.items():
+        if key in BRANCH_SECTIONS and isinstance(value, dict):
+            for branch in value:
+                if branch not in branches:
+                    branches.append(branch)
+        elif key in NESTED_BRANCH_SECTIONS and isinstance(value, dict):
+            sections[key] = value
+        else:
+            summary[key] = value
+    for branch in (stats.get('summary') or {}).get('branches') or {}:
+        if branch not in branches:
+            branches.append(branch)
+
+    branch_shards = {}
+    for branch in branches:
+        shard = {'branch': branch, 'sections': {}, 'nested_sections': {}}
+        for key in BRANCH_SECTIONS:
+            value = stats.get(key)
+            if isinstance(value, dict) and branch in value:
+                shard['sections'][key] = value[branch]
+        for key, value in sections.items():
+            shard['nested_sections'][key] = _nested_slice(value, branch)
+        branch_shards[branch] = shard
+    return summary, branch_shards, sections
+
+
+def write_shards(stats, out_dir, compact=False):
+    """Write the shard tree for stats into out_dir (NaN -> null); returns the manifest"""
+    summary, branch_shards, sections = split_stats(stats)
+    os.makedirs(out_dir, exist_ok=True)
+    # Drop shards of an earlier run so renamed or removed branches do not linger
+    for sub in ('branches', 'sections'):
+        shutil.rmtree(os.path.join(out_dir, sub), ignore_errors=True)
+        os.makedirs(os.path.join(out_dir, sub))
+
+    manifest = {
+        'format': 'feedback-shards',
+        'version': SHARD_FORMAT_VERSION,
+        'section_order': list(stats.keys()),
+        'summary': 'summary.json',
+        'branch_sections': [k for k in BRANCH_SECTIONS if k in stats],
+        'branches': {},
+        'sections': {},
+    }
+    write_json(summary, os.path.join(out_dir, manifest['summary']), compact=compact)
+    for branch, shard in branch_shards.items():
+        rel = 'branches/' + branch_shard_name(branch)
+        write_json(shard, os.path.join(out_dir, rel), compact=compact)
+        manifest['branches'][branch] = rel
+    for key, value in sections.items():
+        rel = f'sections/{key}.json'
+        write_json(value, os.path.join(out_dir, rel), compact=compact)
+        manifest['sections'][key] = rel
+    # The manifest goes last: a reader never sees it pointing at shards that are not written yet
+    write_json(manifest, os.path.join(out_dir, MANIFEST_NAME), compact=compact)
+    return manifest
+
+
+def shard_files(manifest):
+    """Paths (relative to the shard directory) of every file in a shard tree, manifest included"""
+    return [MANIFEST_NAME, manifest['summary']] + list(manifest['branches'].values()) + list(manifest['sections'].values())
+
+
+def read_shards(out_dir):
+    """Reassemble the full stats dict from a shard tree"""
+    def load(rel):
+        with open(os.path.join(out_dir, rel), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    manifest = load(MANIFEST_NAME)
+    parts = dict(load(manifest['summary']))
+    for key, rel in manifest['sections'].items():
+        parts[key] = load(rel)
+    for key in manifest['branch_sections']:
+        parts[key] = {}
+    for branch, rel in manifest['branches'].items():
+        for key, value in load(rel)['sections'].items():
+            parts[key][branch] = value
+    return {key: parts[key] for key in manifest['section_order'] if key in parts}
+
+
+def remove_manifest(out_dir):
+    """Retire a shard tree so readers fall back to feedback_stats.json; returns True if one existed"""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split feedback_stats.json into a manifest, summary and per-branch/per-section shards for the dashboard.")
+    parser.add_argument("json_path", nargs="?", default="feedback_stats.json", help="Stats file to shard (default: feedback_stats.json)")
+    parser.add_argument("--out-dir", default=None, help=f"Shard directory (default: {DEFAULT_SHARD_DIR_NAME} next to the JSON file)")
+    args = parser.parse_args(argv)
+
+    with open(args.json_path, 'r', encoding='utf-8') as f:
+        stats = json.load(f)
+    out_dir = args.out_dir or os.path.join(os.path.dirname(os.path.abspath(args.json_path)), DEFAULT_SHARD_DIR_NAME)
+    manifest = write_shards(stats, out_dir)
+    print(f"Wrote {len(manifest['branches'])} branch shard(s) and {len(manifest['sections'])} section shard(s) to {out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
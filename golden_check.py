@@ -0,0 +1,182 @@
+"""Golden-output regression check for feedback_stats.json.
+
+Runs analyze_feedback.py on fixed fixture workbooks and compares the feedback_stats.json it
+writes, section by section, with a stored golden copy. Floats are equal within a relative
+/ absolute tolerance (summation order may change the last digits). Everything else must match
+exactly: keys, list lengths and order, strings, ints and nulls.
+
+    python3 golden_check.py                  # run every fixture set, exit 1 on any difference
+    python3 golden_check.py --set real       # one set
+    python3 golden_check.py --update         # accept the current output as the new golden files
+    python3 golden_check.py diff a.json b.json
+
+Fixture sets (FIXTURE_SETS) are input globs relative to this folder. Golden files are
+golden/<set>.json.gz, written without indentation and gzip mtime 0, so an unchanged output
+gives an unchanged file.
+"""
+import argparse
+import gzip
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+
+from json_export import dump_json
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_DIR = os.path.join(SCRIPT_DIR, 'golden')
+FIXTURE_SETS = {
+    # The real Pre Primary export
+    'real': ['Parent Feedback Form – Academic & Administrative Review - Pre Primary.xlsx'],
+    # Small synthetic export (benchmark.py, seed 0) with all three segments and extra branches
+    'multi_segment': ['golden/fixtures/multi_segment/*.xlsx'],
+}
+DEFAULT_REL_TOL = 1e-9
+DEFAULT_ABS_TOL = 1e-9
+MAX_LINES_PER_SECTION = 20
+
+
+def _fmt(value):
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= 80 else text[:77] + '...'
+
+
+def _path(parent, key):
+    return f"{parent}[{key}]" if isinstance(key, int) else (f"{parent}.{key}" if parent else str(key))
+
+
+def diff_values(actual, golden, path='', rel_tol=DEFAULT_REL_TOL, abs_tol=DEFAULT_ABS_TOL, check_order=False, out=None):
+    """Append one readable line per difference between actual and golden to out; returns out"""
+    out = [] if out is None else out
+    if isinstance(golden, dict) and isinstance(actual, dict):
+        for key in golden:
+            if key not in actual:
+                out.append(f"- {_path(path, key)}: removed (was {_fmt(golden[key])})")
+            else:
+                diff_values(actual[key], golden[key], _path(path, key), rel_tol, abs_tol, check_order, out)
+        for key in actual:
+            if key not in golden:
+                out.append(f"+ {_path(path, key)}: added {_fmt(actual[key])}")
+        if check_order and list(actual) != list(golden) and set(actual) == set(golden):
+            out.append(f"~ {path}: same keys in a different order")
+    elif isinstance(golden, list) and isinstance(actual, list):
+        if len(actual) != len(golden):
+            out.append(f"~ {path}: {len(golden)} -> {len(actual)} items")
+        for i, (a, g) in enumerate(zip(actual, golden)):
+            diff_values(a, g, _path(path, i), rel_tol, abs_tol, check_order, out)
+    elif isinstance(golden, float) and isinstance(actual, (int, float)) and not isinstance(actual, bool) \
+            or isinstance(actual, float) and isinstance(golden, int) and not isinstance(golden, bool):
+        if not math.isclose(actual, golden, rel_tol=rel_tol, abs_tol=abs_tol):
+            out.append(f"~ {path}: {golden!r} -> {actual!r} (delta {actual - golden:+.6g})")
+    elif type(actual) is not type(golden) or actual != golden:
+        out.append(f"~ {path}: {_fmt(golden)} -> {_fmt(actual)}")
+    return out
+
+
+def compare_stats(actual, golden, rel_tol=DEFAULT_REL_TOL, abs_tol=DEFAULT_ABS_TOL, check_order=False):
+    """{section: [difference lines]} for every top-level section of either dict (empty list = equal)"""
+    report = {}
+    for section in list(golden) + [s for s in actual if s not in golden]:
+        if section not in actual:
+            report[section] = ['- section removed']
+        elif section not in golden:
+            report[section] = ['+ section added']
+        else:
+            report[section] = diff_values(actual[section], golden[section], section, rel_tol, abs_tol, check_order)
+    if check_order and [s for s in actual if s in golden] != [s for s in golden if s in actual]:
+        report.setdefault('(section order)', []).append('~ sections are in a different order')
+    return report
+
+
+def print_report(name, report):
+    changed = {section: lines for section, lines in report.items() if lines}
+    if not changed:
+        print(f"[{name}] OK: {len(report)} section(s) match the golden output")
+        return False
+    print(f"[{name}] {len(changed)} of {len(report)} section(s) differ:")
+    for section, lines in changed.items():
+        print(f"  {section}: {len(lines)} difference(s)")
+        for line in lines[:MAX_LINES_PER_SECTION]:
+            print(f"    {line}")
+        if len(lines) > MAX_LINES_PER_SECTION:
+            print(f"    ... {len(lines) - MAX_LINES_PER_SECTION} more")
+    return True
+
+
+def golden_path(name):
+    return os.path.join(GOLDEN_DIR, f"{name}.json.gz")
+
+
+def load_json(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_golden(stats, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    text = io.StringIO()
+    dump_json(stats, text, compact=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0, filename='') as f:
+            f.write(text.getvalue().encode('utf-8'))
+    os.replace(tmp, path)
+
+
+def run_fixture_set(name, extra_args=()):
+    """Run analyze_feedback.py on one fixture set in a scratch folder; returns the stats dict"""
+    patterns = [os.path.join(SCRIPT_DIR, p) for p in FIXTURE_SETS[name]]
+    with tempfile.TemporaryDirectory(prefix=f'feedback-golden-{name}-') as out_dir:
+        cmd = [sys.executable, os.path.join(SCRIPT_DIR, 'analyze_feedback.py'), '--input'] + patterns + [
+            '--output-dir', out_dir, '--no-cache', '--no-ppt', '--no-shards', '--cache-dir', os.path.join(out_dir, 'cache')] + list(extra_args)
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"analyze_feedback.py failed on fixture set {name!r}:\n{proc.stderr[-2000:]}")
+        return load_json(os.path.join(out_dir, 'feedback_stats.json'))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ['diff']:
+        parser = argparse.ArgumentParser(prog='golden_check.py diff', description="Compare two feedback_stats.json files (.json or .json.gz) section by section.")
+        parser.add_argument("actual")
+        parser.add_argument("golden")
+        parser.add_argument("--rel-tol", type=float, default=DEFAULT_REL_TOL)
+        parser.add_argument("--abs-tol", type=float, default=DEFAULT_ABS_TOL)
+        parser.add_argument("--check-order", action="store_true", help="Also report dict keys in a different order")
+        args = parser.parse_args(argv[1:])
+        report = compare_stats(load_json(args.actual), load_json(args.golden), args.rel_tol, args.abs_tol, args.check_order)
+        return 1 if print_report(os.path.basename(args.actual), report) else 0
+
+    parser = argparse.ArgumentParser(description="Run analyze_feedback.py on the fixture workbooks and compare feedback_stats.json with the golden files.")
+    parser.add_argument("--set", action="append", choices=sorted(FIXTURE_SETS), help="Fixture set(s) to check (default: all)")
+    parser.add_argument("--update", action="store_true", help="Write the current output as the new golden file(s) instead of comparing")
+    parser.add_argument("--rel-tol", type=float, default=DEFAULT_REL_TOL, help=f"Relative float tolerance (default: {DEFAULT_REL_TOL:g})")
+    parser.add_argument("--abs-tol", type=float, default=DEFAULT_ABS_TOL, help=f"Absolute float tolerance (default: {DEFAULT_ABS_TOL:g})")
+    parser.add_argument("--check-order", action="store_true", help="Also report dict keys in a different order")
+    parser.add_argument("pipeline_args", nargs=argparse.REMAINDER, help="Options after -- are passed to analyze_feedback.py (e.g. -- --jobs 2)")
+    args = parser.parse_args(argv)
+    extra_args = args.pipeline_args[1:] if args.pipeline_args[:1] == ['--'] else args.pipeline_args
+
+    failed = False
+    for name in args.set or sorted(FIXTURE_SETS):
+        actual = run_fixture_set(name, extra_args)
+        if args.update:
+            write_golden(actual, golden_path(name))
+            print(f"[{name}] golden output updated: {os.path.relpath(golden_path(name), SCRIPT_DIR)}")
+            continue
+        if not os.path.exists(golden_path(name)):
+            print(f"[{name}] no golden file yet; create it with --update")
+            failed = True
+            continue
+        report = compare_stats(actual, load_json(golden_path(name)), args.rel_tol, args.abs_tol, args.check_order)
+        failed = print_report(name, report) or failed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,273 @@
+"""Factorized group keys for folding the response frame into per-group totals.
+
+A GroupKey is one integer code per row (-1 where the key is missing) and the group labels
+in groupby(sort=True) order. response_totals in analyze_feedback builds one per grouping
+column and pairs them into the (branch, segment) and (branch, class, orientation) keys:
+
+    branch = GroupKey.from_series(df[roles['branch_col']])
+    cell = branch.pair(GroupKey.from_series(df['Segment']))   # the pairs that occur
+
+Every count and sum per group is then one NumPy bincount over key.codes (key.bincount for
+a (groups x codes) table).
+
+response_totals keeps those counts as GroupTotals -- per group of a grain (e.g. every
+(branch, segment) pair) the row count, the first row and CountTables such as answer label
+counts, per-respondent score sums or reason counters -- and aggregate_stats builds every JSON
+section from them instead of reading the response frame section by section. First rows are
+row positions; they give the first-appearance orders the sections keep (branch_performance,
+tied value_counts, Counter.most_common). Totals of disjoint sets of rows add up
+(GroupTotals.add), which is how --incremental folds new responses into saved totals.
+"""
+import numpy as np
+import pandas as pd
+
+# First row of a (group, label) pair that has no rows
+NO_ROW = np.iinfo(np.int64).max
+
+
+class GroupKey:
+    """Per-row group codes (-1 = no group) and the group labels they index"""
+
+    def __init__(self, codes, labels):
+        self.codes = np.asarray(codes, dtype=np.int64)
+        self.labels = list(labels)
+        self.n = len(self.labels)
+        self.valid = self.codes >= 0
+
+    @classmethod
+    def from_series(cls, series):
+        codes, labels = pd.factorize(series, sort=True, use_na_sentinel=True)
+        return cls(codes, labels)
+
+    def pair(self, other):
+        """GroupKey of the (self, other) label pairs that occur, sorted by self then other"""
+        ok = self.valid & other.valid
+        combined = np.where(ok, self.codes * max(other.n, 1) + other.codes, -1)
+        codes, uniques = pd.factorize(combined[ok], sort=True)
+        pair_codes = np.full(len(combined), -1, dtype=np.int64)
+        pair_codes[ok] = codes
+        labels = [(self.labels[u // other.n], other.labels[u % other.n]) for u in uniques]
+        return GroupKey(pair_codes, labels)
+
+    def bincount(self, codes, n_codes):
+        """(groups x n_codes) table of how often each code occurs per group; code -1 is skipped"""
+        ok = self.valid & (codes >= 0)
+        flat = self.codes[ok] * n_codes + codes[ok]
+        return np.bincount(flat, minlength=self.n * n_codes).reshape(self.n, n_codes)
+
+
+class CountTable:
+    """(groups x labels) int64 counts, plus the first row of every (group, label) pair when tracked"""
+
+    def __init__(self, labels, counts, first=None):
+        self.labels = list(labels)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.first = None if first is None else np.asarray(first, dtype=np.int64)
+
+    @classmethod
+    def from_codes(cls, groups, n_groups, codes, labels, weights=None, rows=None):
+        """Count the rows (or sum integer weights) per (group, code); group or code -1 is skipped.
+        rows, when given, are the rows' positions and make the table track first rows."""
+        n_labels = len(labels)
+        ok = (groups >= 0) & (codes >= 0)
+        flat = groups[ok] * n_labels + codes[ok]
+        size = n_groups * n_labels
+        if weights is None:
+            counts = np.bincount(flat, minlength=size)
+        else:
+            # float64 sums of small integers are exact
+            counts = np.bincount(flat, weights=weights[ok], minlength=size).round()
+        first = None
+        if rows is not None:
+            first = np.full(size, NO_ROW, dtype=np.int64)
+            np.minimum.at(first, flat, rows[ok])
+            first = first.reshape(n_groups, n_labels)
+        return cls(labels, counts.astype(np.int64).reshape(n_groups, n_labels), first)
+
+    def column(self, label):
+        """Counts of one label for every group (zeros when the label never occurred)"""
+        try:
+            return self.counts[:, self.labels.index(label)]
+        except ValueError:
+            return np.zeros(len(self.counts), dtype=np.int64)
+
+    def per_group(self, i):
+        """{label: count} of group i: counts descending, ties by first row (as value_counts()
+        orders them), labels that never occurred left out"""
+        counts = self.counts[i]
+        nonzero = np.flatnonzero(counts)
+        order = nonzero[np.lexsort((self.first[i, nonzero], -counts[nonzero]))]
+        return {self.labels[j]: int(counts[j]) for j in order}
+
+    def to_json(self):
+        return {'labels': self.labels, 'counts': self.counts.tolist(),
+                'first': None if self.first is None else self.first.tolist()}
+
+    @classmethod
+    def from_json(cls, raw, n_groups):
+        shape = (n_groups, len(raw['labels']))
+        counts = np.asarray(raw['counts'], dtype=np.int64).reshape(shape)
+        first = None if raw['first'] is None else np.asarray(raw['first'], dtype=np.int64).reshape(shape)
+        return cls(raw['labels'], counts, first)
+
+
+class GroupTotals:
+    """Row count, first row and named CountTables for the groups of one grain.
+
+    dims names the parts of a group key, e.g. ('branch', 'segment'); keys are label tuples.
+    First rows are row positions shifted left by sub_bits, whose low bits can order several
+    entries of one row (the reasons of a response).
+    """
+
+    def __init__(self, dims, keys, n, first, tables=None, sub_bits=0):
+        self.dims = tuple(dims)
+        self.keys = [tuple(k) for k in keys]
+        self.n = np.asarray(n, dtype=np.int64)
+        self.first = np.asarray(first, dtype=np.int64)
+        self.tables = dict(tables or {})
+        self.sub_bits = sub_bits
+
+    @classmethod
+    def from_codes(cls, dims, codes, keys, rows, sub_bits=0):
+        """Groups of rows by their group code (-1 = no group); rows are the rows' first-row values"""
+        ok = codes >= 0
+        n = np.bincount(codes[ok], minlength=len(keys))
+        first = np.full(len(keys), NO_ROW, dtype=np.int64)
+        np.minimum.at(first, codes[ok], rows[ok])
+        return cls(dims, keys, n, first, sub_bits=sub_bits)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def labels(self):
+        """Group labels: the key itself for a one-dimensional grain, else the key tuple"""
+        return [k[0] for k in self.keys] if len(self.dims) == 1 else list(self.keys)
+
+    def table(self, name):
+        return self.tables[name]
+
+    def appearance_order(self):
+        """Group indices in order of their first row"""
+        return [int(i) for i in np.argsort(self.first, kind='stable')]
+
+    def _combine(self, dims, keys, others):
+        """GroupTotals over dims and keys from (totals, group -> new index) pairs, adding counts and
+        keeping the earliest first rows"""
+        n = np.zeros(len(keys), dtype=np.int64)
+        first = np.full(len(keys), NO_ROW, dtype=np.int64)
+        tables = {}
+        for totals, idx in others:
+            np.add.at(n, idx, totals.n)
+            np.minimum.at(first, idx, totals.first)
+            for name, t in totals.tables.items():
+                labels = tables.setdefault(name, ([], {}, t.first is not None))
+                for label in t.labels:
+                    if label not in labels[1]:
+                        labels[1][label] = len(labels[0])
+                        labels[0].append(label)
+        out = {}
+        for name, (labels, pos, tracked) in tables.items():
+            counts = np.zeros((len(keys), len(labels)), dtype=np.int64)
+            first_rows = np.full(counts.shape, NO_ROW, dtype=np.int64) if tracked else None
+            for totals, idx in others:
+                t = totals.tables.get(name)
+                if t is None:
+                    continue
+                cols = np.array([pos[label] for label in t.labels], dtype=np.int64)
+                rows_idx = np.repeat(idx, len(cols))
+                cols_idx = np.tile(cols, len(idx))
+                np.add.at(counts, (rows_idx, cols_idx), t.counts.ravel())
+                if tracked:
+                    np.minimum.at(first_rows, (rows_idx, cols_idx), t.first.ravel())
+            out[name] = CountTable(labels, counts, first_rows)
+        return GroupTotals(dims, keys, n, first, out, self.sub_bits)
+
+    def add(self, other):
+        """Totals of the rows of both (their rows must not overlap)"""
+        keys = list(self.keys)
+        pos = {k: i for i, k in enumerate(keys)}
+        for k in other.keys:
+            if k not in pos:
+                pos[k] = len(keys)
+                keys.append(k)
+        idx_self = np.arange(len(self.keys), dtype=np.int64)
+        idx_other = np.array([pos[k] for k in other.keys], dtype=np.int64)
+        return self._combine(self.dims, keys, [(self, idx_self), (other, idx_other)])
+
+    def rollup(self, dims):
+        """Totals per sub-key over dims (a subset of self.dims), keys sorted like groupby(sort=True);
+        no dims gives the single overall group"""
+        parts = [self.dims.index(d) for d in dims]
+        sub = [tuple(k[p] for p in parts) for k in self.keys]
+        keys = sorted(set(sub)) if dims else [()]
+        pos = {k: i for i, k in enumerate(keys)}
+        idx = np.array([pos[k] for k in sub], dtype=np.int64)
+        return self._combine(dims, keys, [(self, idx)])
+
+    def relabel(self, dim, mapping):
+        """Rename the labels of one dimension (merging groups that end up with the same key)"""
+        if dim not in self.dims or not any(k[self.dims.index(dim)] in mapping for k in self.keys):
+            return self
+        p = self.dims.index(dim)
+        renamed = GroupTotals(self.dims, [k[:p] + (mapping.get(k[p], k[p]),) + k[p + 1:] for k in self.keys],
+                              self.n, self.first, self.tables, self.sub_bits)
+        return renamed.rollup(self.dims)
+
+    def remap_rows(self, positions):
+        """Move first rows to new row positions: row r becomes positions[r]"""
+        positions = np.asarray(positions, dtype=np.int64)
+        mask = (1 << self.sub_bits) - 1
+
+        def move(first):
+            out = first.copy()
+            ok = first != NO_ROW
+            out[ok] = (positions[first[ok] >> self.sub_bits] << self.sub_bits) | (first[ok] & mask)
+            return out
+
+        tables = {name: CountTable(t.labels, t.counts, None if t.first is None else move(t.first))
+                  for name, t in self.tables.items()}
+        return GroupTotals(self.dims, self.keys, self.n, move(self.first), tables, self.sub_bits)
+
+    def to_json(self):
+        return {'dims': list(self.dims), 'sub_bits': self.sub_bits, 'keys': [list(k) for k in self.keys],
+                'n': self.n.tolist(), 'first': self.first.tolist(),
+                'tables': {name: t.to_json() for name, t in self.tables.items()}}
+
+    @classmethod
+    def from_json(cls, raw):
+        tables = {name: CountTable.from_json(t, len(raw['keys'])) for name, t in raw['tables'].items()}
+        return cls(raw['dims'], raw['keys'], raw['n'], raw['first'], tables, raw['sub_bits'])
+
+
+class ResponseTotals:
+    """The GroupTotals of every grain, with cached rollups"""
+
+    def __init__(self, grains):
+        self.grains = dict(grains)
+        self._rollups = {}
+
+    def __getitem__(self, grain):
+        return self.grains[grain]
+
+    def rollup(self, grain, dims):
+        key = (grain, tuple(dims))
+        if key not in self._rollups:
+            self._rollups[key] = self.grains[grain].rollup(dims)
+        return self._rollups[key]
+
+    def add(self, other):
+        return ResponseTotals({name: g.add(other.grains[name]) for name, g in self.grains.items()})
+
+    def relabel(self, dim, mapping):
+        return ResponseTotals({name: g.relabel(dim, mapping) for name, g in self.grains.items()})
+
+    def remap_rows(self, positions):
+        return ResponseTotals({name: g.remap_rows(positions) for name, g in self.grains.items()})
+
+    def to_json(self):
+        return {name: g.to_json() for name, g in self.grains.items()}
+
+    @classmethod
+    def from_json(cls, raw):
+        return cls({name: GroupTotals.from_json(g) for name, g in raw.items()})
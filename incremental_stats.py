@@ -0,0 +1,123 @@
+"""Saved state for --incremental refreshes of feedback_stats.json.
+
+Every run saves the ResponseTotals it built the stats from (see grouping), two 64-bit hashes
+per response in row order -- one of its (Timestamp, SCS NUMBER) key, one of all its cells --
+and the spellings seen per branch. The next --incremental run hashes the current inputs, folds
+only the responses whose keys are new into totals of their own and adds the saved ones
+(IncrementalState.match_rows moves the saved first rows onto the current frame when new
+responses sit between seen ones), so every section comes out exactly as a full run's. A seen
+key whose cells hash differently is an edited response and forces a full run.
+"""
+import base64
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from grouping import ResponseTotals
+from json_export import write_json
+
+DEFAULT_STATE_NAME = 'incremental_state.json'
+STATE_VERSION = 4
+# content_hashes: the hash of a blank cell, and the odd multiplier that mixes in each column
+BLANK_HASH = np.uint64(np.iinfo(np.uint64).max)
+EMPTY_TEXT_HASH = pd.util.hash_array(np.array([''], dtype=object))[0]
+HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def columns_fingerprint(columns):
+    return hashlib.sha1('\x1f'.join(str(c) for c in columns).encode('utf-8')).hexdigest()
+
+
+def row_keys(df_in, timestamp_col='Timestamp', id_prefix='scs number'):
+    """Stable per-row identity: Timestamp + SCS NUMBER, suffixed with the occurrence index
+    so genuinely repeated submissions stay distinct"""
+    id_col = next((c for c in df_in.columns if str(c).strip().lower().startswith(id_prefix)), None)
+    parts = []
+    for col in (timestamp_col, id_col):
+        if col is not None and col in df_in.columns:
+            values = df_in[col]
+            parts.append(values.astype(str).str.strip().where(values.notna(), ''))
+    if parts:
+        base = parts[0]
+        for p in parts[1:]:
+            base = base + '|' + p
+    else:
+        base = pd.util.hash_pandas_object(df_in.astype(str), index=False).astype(str)
+    occurrence = base.groupby(base, sort=False).cumcount().astype(str)
+    return base + '#' + occurrence
+
+
+def key_hashes(keys):
+    """uint64 hash per row key: 8 bytes a response in the saved state instead of the key text"""
+    return pd.util.hash_array(np.asarray(keys, dtype=object))
+
+
+def content_hashes(df_in):
+    """uint64 hash of all the cells of each row, so an edit that keeps the row key still shows.
+
+    Numbers hash as float64 and blanks ('' included) alike in every column dtype: the same column
+    can be read as int in one run and as float in the next once a blank cell appears in it, and
+    merged key columns fill missing cells with ''.
+    """
+    out = np.zeros(len(df_in), dtype=np.uint64)
+    for i in range(df_in.shape[1]):
+        values = df_in.iloc[:, i]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            hashed = pd.util.hash_array(values.to_numpy(dtype='float64', na_value=np.nan))
+        else:
+            hashed = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64, copy=True)
+            hashed[hashed == EMPTY_TEXT_HASH] = BLANK_HASH
+        hashed[values.isna().to_numpy()] = BLANK_HASH
+        out = out * HASH_MULTIPLIER ^ hashed
+    return out
+
+
+class IncrementalState:
+    """Totals of every response folded so far, plus what a later run needs to add more:
+    the key and content hashes of each response in row order and the spellings seen per
+    branch key"""
+
+    def __init__(self, fingerprint, totals, hashes, contents, branch_names):
+        self.fingerprint = fingerprint
+        self.totals = totals
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.contents = np.asarray(contents, dtype=np.uint64)
+        self.branch_names = branch_names
+
+    @classmethod
+    def load(cls, path, fingerprint):
+        """The saved state, or None when it is missing, unreadable or from other inputs / code"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            if raw.get('version') != STATE_VERSION or raw.get('fingerprint') != fingerprint:
+                return None
+            hashes = np.frombuffer(base64.b64decode(raw['hashes']), dtype='<u8')
+            contents = np.frombuffer(base64.b64decode(raw['contents']), dtype='<u8')
+            if len(contents) != len(hashes):
+                return None
+            return cls(fingerprint, ResponseTotals.from_json(raw['totals']), hashes, contents, raw['branch_names'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        write_json({
+            'version': STATE_VERSION,
+            'fingerprint': self.fingerprint,
+            'hashes': base64.b64encode(self.hashes.astype('<u8').tobytes()).decode('ascii'),
+            'contents': base64.b64encode(self.contents.astype('<u8').tobytes()).decode('ascii'),
+            'branch_names': self.branch_names,
+            'totals': self.totals.to_json(),
+        }, path, compact=True)
+
+    def match_rows(self, hashes, contents):
+        """(positions of the saved responses in the current frame, mask of new responses), or
+        None when a saved response was removed or edited or the saved ones changed order"""
+        seen = np.isin(hashes, self.hashes)
+        if not np.array_equal(hashes[seen], self.hashes) or not np.array_equal(contents[seen], self.contents):
+            return None
+        return np.flatnonzero(seen), ~seen
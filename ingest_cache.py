@@ -0,0 +1,213 @@
+"""On-disk cache of parsed input workbooks for analyze_feedback.py.
+
+Each parsed (header-detected, key-coalesced) frame is stored under the SHA-256 of the
+source file's bytes combined with a fingerprint of the parsing code (code_fingerprint), so
+a change to the parser or the key normalization misses the cache instead of returning
+frames in the old shape. A small per-source record remembers the size and mtime the file
+had when it was hashed, so an unchanged file is recognised from a stat() call alone; a file
+that was touched but not modified is re-hashed once and still hits the cache.
+
+prune() drops the entries no current source maps to: older parses of a file that has since
+changed, parses made by older parser code and the records of deleted files.
+
+Frames are written as Parquet when pyarrow is available. Object columns that mix value types
+(SCS NUMBER or phone numbers typed as numbers in some rows and text in others) are stored as
+strings, which Arrow can hold. Pickle is the last resort, for when pyarrow is missing or the
+Parquet write still fails; reading a pickle runs code, so keep --cache-dir somewhere only you
+can write to.
+"""
+import glob
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+
+import pandas as pd
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR_NAME = '.feedback_cache'
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def code_fingerprint(*parts):
+    """SHA-1 over the source of the parsing functions in parts (repr for any other part, e.g.
+    the constants they read), CACHE_VERSION and the pandas version"""
+    h = hashlib.sha1(f"{CACHE_VERSION}|{pd.__version__}".encode('utf-8'))
+    for part in parts:
+        try:
+            source = inspect.getsource(part) if callable(part) else repr(part)
+        except (OSError, TypeError):
+            source = getattr(part, '__qualname__', repr(part))
+        h.update(source.encode('utf-8'))
+    return h.hexdigest()
+
+
+def _write_json_atomic(path, obj):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def arrow_safe_frame(frame):
+    """frame with the values of each object column that mixes types turned into str (missing
+    cells stay missing), so to_parquet does not reject it"""
+    mixed = [i for i in range(frame.shape[1])
+             if frame.dtypes.iloc[i] == object and frame.iloc[:, i].dropna().map(type).nunique() > 1]
+    if not mixed:
+        return frame
+    frame = frame.copy()
+    for i in mixed:
+        frame.isetitem(i, frame.iloc[:, i].map(str, na_action='ignore'))
+    return frame
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+class IngestCache:
+    """Content-addressed cache of parsed input frames.
+
+    `parser(path)` passed to load() must return (frame, header_row); parser_fingerprint
+    (see code_fingerprint) identifies the code behind it.
+    """
+
+    def __init__(self, cache_dir, refresh=False, parser_fingerprint=''):
+        self.cache_dir = cache_dir
+        self.refresh = refresh
+        self.parser_fingerprint = parser_fingerprint
+        self.hits = 0
+        self.misses = 0
+        self.parquet = importlib.util.find_spec('pyarrow') is not None
+        os.makedirs(os.path.join(cache_dir, 'sources'), exist_ok=True)
+
+    def _source_record_path(self, path):
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, 'sources', key + '.json')
+
+    def _entry_path(self, key, suffix):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def entry_key(self, digest):
+        """Cache key of a source with content hash digest, as parsed by the current parser code"""
+        return hashlib.sha256(f"{digest}|{self.parser_fingerprint}".encode('utf-8')).hexdigest()
+
+    def content_hash(self, path, st=None):
+        """SHA-256 of the file, reusing the recorded hash while size and mtime are unchanged"""
+        st = st or os.stat(path)
+        record = _read_json(self._source_record_path(path)) or {}
+        if record.get('size') == st.st_size and record.get('mtime_ns') == st.st_mtime_ns and record.get('sha256'):
+            return record['sha256']
+        digest = file_sha256(path)
+        _write_json_atomic(self._source_record_path(path), {
+            'path': os.path.abspath(path),
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': digest,
+        })
+        return digest
+
+    def _read_entry(self, key):
+        meta = _read_json(self._entry_path(key, '.meta.json'))
+        if not meta or meta.get('version') != CACHE_VERSION:
+            return None, None
+        data_path = self._entry_path(key, '.' + meta.get('format', ''))
+        try:
+            if meta['format'] == 'parquet':
+                frame = pd.read_parquet(data_path)
+            else:
+                frame = pd.read_pickle(data_path)
+        except Exception:
+            return None, None
+        return frame, meta
+
+    def _write_entry(self, key, digest, frame, header_row, source):
+        # Data files are written under a per-process temp name and renamed into place, so
+        # parallel ingest workers parsing identical workbooks never see a half-written entry
+        fmt = None
+        tmp_suffix = f".tmp{os.getpid()}"
+        if self.parquet:
+            data_path = self._entry_path(key, '.parquet')
+            try:
+                arrow_safe_frame(frame).to_parquet(data_path + tmp_suffix, index=False)
+                os.replace(data_path + tmp_suffix, data_path)
+                fmt = 'parquet'
+            except Exception:
+                _remove_quietly(data_path + tmp_suffix)
+        if fmt is None:
+            data_path = self._entry_path(key, '.pickle')
+            try:
+                frame.to_pickle(data_path + tmp_suffix)
+                os.replace(data_path + tmp_suffix, data_path)
+            except Exception:
+                _remove_quietly(data_path + tmp_suffix)
+                raise
+            fmt = 'pickle'
+        _write_json_atomic(self._entry_path(key, '.meta.json'), {
+            'version': CACHE_VERSION,
+            'format': fmt,
+            'sha256': digest,
+            'parser': self.parser_fingerprint,
+            'header_row': header_row,
+            'source': os.path.abspath(source),
+            'rows': int(len(frame)),
+            'columns': int(len(frame.columns)),
+        })
+
+    def load(self, path, parser):
+        """Return the parsed frame for `path`, from the cache when its content is unchanged"""
+        digest = self.content_hash(path)
+        key = self.entry_key(digest)
+        if not self.refresh:
+            frame, _meta = self._read_entry(key)
+            if frame is not None:
+                self.hits += 1
+                return frame
+        frame, header_row = parser(path)
+        self.misses += 1
+        try:
+            self._write_entry(key, digest, frame, header_row, path)
+        except Exception as e:
+            print(f"Warning: could not write ingest cache for {path}: {e}")
+        return frame
+
+    def prune(self):
+        """Delete the records of vanished sources and every entry no remaining source maps to
+        (the latest parse of each file is kept); returns how many entries were removed"""
+        live = set()
+        for record_path in glob.glob(os.path.join(self.cache_dir, 'sources', '*.json')):
+            record = _read_json(record_path) or {}
+            if record.get('path') and os.path.exists(record['path']) and record.get('sha256'):
+                live.add(self.entry_key(record['sha256']))
+            else:
+                os.remove(record_path)
+        removed = 0
+        for meta_path in glob.glob(os.path.join(self.cache_dir, '*.meta.json')):
+            key = os.path.basename(meta_path)[:-len('.meta.json')]
+            if key in live:
+                continue
+            for suffix in ('.parquet', '.pickle', '.meta.json'):
+                if os.path.exists(self._entry_path(key, suffix)):
+                    os.remove(self._entry_path(key, suffix))
+            removed += 1
+        return removed
@@ -0,0 +1,182 @@
+"""NaN-safe streaming JSON serializer for the stats artifacts.
+
+Aggregation leaves float('nan') (and NumPy scalars) in the stats dict. Instead of deep-copying
+the dict to swap NaN for None and then holding the whole dumped string in memory, iter_json
+converts values on the fly and dump_json streams the chunks to the file:
+
+- NaN / Infinity (Python or NumPy floats) -> null
+- NumPy integers, floats and bools -> plain JSON numbers / booleans; ndarrays -> arrays
+- tuples -> arrays, non-string keys -> their JSON literal, as json.dump does
+
+With indent=2 the output is byte-for-byte what json.dump(clean(stats), indent=2,
+ensure_ascii=False) wrote; compact=True uses (',', ':') separators and no indentation.
+"""
+import math
+import os
+from json.encoder import encode_basestring
+
+import numpy as np
+
+WRITE_BUFFER_CHARS = 1 << 16
+
+
+def _float_str(o):
+    return float.__repr__(o) if math.isfinite(o) else 'null'
+
+
+def _key_str(key):
+    if isinstance(key, str):
+        return key
+    if isinstance(key, np.generic):
+        key = key.item()
+    if key is True:
+        return 'true'
+    if key is False:
+        return 'false'
+    if key is None:
+        return 'null'
+    if isinstance(key, int):
+        return int.__repr__(key)
+    if isinstance(key, float):
+        return float.__repr__(key)
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+
+_SCALAR_ENCODERS = {
+    str: encode_basestring,
+    int: int.__repr__,
+    float: _float_str,
+    bool: lambda o: 'true' if o else 'false',
+    type(None): lambda o: 'null',
+}
+
+
+def _scalar_str(o):
+    """JSON text for a scalar, or None when o is a container (or unsupported)"""
+    encoder = _SCALAR_ENCODERS.get(type(o))
+    if encoder is not None:
+        return encoder(o)
+    if isinstance(o, np.generic):
+        return _scalar_str(o.item())
+    # Subclasses of the plain types (e.g. np.float64 is a float)
+    if isinstance(o, str):
+        return encode_basestring(o)
+    if isinstance(o, bool):
+        return 'true' if o else 'false'
+    if isinstance(o, int):
+        return int.__repr__(o)
+    if isinstance(o, float):
+        return _float_str(o)
+    return None
+
+
+def iter_json(obj, indent=None, compact=False):
+    """Yield the JSON text of obj in chunks (see module docstring for the conversions)"""
+    if indent is not None and not isinstance(indent, str):
+        indent = ' ' * indent
+    if compact:
+        item_separator, key_separator = ',', ':'
+    else:
+        item_separator = ',' if indent is not None else ', '
+        key_separator = ': '
+
+    def encode(o, level):
+        s = _scalar_str(o)
+        if s is not None:
+            yield s
+        elif isinstance(o, dict):
+            yield from encode_dict(o, level)
+        elif isinstance(o, (list, tuple)):
+            yield from encode_list(o, level)
+        elif isinstance(o, np.ndarray):
+            yield from encode_list(o.tolist(), level)
+        else:
+            raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def encode_list(items, level):
+        if not items:
+            yield '[]'
+            return
+        if indent is not None:
+            level += 1
+            newline_indent = '\n' + indent * level
+            separator = item_separator + newline_indent
+            buf = '[' + newline_indent
+        else:
+            newline_indent = None
+            separator = item_separator
+            buf = '['
+        first = True
+        for value in items:
+            if first:
+                first = False
+            else:
+                buf = separator
+            s = _scalar_str(value)
+            if s is not None:
+                yield buf + s
+            else:
+                yield buf
+                yield from encode(value, level)
+        if newline_indent is not None:
+            yield '\n' + indent * (level - 1)
+        yield ']'
+
+    def encode_dict(d, level):
+        if not d:
+            yield '{}'
+            return
+        if indent is not None:
+            level += 1
+            newline_indent = '\n' + indent * level
+            separator = item_separator + newline_indent
+            yield '{' + newline_indent
+        else:
+            newline_indent = None
+            separator = item_separator
+            yield '{'
+        first = True
+        for key, value in d.items():
+            prefix = encode_basestring(_key_str(key)) + key_separator
+            if first:
+                first = False
+            else:
+                prefix = separator + prefix
+            s = _scalar_str(value)
+            if s is not None:
+                yield prefix + s
+            else:
+                yield prefix
+                yield from encode(value, level)
+        if newline_indent is not None:
+            yield '\n' + indent * (level - 1)
+        yield '}'
+
+    return encode(obj, 0)
+
+
+def dump_json(obj, fp, indent=2, compact=False):
+    """Stream obj to a text file object, flushing in ~64K-character batches"""
+    buf = []
+    size = 0
+    for chunk in iter_json(obj, indent=None if compact else indent, compact=compact):
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= WRITE_BUFFER_CHARS:
+            fp.write(''.join(buf))
+            buf = []
+            size = 0
+    if buf:
+        fp.write(''.join(buf))
+
+
+def dumps_json(obj, indent=2, compact=False):
+    return ''.join(iter_json(obj, indent=None if compact else indent, compact=compact))
+
+
+def write_json(obj, path, indent=2, compact=False):
+    """dump_json to path through a temp file, so readers never see a half-written artifact"""
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        dump_json(obj, f, indent=indent, compact=compact)
+    os.replace(tmp, path)
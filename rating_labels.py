@@ -0,0 +1,204 @@
+"""Rating-label classifier: raw answer text -> canonical bucket and 0-5 score.
+
+The English / Tamil keyword rules (RATING_RULES) are compiled once, and each distinct raw
+label is classified once into a RatingLabelTable entry (bucket, score). Bucket counts,
+rating distributions and *_numeric scores all read that table: a column is factorized,
+its distinct labels are looked up, and the result is broadcast back to the rows.
+
+- bucket: 'Excellent', 'Good', 'Average', 'Poor', 'Not Applicable', or None for a label no
+  rule recognises (counted as unanswered)
+- score: the exact RATING_MAP value when the label is listed there, otherwise 5/4/3/1 for
+  the bucket, NOT_APPLICABLE_SCORE (-1) for Not Applicable and UNANSWERED_SCORE (0) for
+  missing or unknown labels; averages skip both (see rated)
+
+The table can be saved next to the ingest cache (rating_labels.json) and loaded on the
+next run. It is a plain JSON map from label to [bucket, score], so it is also the place
+to see which labels an export actually uses. A saved table is ignored once the rules or
+RATING_MAP change.
+"""
+import hashlib
+import json
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from json_export import write_json
+
+DEFAULT_LABEL_TABLE_NAME = 'rating_labels.json'
+RATING_BUCKETS = ['Excellent', 'Good', 'Average', 'Poor']
+# int8 score codes that are not ratings: an explicit N/A answer, and a blank or unrecognised one
+NOT_APPLICABLE_SCORE = -1
+UNANSWERED_SCORE = 0
+BUCKET_SCORES = {'Excellent': 5, 'Good': 4, 'Average': 3, 'Poor': 1, 'Not Applicable': NOT_APPLICABLE_SCORE}
+
+# Exact labels of the feedback form and their scores (Need Improvement scores 2 here, 1 by rule)
+RATING_MAP = {
+    'Excellent(மிகநன்று)': 5,
+    'Excellent(மிக நன்று)': 5,
+    'Good(நன்று)': 4,
+    'Average(சராசரி)': 3,
+    'Satisfactory(சராசரி)': 3,
+    'Satisfactory(திருப்தி)': 3,
+    'Need Improvement(முன்னேற்றம் தேவை)': 2,
+    'Needs Improvement(முன்னேற்றம் தேவை)': 2,
+    'Needs to Improve(முன்னேற்றம் தேவை)': 2,
+    'Poor(மோசம்)': 1,
+    'Not Applicable(பொருந்தாது)': NOT_APPLICABLE_SCORE,
+    'Not Applicable(பொருந்தாது': NOT_APPLICABLE_SCORE,
+    'Yes(ஆம்)': 5,
+    'Maybe(இருக்கலாம்)': 3,
+    'No(இல்லை)': 1
+}
+
+# "Need(s) Improvement" answers: bucketed as Poor, but weighted 2 by weighted_score
+NEED_IMPROVEMENT = r'need|improve|முன்னேற்றம்'
+# (bucket, pattern) in priority order: the first pattern found in the lower-cased label wins
+RATING_RULES = [
+    ('Not Applicable', r'not applicable|பொருந்தாது'),
+    ('Excellent', r'excellent|மிகநன்று|மிக நன்று'),
+    ('Good', r'good|நன்று'),
+    ('Average', r'average|satisfactory|திருப்தி|சராசரி'),
+    ('Poor', r'poor|மோசம்|' + NEED_IMPROVEMENT),
+]
+_COMPILED_RULES = [(bucket, re.compile(pattern)) for bucket, pattern in RATING_RULES]
+_NEED_IMPROVEMENT_RX = re.compile(NEED_IMPROVEMENT)
+# Bare numeric answers (e.g. '4' or 4.0 from a numeric export column)
+NUMERIC_BUCKETS = {5: 'Excellent', 4: 'Good', 3: 'Average', 2: 'Poor', 1: 'Poor'}
+RULES_FINGERPRINT = hashlib.sha1(json.dumps([RATING_RULES, RATING_MAP, NUMERIC_BUCKETS, BUCKET_SCORES], ensure_ascii=False).encode('utf-8')).hexdigest()
+
+# Entry for blank / missing answers
+MISSING = (None, UNANSWERED_SCORE)
+
+
+def rule_bucket(label):
+    """Bucket of the first rule found in the lower-cased label (None when no rule matches)"""
+    s = str(label).lower()
+    return next((b for b, rx in _COMPILED_RULES if rx.search(s)), None)
+
+
+def classify_label(label):
+    """(bucket, score) for one stripped, non-empty raw label, straight from the rules"""
+    bucket = rule_bucket(label)
+    if bucket is None:
+        try:
+            bucket = NUMERIC_BUCKETS.get(int(float(label)))
+        except (ValueError, OverflowError):
+            pass
+    if label in RATING_MAP:
+        return bucket, RATING_MAP[label]
+    return bucket, BUCKET_SCORES.get(bucket, UNANSWERED_SCORE)
+
+
+def weighted_score(label):
+    """Weight of a rating-distribution label in the fallback averages: 5/4/3 by rule,
+    2 for Need Improvement, 1 for Poor; None for Not Applicable, bare numbers and unknown labels"""
+    bucket = rule_bucket(label)
+    if bucket is None or bucket == 'Not Applicable':
+        return None
+    if bucket == 'Poor' and _NEED_IMPROVEMENT_RX.search(str(label).lower()):
+        return 2
+    return BUCKET_SCORES[bucket]
+
+
+def rated(scores):
+    """True where a score (array, Series or DataFrame) is a 1-5 rating, not N/A or unanswered"""
+    return (scores != NOT_APPLICABLE_SCORE) & (scores != UNANSWERED_SCORE)
+
+
+def _is_missing(value):
+    try:
+        return bool(pd.isna(value)) or value == ''
+    except (TypeError, ValueError):
+        return False
+
+
+class RatingLabelTable:
+    """Raw label -> (bucket, score), each label classified the first time it is seen"""
+
+    def __init__(self):
+        self.labels = {}
+        self.added = 0
+
+    def resolve(self, value):
+        if _is_missing(value):
+            return MISSING
+        key = str(value).strip()
+        entry = self.labels.get(key)
+        if entry is None:
+            entry = self.labels[key] = classify_label(key) if key else MISSING
+            self.added += 1
+        return entry
+
+    def _per_label(self, series, func, missing, dtype):
+        """func(entry) once per distinct label of series, broadcast back to the rows"""
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        # Trailing slot is the value for missing cells (code -1 indexes it)
+        lookup = np.empty(len(uniques) + 1, dtype=dtype)
+        lookup[:] = [func(self.resolve(v)) for v in uniques] + [missing]
+        return lookup[codes]
+
+    def scores(self, series):
+        """int8 score per row (NOT_APPLICABLE_SCORE for N/A, UNANSWERED_SCORE for blank or unknown)"""
+        return self._per_label(series, lambda e: e[1], UNANSWERED_SCORE, np.int8)
+
+    def buckets(self, series):
+        """Bucket name per row as an object array (None for blank or unknown)"""
+        return self._per_label(series, lambda e: e[0], None, object)
+
+    def bucket_codes(self, series, order=RATING_BUCKETS):
+        """Position of each row's bucket in order, -1 when blank, unknown or not in order"""
+        pos = {b: i for i, b in enumerate(order)}
+        return self._per_label(series, lambda e: pos.get(e[0], -1), -1, np.int8)
+
+    def bucket_counts(self, series, order=RATING_BUCKETS):
+        """{bucket: rows} for every bucket in order"""
+        codes = self.bucket_codes(series, order)
+        counts = np.bincount(codes[codes >= 0], minlength=len(order))
+        return {b: int(n) for b, n in zip(order, counts)}
+
+    def unknown_labels(self, df, cols):
+        """Counter of answers in cols that no rule recognises, by raw label"""
+        unknown = Counter()
+        for col in cols:
+            if col not in df.columns:
+                continue
+            for label, n in df[col].value_counts().items():
+                if n and not _is_missing(label) and self.resolve(label)[0] is None:
+                    unknown[str(label).strip()] += int(n)
+        return unknown
+
+    def load(self, path):
+        """Add the entries saved at path (when written with the current rules); returns how many"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except Exception:
+            return 0
+        if raw.get('rules') != RULES_FINGERPRINT:
+            return 0
+        for label, (bucket, score) in raw.get('labels', {}).items():
+            self.labels.setdefault(label, (bucket, int(score)))
+        return len(raw.get('labels', {}))
+
+    def save(self, path):
+        write_json({
+            'rules': RULES_FINGERPRINT,
+            'labels': {label: list(entry) for label, entry in sorted(self.labels.items())},
+        }, path)
+        self.added = 0
+
+
+# Shared table used by analyze_feedback.py
+LABELS = RatingLabelTable()
+
+
+def canonicalize_rating(value):
+    """Canonical bucket of a raw rating answer (None for blank or unknown)"""
+    return LABELS.resolve(value)[0]
+
+
+def normalize_rating(value):
+    """1-5 score of a raw rating answer, or NOT_APPLICABLE_SCORE / UNANSWERED_SCORE"""
+    return LABELS.resolve(value)[1]
@@ -3,10 +3,13 @@ import argparse
 import os
 import re
 import sys
-from typing import Iterable, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from typing import Iterable, List, Tuple
 
 try:
-    from openpyxl import load_workbook
+    from openpyxl import Workbook, load_workbook
 except Exception as e:
     print("ERROR: openpyxl is required. Install with: python3 -m pip install openpyxl", file=sys.stderr)
     raise
@@ -35,11 +38,25 @@ def clean_text(text: str) -> str:
     return t
 
 
+# Form exports repeat the same option labels, branch names and headers thousands of times, so
+# cleaned values are memoized in a bounded LRU shared by every sheet and file of a process
+DEFAULT_CLEAN_CACHE_SIZE = 8192
+_clean_text_cached = lru_cache(maxsize=DEFAULT_CLEAN_CACHE_SIZE)(clean_text)
+
+
+def configure_clean_cache(maxsize: int) -> None:
+    """Replace the shared clean_text memo with an empty one holding at most maxsize values (0 disables it)."""
+    global _clean_text_cached
+    _clean_text_cached = lru_cache(maxsize=max(0, maxsize))(clean_text)
+
+
 def iter_xlsx_files(paths: Iterable[str]) -> Iterable[str]:
     for p in paths:
         if os.path.isdir(p):
-            for root, _dirs, files in os.walk(p):
-                for f in files:
+            for root, dirs, files in os.walk(p):
+                # Walk in sorted order so the file list (and the printed report) is stable across filesystems
+                dirs.sort()
+                for f in sorted(files):
                     if f.startswith("~$"):
                         continue
                     if f.lower().endswith(".xlsx") and not f.lower().endswith("_english.xlsx"):
@@ -51,7 +68,16 @@ def iter_xlsx_files(paths: Iterable[str]) -> Iterable[str]:
                 yield p
 
 
-def process_file(path: str, inplace: bool = False, suffix: str = "_english") -> Tuple[str, int]:
+def _output_path(path: str, inplace: bool, suffix: str) -> str:
+    if inplace:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}{suffix}{ext}"
+
+
+def process_file(path: str, inplace: bool = False, suffix: str = "_english", streaming: bool = False) -> Tuple[str, int]:
+    if streaming:
+        return process_file_streaming(path, inplace=inplace, suffix=suffix)
     wb = load_workbook(path)
     changes = 0
     for ws in wb.worksheets:
@@ -60,24 +86,84 @@ def process_file(path: str, inplace: bool = False, suffix: str = "_english") ->
                 v = cell.value
                 # Only attempt to clean strings
                 if isinstance(v, str):
-                    new_v = clean_text(v)
+                    new_v = _clean_text_cached(v)
                     if new_v != v:
                         cell.value = new_v
                         changes += 1
-    if inplace:
-        out_path = path
-    else:
-        root, ext = os.path.splitext(path)
-        out_path = f"{root}{suffix}{ext}"
+    out_path = _output_path(path, inplace, suffix)
     wb.save(out_path)
     return out_path, changes
 
 
+def process_file_streaming(path: str, inplace: bool = False, suffix: str = "_english") -> Tuple[str, int]:
+    """Row-at-a-time variant of process_file: read_only in, write_only out.
+
+    Memory stays bounded by one row. Only cell values (and sheet names/order) are carried
+    over; styles, column widths and merged ranges are not.
+    """
+    src = load_workbook(path, read_only=True)
+    dst = Workbook(write_only=True)
+    changes = 0
+    try:
+        for ws in src.worksheets:
+            out_ws = dst.create_sheet(title=ws.title)
+            for row in ws.iter_rows(values_only=True):
+                out_row = []
+                for v in row:
+                    # Only attempt to clean strings
+                    if isinstance(v, str):
+                        new_v = _clean_text_cached(v)
+                        if new_v != v:
+                            changes += 1
+                        v = new_v
+                    out_row.append(v)
+                out_ws.append(out_row)
+    finally:
+        # read_only keeps the source archive open until closed
+        src.close()
+    out_path = _output_path(path, inplace, suffix)
+    # Write next to the target and rename, so --inplace never truncates the file being read
+    tmp_path = f"{out_path}.tmp{os.getpid()}.xlsx"
+    try:
+        dst.save(tmp_path)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        # A failed (or interrupted) save must not leave a partial workbook next to the input
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return out_path, changes
+
+
+def _process_file_job(path: str, inplace: bool, suffix: str, streaming: bool) -> Tuple[str, int, int, int]:
+    """process_file plus the clean_text cache hits/misses it caused in this process."""
+    before = _clean_text_cached.cache_info()
+    out_path, changes = process_file(path, inplace=inplace, suffix=suffix, streaming=streaming)
+    after = _clean_text_cached.cache_info()
+    return out_path, changes, after.hits - before.hits, after.misses - before.misses
+
+
+def process_files(files: List[str], inplace: bool = False, suffix: str = "_english", jobs: int = 1, streaming: bool = False) -> Iterable[Tuple[str, int, int, int]]:
+    """Yield (out_path, changes, cache_hits, cache_misses) in the order of files; jobs > 1 cleans them in a process pool."""
+    if jobs > 1 and len(files) > 1:
+        # Each worker keeps its own memo (same size as ours) for all the files it is handed
+        cache_size = _clean_text_cached.cache_info().maxsize
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files)), initializer=configure_clean_cache, initargs=(cache_size,)) as pool:
+            # map() yields in submission order, so per-file lines print in the same order as a serial run
+            yield from pool.map(_process_file_job, files, repeat(inplace), repeat(suffix), repeat(streaming))
+    else:
+        for f in files:
+            yield _process_file_job(f, inplace, suffix, streaming)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Remove Tamil text from Excel files, keeping only plain English.")
     parser.add_argument("paths", nargs="*", default=["."], help="Files or directories to process (default: current directory)")
     parser.add_argument("--inplace", action="store_true", help="Modify the Excel files in place (destructive). By default, writes *_english.xlsx copies.")
     parser.add_argument("--suffix", default="_english", help="Suffix for output files when not using --inplace (default: _english)")
+    parser.add_argument("--jobs", type=int, default=1, help="Clean files in N worker processes (0 = one per CPU; default: 1)")
+    parser.add_argument("--streaming", action="store_true", help="Stream rows through read-only/write-only workbooks to bound memory (keeps values only; drops styles and merged cells)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CLEAN_CACHE_SIZE, help=f"Distinct cleaned strings to memoize per process (0 disables; default: {DEFAULT_CLEAN_CACHE_SIZE})")
     args = parser.parse_args()
 
     files = list(iter_xlsx_files(args.paths))
@@ -85,15 +171,22 @@ def main():
         print("No .xlsx files found to process.")
         return 0
 
+    configure_clean_cache(args.cache_size)
     total_changes = 0
+    cache_hits = cache_misses = 0
     print(f"Found {len(files)} Excel file(s). Cleaning Tamil text...")
-    for f in files:
-        out_path, changes = process_file(f, inplace=args.inplace, suffix=args.suffix)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    for f, (out_path, changes, hits, misses) in zip(files, process_files(files, args.inplace, args.suffix, jobs, args.streaming)):
         total_changes += changes
+        cache_hits += hits
+        cache_misses += misses
         mode = "IN-PLACE" if args.inplace else f"COPY -> {os.path.basename(out_path)}"
         print(f"  - {os.path.basename(f)} => {mode} | cells changed: {changes}")
 
     print(f"Done. Total cells changed: {total_changes}")
+    lookups = cache_hits + cache_misses
+    if lookups:
+        print(f"clean_text cache: {cache_hits}/{lookups} string cells served from cache ({cache_hits * 100.0 / lookups:.1f}% hit rate, {cache_misses} cleaned)")
     if not args.inplace:
         print("Note: Originals untouched. New *_english.xlsx files created alongside originals.")
     return 0
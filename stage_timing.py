@@ -0,0 +1,135 @@
+"""Per-stage wall time, CPU time, peak RSS and frame size for an analyze_feedback.py run.
+
+    timer = StageTimer()
+    with timer.stage('read_inputs') as rec:
+        df = load_responses(...)
+        rec['rows'], rec['cols'] = df.shape
+    with timer.stage('stats'):
+        with timer.stage('group_performance'):   # recorded as "stats/group_performance"
+            ...
+    timer.print_summary()
+    timer.write('feedback_timings.json')
+
+A stage entered more than once under the same name (e.g. once per input file) is
+accumulated into one row with a call count. CPU time includes worker processes that have
+been waited for (the --jobs pool); stages timed inside those workers are summed across
+workers, so their wall time can exceed the parent stage's, and report the worker's own peak
+RSS. Peak RSS is the process high-water mark after the stage
+and "+RSS" how much the stage raised it; both are None where the `resource` module is
+missing (Windows).
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from json_export import write_json
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_TIMINGS_NAME = 'feedback_timings.json'
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None when unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class StageTimer:
+    def __init__(self):
+        self.records = {}
+        self._stack = []
+        self._started = time.perf_counter()
+
+    def _record(self, name):
+        rec = self.records.get(name)
+        if rec is None:
+            rec = self.records[name] = {
+                'stage': name, 'depth': name.count('/'), 'calls': 0,
+                'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None, 'rss_growth_mb': None,
+                'rows': None, 'cols': None,
+            }
+        return rec
+
+    @contextmanager
+    def stage(self, name, frame=None):
+        """Time the with-block; the yielded dict takes 'rows'/'cols' (preset from frame.shape)"""
+        full_name = '/'.join(self._stack + [name])
+        shape = {'rows': None, 'cols': None}
+        if frame is not None:
+            shape['rows'], shape['cols'] = frame.shape
+        # Claim the row on entry so a stage is listed before the stages nested in it
+        self._record(full_name)
+        self._stack.append(name)
+        rss_before = peak_rss_mb()
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        try:
+            yield shape
+        finally:
+            wall, cpu = time.perf_counter() - wall, cpu_seconds() - cpu
+            self._stack.pop()
+            rss_after = peak_rss_mb()
+            self._accumulate(full_name, wall, cpu, rss_after,
+                             None if rss_after is None else rss_after - rss_before,
+                             shape['rows'], shape['cols'])
+
+    def _accumulate(self, name, wall, cpu, peak_rss, rss_growth, rows, cols, calls=1):
+        rec = self._record(name)
+        rec['calls'] += calls
+        rec['wall_s'] += wall
+        rec['cpu_s'] += cpu
+        if peak_rss is not None:
+            rec['peak_rss_mb'] = max(rec['peak_rss_mb'] or 0.0, peak_rss)
+            rec['rss_growth_mb'] = (rec['rss_growth_mb'] or 0.0) + rss_growth
+        if rows is not None:
+            # Repeated stages (one per file) add up their rows; columns keep the widest frame
+            rec['rows'] = (rec['rows'] or 0) + rows
+            rec['cols'] = max(rec['cols'] or 0, cols or 0)
+
+    def merge(self, records):
+        """Fold records from another timer (e.g. a worker process) in under the current stage"""
+        prefix = '/'.join(self._stack)
+        for rec in records:
+            name = f"{prefix}/{rec['stage']}" if prefix else rec['stage']
+            self._accumulate(name, rec['wall_s'], rec['cpu_s'], rec['peak_rss_mb'], rec['rss_growth_mb'] or 0.0,
+                             rec['rows'], rec['cols'], calls=rec['calls'])
+
+    def summary(self):
+        return {
+            'total_wall_s': round(time.perf_counter() - self._started, 4),
+            'total_cpu_s': round(cpu_seconds(), 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': [
+                {k: (round(v, 4) if isinstance(v, float) else v) for k, v in rec.items()}
+                for rec in self.records.values()
+            ],
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+
+        def fmt(v, spec):
+            return '-' if v is None else format(v, spec)
+
+        width = max([len('  ' * r['depth'] + r['stage'].rsplit('/', 1)[-1]) for r in summary['stages']] + [5])
+        print(f"\nStage timings ({summary['total_wall_s']:.2f}s wall, {summary['total_cpu_s']:.2f}s CPU, peak RSS {fmt(summary['peak_rss_mb'], '.0f')} MB):")
+        print(f"  {'stage':<{width}}  {'wall s':>8}  {'CPU s':>8}  {'peak MB':>8}  {'+RSS MB':>8}  {'rows x cols':>13}  calls")
+        for r in summary['stages']:
+            label = '  ' * r['depth'] + r['stage'].rsplit('/', 1)[-1]
+            size = '-' if r['rows'] is None else f"{r['rows']} x {r['cols']}"
+            print(f"  {label:<{width}}  {r['wall_s']:>8.3f}  {r['cpu_s']:>8.3f}  {fmt(r['peak_rss_mb'], '8.1f'):>8}  {fmt(r['rss_growth_mb'], '+8.1f'):>8}  {size:>13}  {r['calls']:>5}")
+
+    def write(self, path):
+        write_json(self.summary(), path)